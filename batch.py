@@ -0,0 +1,295 @@
+'''Vectorized duel engine.
+
+Runs many Hero.fight style duels at once by turning each hero's ability,
+weapon and armor bounds into NumPy arrays and playing every duel's rounds in
+lockstep. Heroes are never modified; the results come back as arrays.
+'''
+
+from collections import namedtuple
+from itertools import chain
+from operator import attrgetter, itemgetter
+
+import numpy as np
+
+from streams import NumpyRandom
+from superheroes import (DRAW, FIRST, MAX_ROUNDS, SECOND, STALEMATE, TIMEOUT, Ability, Armor,
+                         Weapon, check_limit)
+
+BatchResult = namedtuple('BatchResult', ['winner', 'rounds', 'health_one', 'health_two'])
+BatchResult.__doc__ = '''Per-duel results of a batch.
+
+winner: array of DRAW, FIRST, SECOND, STALEMATE or TIMEOUT
+rounds: array with the number of rounds each duel took
+health_one, health_two: arrays with the final health of each side
+'''
+
+
+def as_generator(rng=None):
+    '''Return a NumPy Generator for rng, which may be None, a seed, a
+    Generator, a streams.NumpyRandom or a random.Random. A random.Random
+    seeds a new Generator from 64 of its bits.
+    '''
+
+    if isinstance(rng, np.random.Generator):
+        return rng
+    if isinstance(rng, NumpyRandom):
+        return rng.generator
+    if hasattr(rng, 'getrandbits'):
+        return np.random.default_rng(rng.getrandbits(64))
+    return np.random.default_rng(rng)
+
+
+def attack_bounds(hero):
+    '''Return the (low, high) damage bounds of every ability of hero.'''
+
+    return [ability.bounds() for ability in hero.abilities]
+
+
+def block_bounds(hero):
+    '''Return the (low, high) block bounds of every armor of hero.'''
+
+    return [armor.bounds() for armor in hero.armors]
+
+
+# The item types of each side whose bounds are read in bulk rather than by
+# calling bounds() on every item: the attribute holding the high bound, and
+# whether each type's low bound is half of it.
+_ATTACK_ITEMS = ('max_damage', {Ability: False, Weapon: True})
+_BLOCK_ITEMS = ('max_block', {Armor: False})
+
+
+def _bounds(items, known):
+    '''Return the low and high bounds of items as two int arrays. Items that
+    are all exactly of the known types are read without a Python call per
+    item; otherwise bounds() is called on each.
+
+    known: _ATTACK_ITEMS or _BLOCK_ITEMS
+    '''
+
+    attribute, halved = known
+    count = len(items)
+    try:
+        halves = np.fromiter(map(halved.__getitem__, map(type, items)), dtype=bool, count=count)
+    except KeyError:
+        bounds = chain.from_iterable(item.bounds() for item in items)
+        flat = np.fromiter(bounds, dtype=np.int64, count=2 * count).reshape(-1, 2)
+        return flat[:, 0].copy(), flat[:, 1].copy()
+    high = np.fromiter(map(attrgetter(attribute), items), dtype=np.int64, count=count)
+    return np.where(halves, high // 2, 0), high
+
+
+class _Side:
+    '''The damage or block ranges of one side of every duel in a batch,
+    padded with (0, 0) ranges to the largest loadout.
+
+    counts holds the number of items in every row.
+
+    loadouts: list of lists of Ability or Armor objects, one list per duel
+    known: _ATTACK_ITEMS or _BLOCK_ITEMS, the item types loadouts may hold
+    '''
+
+    def __init__(self, loadouts, known):
+        rows = len(loadouts)
+        self.counts = np.fromiter(map(len, loadouts), dtype=np.int64, count=rows)
+        width = int(self.counts.max()) if rows else 0
+        low, high = _bounds(list(chain.from_iterable(loadouts)), known)
+        high += 1
+        self.shared = rows == 1
+        if len(low) == rows * width:
+            # No padding needed, so the flat lists are already row by row.
+            self.low = low.reshape(rows, width)
+            self.high = high.reshape(rows, width)
+            return
+        # Item i of the flat lists goes to its duel's row, in the next column.
+        row = np.repeat(np.arange(rows), self.counts)
+        col = np.arange(len(low)) - np.repeat(np.cumsum(self.counts) - self.counts, self.counts)
+        self.low = np.zeros((rows, width), dtype=np.int64)
+        self.high = np.ones((rows, width), dtype=np.int64)
+        self.low[row, col] = low
+        self.high[row, col] = high
+
+    def top(self):
+        '''Return the highest summed roll of every row.'''
+
+        return self.high.sum(axis=1) - self.high.shape[1]
+
+    def bottom(self):
+        '''Return the lowest summed roll of every row.'''
+
+        return self.low.sum(axis=1)
+
+    def sample(self, rng, active):
+        '''Return the summed roll of every duel in active.'''
+
+        if self.low.shape[1] == 0:
+            return np.zeros(active.size, dtype=np.int64)
+        if self.shared:
+            rolls = rng.integers(self.low, self.high, size=(active.size, self.low.shape[1]))
+        elif active.size == len(self.low):
+            # Every duel is still going, as in the first round.
+            rolls = rng.integers(self.low, self.high)
+        else:
+            rolls = rng.integers(self.low[active], self.high[active])
+        return rolls.sum(axis=1)
+
+    def take(self, rows):
+        '''Return a _Side with only the duels in rows, in that order.'''
+
+        side = _Side.__new__(_Side)
+        side.low = self.low[rows]
+        side.high = self.high[rows]
+        side.counts = self.counts[rows]
+        side.shared = False
+        return side
+
+
+def _sides(heroes):
+    '''Return the attack and block _Side of heroes.'''
+
+    return (_Side(list(map(_abilities, heroes)), _ATTACK_ITEMS),
+            _Side(list(map(_armors, heroes)), _BLOCK_ITEMS))
+
+
+_abilities = attrgetter('abilities')
+_armors = attrgetter('armors')
+_health = attrgetter('current_health')
+_first = itemgetter(0)
+_second = itemgetter(1)
+
+
+class Loadouts:
+    '''The attack and block ranges of a fixed list of heroes, built once so
+    that many batches over the same heroes do not rebuild them. Changes to
+    the heroes' loadouts afterwards are not seen.
+
+    heroes: list of Hero objects
+    '''
+
+    def __init__(self, heroes):
+        self.heroes = list(heroes)
+        self.rows = {hero: row for row, hero in enumerate(self.heroes)}
+        self.attack, self.block = _sides(self.heroes)
+        self.abilities = self.attack.counts
+        # The same bounds Hero.can_hurt compares.
+        self.best_attack = self.attack.top()
+        self.weakest_block = self.block.bottom()
+
+
+def _run(ones, twos, health_one, health_two, rng, max_rounds, ceilings=None):
+    '''Play every duel to completion or to max_rounds.
+
+    ones, twos: lists of Hero objects, or one-element lists for a repeated pair
+    health_one, health_two: int64 arrays of starting health, updated in place
+    '''
+
+    attack_one, block_one = _sides(ones)
+    attack_two, block_two = _sides(twos)
+
+    # The same checks as Hero.fight, from the padded arrays.
+    has_abilities = (attack_one.counts + attack_two.counts) > 0
+    can_hurt = ((attack_one.top() > block_two.bottom())
+                | (attack_two.top() > block_one.bottom()))
+    if has_abilities.size == 1:
+        has_abilities = np.repeat(has_abilities, health_one.size)
+        can_hurt = np.repeat(can_hurt, health_one.size)
+    return _play(attack_one, attack_two, block_one, block_two, has_abilities, can_hurt,
+                 health_one, health_two, rng, max_rounds, ceilings)
+
+
+def _play(attack_one, attack_two, block_one, block_two, has_abilities, can_hurt,
+          health_one, health_two, rng, max_rounds, ceilings=None):
+    rng = as_generator(rng)
+    if max_rounds is None:
+        max_rounds = MAX_ROUNDS
+    check_limit('max_rounds', max_rounds)
+    both_alive = (health_one > 0) & (health_two > 0)
+    stalemate = has_abilities & both_alive & ~can_hurt
+    rounds = np.zeros(health_one.size, dtype=np.int64)
+    active = np.flatnonzero(has_abilities & both_alive & can_hurt)
+    escaped = []
+    played = 0
+    while active.size and played != max_rounds:
+        # Same order as Hero.fight: the first hero takes damage, then the second.
+        health_one[active] -= attack_two.sample(rng, active) - block_one.sample(rng, active)
+        health_two[active] -= attack_one.sample(rng, active) - block_two.sample(rng, active)
+        rounds[active] += 1
+        played += 1
+        active = active[(health_one[active] > 0) & (health_two[active] > 0)]
+        if ceilings is not None:
+            above = (health_one[active] > ceilings[0]) | (health_two[active] > ceilings[1])
+            escaped.append(active[above])
+            active = active[~above]
+
+    winner = np.full(health_one.size, DRAW, dtype=np.int8)
+    winner[health_one > 0] = FIRST
+    winner[(health_one <= 0) & (health_two > 0)] = SECOND
+    winner[active] = TIMEOUT
+    for stopped in escaped:
+        winner[stopped] = TIMEOUT
+    winner[stalemate] = STALEMATE
+    winner[~has_abilities] = DRAW
+    return BatchResult(winner, rounds, health_one, health_two)
+
+
+def fight_batch(pairs, rng=None, max_rounds=None):
+    '''Run one duel for every (hero, opponent) pair, following the rules of
+    Hero.fight, and return a BatchResult.
+
+    pairs: list of (Hero, Hero) tuples
+    rng: None, an int seed or a numpy.random.Generator
+    max_rounds: int (default = None, superheroes.MAX_ROUNDS)
+    '''
+
+    ones = list(map(_first, pairs))
+    twos = list(map(_second, pairs))
+    health_one = np.fromiter(map(_health, ones), dtype=np.int64, count=len(ones))
+    health_two = np.fromiter(map(_health, twos), dtype=np.int64, count=len(twos))
+    return _run(ones, twos, health_one, health_two, rng, max_rounds)
+
+
+def fight_rows(one, rows_one, two, rows_two, rng=None, max_rounds=None,
+               health_one=None, health_two=None):
+    '''Run one duel between hero rows_one[i] of one and hero rows_two[i] of
+    two for every i, from their current health, following the rules of
+    Hero.fight, and return a BatchResult.
+
+    one, two: Loadouts Objects
+    rows_one, rows_two: int arrays of the same length
+    rng: None, an int seed or a numpy.random.Generator
+    max_rounds: int (default = None, superheroes.MAX_ROUNDS)
+    health_one, health_two: int arrays of starting health, one per duel
+        (default = None, the heroes' current health)
+    '''
+
+    rows_one = np.asarray(rows_one, dtype=np.int64)
+    rows_two = np.asarray(rows_two, dtype=np.int64)
+    if health_one is None:
+        health_one = [one.heroes[row].current_health for row in rows_one.tolist()]
+    if health_two is None:
+        health_two = [two.heroes[row].current_health for row in rows_two.tolist()]
+    # _play updates the health arrays in place, so always work on copies.
+    health_one = np.array(health_one, dtype=np.int64)
+    health_two = np.array(health_two, dtype=np.int64)
+    has_abilities = (one.abilities[rows_one] + two.abilities[rows_two]) > 0
+    can_hurt = ((one.best_attack[rows_one] > two.weakest_block[rows_two])
+                | (two.best_attack[rows_two] > one.weakest_block[rows_one]))
+    return _play(one.attack.take(rows_one), two.attack.take(rows_two),
+                 one.block.take(rows_one), two.block.take(rows_two),
+                 has_abilities, can_hurt, health_one, health_two, rng, max_rounds)
+
+
+def fight_many(hero, opponent, n, rng=None, max_rounds=None, ceilings=None):
+    '''Run n independent duels between hero and opponent and return a
+    BatchResult.
+
+    hero, opponent: Hero objects
+    n: int
+    rng: None, an int seed or a numpy.random.Generator
+    max_rounds: int (default = None, superheroes.MAX_ROUNDS)
+    ceilings: (int, int), stop a duel as TIMEOUT once either hero's health
+        is above its ceiling (default = None, never)
+    '''
+
+    health_one = np.full(n, hero.current_health, dtype=np.int64)
+    health_two = np.full(n, opponent.current_health, dtype=np.int64)
+    return _run([hero], [opponent], health_one, health_two, rng, max_rounds, ceilings)
@@ -0,0 +1,192 @@
+import pytest
+import io
+import random
+import sys
+import superheroes
+
+np = pytest.importorskip("numpy")
+import batch
+
+
+def capture_console_output(function_body):
+    # _io.StringIO object
+    string_io = io.StringIO()
+    sys.stdout = string_io
+    function_body()
+    sys.stdout = sys.__stdout__
+    return string_io.getvalue()
+
+
+def make_hero(name, health=100, ability=None, weapon=None, armor=None):
+    hero = superheroes.Hero(name, health)
+    if ability is not None:
+        hero.add_ability(superheroes.Ability("Power", ability))
+    if weapon is not None:
+        hero.add_weapon(superheroes.Weapon("Sword", weapon))
+    if armor is not None:
+        hero.add_armor(superheroes.Armor("Shield", armor))
+    return hero
+
+
+def test_batch_one_sided_fight():
+    jodie = make_hero("Jodie Foster", weapon=1000)
+    athena = make_hero("Athena")
+    result = batch.fight_many(jodie, athena, 50, rng=1)
+    assert (result.winner == superheroes.FIRST).all()
+    assert (result.rounds == 1).all()
+    assert (result.health_one == 100).all()
+    assert (result.health_two <= 0).all()
+
+
+def test_batch_draw_when_both_die():
+    jodie = make_hero("Jodie Foster", weapon=1000)
+    athena = make_hero("Athena", weapon=1000)
+    result = batch.fight_many(jodie, athena, 20, rng=2)
+    assert (result.winner == superheroes.DRAW).all()
+    assert (result.rounds == 1).all()
+
+
+def test_batch_no_abilities_is_draw():
+    result = batch.fight_many(make_hero("Jodie Foster"), make_hero("Athena"), 10)
+    assert (result.winner == superheroes.DRAW).all()
+    assert (result.rounds == 0).all()
+
+
+def test_batch_does_not_change_heroes():
+    jodie = make_hero("Jodie Foster", ability=40)
+    athena = make_hero("Athena", ability=40, armor=10)
+    batch.fight_batch([(jodie, athena), (athena, jodie)], rng=3)
+    assert jodie.current_health == 100 and athena.current_health == 100
+    assert jodie.kills == 0 and athena.deaths == 0
+
+
+def test_batch_mixed_pairs():
+    strong = make_hero("Strong", weapon=1000)
+    weak = make_hero("Weak", ability=1)
+    empty = make_hero("Empty")
+    result = batch.fight_batch([(strong, weak), (weak, strong), (empty, empty)], rng=4)
+    assert list(result.winner) == [superheroes.FIRST, superheroes.SECOND, superheroes.DRAW]
+    assert list(result.rounds) == [1, 1, 0]
+
+
+def test_batch_matches_hero_fight_win_rate():
+    runs = 3000
+    one = make_hero("Athena", 150, ability=30, armor=5)
+    two = make_hero("Gamora", 100, weapon=24)
+    result = batch.fight_many(one, two, runs, rng=5)
+    batch_rate = np.mean(result.winner == superheroes.FIRST)
+
+    wins = 0
+    def fights():
+        nonlocal wins
+        for _ in range(runs):
+            one.current_health = one.starting_health
+            two.current_health = two.starting_health
+            if one.fight(two) == superheroes.FIRST:
+                wins += 1
+    capture_console_output(fights)
+    assert abs(batch_rate - wins / runs) < 0.06
+
+
+def test_batch_stalemate_and_timeout():
+    glare = make_hero("Glare", ability=0)
+    socks = make_hero("Socks", armor=10)
+    poke = make_hero("Poke", 10000, ability=2)
+    wall = make_hero("Wall", 10000, armor=1000)
+    result = batch.fight_batch([(glare, socks), (poke, wall)], rng=6, max_rounds=30)
+    assert list(result.winner) == [superheroes.STALEMATE, superheroes.TIMEOUT]
+    assert list(result.rounds) == [0, 30]
+
+
+def wave_team(name, size, health=10, weapon=1000):
+    team = superheroes.Team(name)
+    for index in range(size):
+        hero = superheroes.Hero(f"{name} {index}", health)
+        hero.add_weapon(superheroes.Weapon("Laser Sword", weapon))
+        team.add_hero(hero)
+    return team
+
+
+def test_wave_attack_large_teams():
+    team_one = wave_team("One", 20000)
+    team_two = wave_team("Two", 20000)
+    result = team_one.wave_attack(team_two, superheroes.events.NullSink(), rng=1)
+    # Every duel is a draw between two one-hit heroes, all in the first wave.
+    assert result == superheroes.DRAW
+    assert team_one.alive_count() == 0 and team_two.alive_count() == 0
+    assert team_two.total_deaths == team_two.total_kills == 20000
+
+
+def test_wave_attack_keeps_counters_consistent():
+    team_one = wave_team("One", 30, health=120, weapon=60)
+    team_two = wave_team("Two", 20, health=150, weapon=60)
+    sink = superheroes.events.RingBufferSink(100000)
+    result = team_one.wave_attack(team_two, sink, rng=2)
+    winners = {superheroes.FIRST: team_one, superheroes.SECOND: team_two}
+    assert winners[result].alive_count() > 0
+    assert team_one.alive_count() == 0 or team_two.alive_count() == 0
+    for team in (team_one, team_two):
+        assert team.total_kills == sum(hero.kills for hero in team.heroes)
+        assert team.total_deaths == sum(hero.deaths for hero in team.heroes)
+        assert team._alive == [hero for hero in team._alive if hero.is_alive()]
+    deaths = team_one.total_deaths + team_two.total_deaths
+    assert team_one.total_kills + team_two.total_kills == deaths
+    assert len(sink.events(superheroes.events.DUEL_END)) + 2 * len(sink.events(superheroes.events.DUEL_DRAW)) == deaths
+
+
+def test_wave_attack_stalemate_and_timeout():
+    team_one = wave_team("One", 3, weapon=0)
+    team_two = wave_team("Two", 3, weapon=0)
+    assert team_one.wave_attack(team_two, superheroes.events.NullSink(), rng=3) == superheroes.STALEMATE
+    team_one = wave_team("One", 3, health=10000, weapon=10)
+    team_two = wave_team("Two", 3, health=10000, weapon=10)
+    result = team_one.wave_attack(team_two, superheroes.events.NullSink(), rng=4,
+                                  max_rounds=5, max_waves=2)
+    assert result == superheroes.TIMEOUT
+    assert all(hero.current_health < 10000 for hero in team_one.heroes)
+
+
+def test_wave_attack_accepts_random_random():
+    results = []
+    for _ in range(2):
+        team_one = wave_team("One", 30, health=120, weapon=60)
+        team_two = wave_team("Two", 20, health=150, weapon=60)
+        result = team_one.wave_attack(team_two, superheroes.events.NullSink(), rng=random.Random(7))
+        for team in (team_one, team_two):
+            assert team.total_kills == sum(hero.kills for hero in team.heroes)
+            assert team.total_deaths == sum(hero.deaths for hero in team.heroes)
+            assert sorted(team._alive, key=id) == sorted((hero for hero in team.heroes if hero.is_alive()), key=id)
+            assert all(team._alive[index] is hero for hero, index in team._alive_index.items())
+        results.append((result, [hero.current_health for hero in team_one.heroes + team_two.heroes]))
+    assert results[0] == results[1]
+
+
+def test_loadouts_pad_uneven_item_lists():
+    heroes = [make_hero("Jodie Foster", ability=40, weapon=30, armor=10), make_hero("Athena"),
+              make_hero("Ajax", weapon=9)]
+    loadouts = batch.Loadouts(heroes)
+    assert loadouts.attack.low.tolist() == [[0, 15], [0, 0], [4, 0]]
+    assert loadouts.attack.high.tolist() == [[41, 31], [1, 1], [10, 1]]
+    assert loadouts.abilities.tolist() == [2, 0, 1]
+    assert loadouts.best_attack.tolist() == [70, 0, 9]
+    assert loadouts.weakest_block.tolist() == [0, 0, 0]
+
+
+def test_loadouts_use_bounds_of_other_item_types():
+    class Steady(superheroes.Ability):
+        __slots__ = ()
+
+        def bounds(self):
+            return (self.max_damage, self.max_damage)
+
+    hero = make_hero("Jodie Foster", weapon=30, armor=10)
+    hero.add_ability(Steady("Aim", 20))
+    loadouts = batch.Loadouts([hero, make_hero("Ajax", weapon=9)])
+    assert loadouts.attack.low.tolist() == [[15, 20], [4, 0]]
+    assert loadouts.best_attack.tolist() == [50, 9]
+    assert loadouts.weakest_block.tolist() == [0, 0]
+
+
+def test_negative_max_rounds_is_rejected():
+    with pytest.raises(ValueError, match="max_rounds"):
+        batch.fight_many(make_hero("Jodie Foster", ability=10), make_hero("Athena"), 5, max_rounds=-2)
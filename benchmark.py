@@ -0,0 +1,210 @@
+'''Benchmarks for the Hero and Team hot paths used by Arena.
+
+Sweeps the number of abilities per hero, the number of heroes per team and
+the health to damage ratio, and reports ops/sec and per-call latency
+percentiles. Results can be saved as JSON and compared with an earlier run.
+
+batch.fight_batch is timed against Hero.fight on the same distinct pairs of
+heroes, and its speedup over Hero.fight is reported. It needs NumPy.
+
+    python benchmark.py --output new.json --compare old.json --threshold 0.1
+'''
+
+import argparse
+import json
+import platform
+import random
+import sys
+import time
+
+import superheroes
+from events import NullSink
+
+ABILITY_COUNTS = (1, 4, 16, 64)
+TEAM_SIZES = (10, 100, 1000)
+HEALTH_RATIOS = (1, 10, 100)
+PAIR_COUNTS = (1000, 20000)
+
+
+def percentile(sorted_values, fraction):
+    '''Return the value at fraction (0 to 1) of an already sorted list.'''
+
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(fraction * len(sorted_values)))
+    return sorted_values[index]
+
+
+def measure(call, setup=None, min_time=0.2, inner=1, max_samples=100000):
+    '''Time call until min_time seconds of calls have run and return a dict
+    of ops/sec and latency percentiles in microseconds.
+
+    call: function with no arguments
+    setup: function run before every sample and not timed
+    min_time: float, seconds of timed calls
+    inner: int, calls per timed sample, for calls too fast to time singly
+    '''
+
+    samples = []
+    spent = 0.0
+    clock = time.perf_counter
+    while spent < min_time and len(samples) < max_samples:
+        if setup is not None:
+            setup()
+        start = clock()
+        for _ in range(inner):
+            call()
+        elapsed = clock() - start
+        spent += elapsed
+        samples.append(elapsed / inner)
+    samples.sort()
+    calls = len(samples) * inner
+    return {'ops_per_sec': calls / spent if spent else 0.0,
+            'p50_us': percentile(samples, 0.50) * 1e6,
+            'p90_us': percentile(samples, 0.90) * 1e6,
+            'p99_us': percentile(samples, 0.99) * 1e6,
+            'calls': calls}
+
+
+def make_hero(name, abilities=1, armors=1, health=100, max_damage=50):
+    hero = superheroes.Hero(name, health)
+    for index in range(abilities):
+        if index % 2:
+            hero.add_weapon(superheroes.Weapon(f'Weapon {index}', max_damage))
+        else:
+            hero.add_ability(superheroes.Ability(f'Ability {index}', max_damage))
+    for index in range(armors):
+        hero.add_armor(superheroes.Armor(f'Armor {index}', max_damage // 4))
+    return hero
+
+
+def make_team(name, size, rng):
+    team = superheroes.Team(name)
+    for index in range(size):
+        team.add_hero(make_hero(f'{name} {index}', 2, 1, 100 + rng.randint(0, 100), 50))
+    return team
+
+
+def run(ability_counts=ABILITY_COUNTS, team_sizes=TEAM_SIZES, health_ratios=HEALTH_RATIOS,
+        min_time=0.2, seed=0, pair_counts=PAIR_COUNTS):
+    '''Run every benchmark and return a dict of results keyed by name.'''
+
+    rng = random.Random(seed)
+    sink = NullSink()
+    results = {}
+
+    ability = superheroes.Ability('Punch', 100)
+    results['ability.attack'] = measure(lambda: ability.attack(rng), min_time=min_time, inner=100)
+
+    for count in ability_counts:
+        hero = make_hero('Athena', abilities=count, armors=count)
+        results[f'hero.attack[abilities={count}]'] = measure(
+            lambda: hero.attack(rng), min_time=min_time, inner=20)
+        results[f'hero.defend[armors={count}]'] = measure(
+            lambda: hero.defend(rng), min_time=min_time, inner=20)
+
+    for ratio in health_ratios:
+        one = make_hero('Athena', 2, 1, health=50 * ratio)
+        two = make_hero('Gamora', 2, 1, health=50 * ratio)
+
+        def reset():
+            one.current_health = one.starting_health
+            two.current_health = two.starting_health
+        results[f'hero.fight[health/damage={ratio}]'] = measure(
+            lambda: one.fight(two, sink, rng), setup=reset, min_time=min_time)
+
+    for size in team_sizes:
+        team_one = make_team('One', size, rng)
+        team_two = make_team('Two', size, rng)
+
+        def revive():
+            team_one.revive_heroes()
+            team_two.revive_heroes()
+        results[f'team.attack[heroes={size}]'] = measure(
+            lambda: team_one.attack(team_two, sink, rng), setup=revive, min_time=min_time)
+        results[f'team.stats[heroes={size}]'] = measure(
+            team_one.stats, min_time=min_time, inner=100)
+
+    for count in pair_counts:
+        import batch
+        pairs = [(make_hero(f'One {index}', 2, 1, 100 + rng.randint(0, 100)),
+                  make_hero(f'Two {index}', 2, 1, 100 + rng.randint(0, 100)))
+                 for index in range(count)]
+
+        def heal():
+            for hero, opponent in pairs:
+                hero.current_health = hero.starting_health
+                opponent.current_health = opponent.starting_health
+
+        def fight_all():
+            for hero, opponent in pairs:
+                hero.fight(opponent, sink, rng)
+        fights = measure(fight_all, setup=heal, min_time=min_time)
+        heal()
+        batched = measure(lambda: batch.fight_batch(pairs, seed), min_time=min_time)
+        batched['speedup'] = batched['ops_per_sec'] / fights['ops_per_sec']
+        results[f'hero.fight[pairs={count}]'] = fights
+        results[f'batch.fight_batch[pairs={count}]'] = batched
+
+    return results
+
+
+def compare(baseline, current, threshold=0.1):
+    '''Return a list of (name, baseline ops/sec, current ops/sec) for every
+    benchmark that got slower by more than threshold.
+
+    baseline, current: dicts of results keyed by name
+    threshold: float, allowed fractional drop in ops/sec
+    '''
+
+    regressions = []
+    for name, result in current.items():
+        before = baseline.get(name)
+        if before is None:
+            continue
+        if result['ops_per_sec'] < before['ops_per_sec'] * (1 - threshold):
+            regressions.append((name, before['ops_per_sec'], result['ops_per_sec']))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--output', help='save results to this JSON file')
+    parser.add_argument('--compare', help='JSON file of an earlier run to compare against')
+    parser.add_argument('--threshold', type=float, default=0.1,
+                        help='fractional ops/sec drop reported as a regression')
+    parser.add_argument('--min-time', type=float, default=0.2,
+                        help='seconds spent timing each benchmark')
+    parser.add_argument('--quick', action='store_true', help='run a smaller sweep')
+    args = parser.parse_args(argv)
+
+    if args.quick:
+        results = run((1, 16), (10, 100), (1, 10), args.min_time, pair_counts=(1000,))
+    else:
+        results = run(min_time=args.min_time)
+
+    print(f'{"benchmark":<34} {"ops/sec":>12} {"p50 us":>10} {"p90 us":>10} {"p99 us":>10}')
+    for name, result in results.items():
+        print(f'{name:<34} {result["ops_per_sec"]:>12.0f} {result["p50_us"]:>10.2f} '
+              f'{result["p90_us"]:>10.2f} {result["p99_us"]:>10.2f}')
+    for name, result in results.items():
+        if 'speedup' in result:
+            print(f'{name}: {result["speedup"]:.1f}x as fast as hero.fight on the same pairs')
+
+    if args.output:
+        with open(args.output, 'w') as output:
+            json.dump({'python': platform.python_version(), 'results': results}, output, indent=2)
+
+    if args.compare:
+        with open(args.compare) as baseline_file:
+            baseline = json.load(baseline_file)['results']
+        regressions = compare(baseline, results, args.threshold)
+        for name, before, after in regressions:
+            print(f'REGRESSION {name}: {before:.0f} -> {after:.0f} ops/sec')
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
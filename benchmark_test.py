@@ -0,0 +1,38 @@
+import pytest
+import json
+import benchmark
+
+
+def test_measure_reports_percentiles():
+    result = benchmark.measure(lambda: sum(range(10)), min_time=0.01, inner=10)
+    assert result["ops_per_sec"] > 0
+    assert result["p50_us"] <= result["p90_us"] <= result["p99_us"]
+
+
+def test_run_small_sweep():
+    results = benchmark.run((1,), (5,), (1,), min_time=0.005)
+    assert "hero.attack[abilities=1]" in results
+    assert "team.attack[heroes=5]" in results
+    assert "team.stats[heroes=5]" in results
+
+
+def test_compare_flags_regressions():
+    baseline = {"fast": {"ops_per_sec": 1000.0}, "steady": {"ops_per_sec": 1000.0}}
+    current = {"fast": {"ops_per_sec": 800.0}, "steady": {"ops_per_sec": 950.0},
+               "new": {"ops_per_sec": 1.0}}
+    assert benchmark.compare(baseline, current, 0.1) == [("fast", 1000.0, 800.0)]
+
+
+def test_main_writes_json(tmp_path, capsys):
+    output = tmp_path / "bench.json"
+    assert benchmark.main(["--quick", "--min-time", "0.002", "--output", str(output)]) == 0
+    saved = json.loads(output.read_text())
+    assert "ability.attack" in saved["results"]
+
+
+def test_fight_batch_reports_speedup():
+    pytest.importorskip("numpy")
+    results = benchmark.run((), (), (), min_time=0.005, pair_counts=(50,))
+    batched = results["batch.fight_batch[pairs=50]"]
+    assert "hero.fight[pairs=50]" in results
+    assert batched["speedup"] > 0
@@ -0,0 +1,378 @@
+'''Compact binary roster files that are memory-mapped instead of parsed.
+
+A roster file is a fixed 64 byte header followed by little-endian int64
+arrays and two UTF-8 name blobs, each section padded to 8 bytes:
+
+    header        magic, version, hero/ability/weapon/armor counts, blob sizes
+    team name
+    health        starting health of every hero
+    ability_start, weapon_start, armor_start
+                  heroes + 1 offsets into the item arrays below
+    ability_max, weapon_max, armor_max
+                  max damage or max block of every item, hero by hero
+    name_start    heroes + 1 offsets into the hero name blob
+    item_start    items + 1 offsets into the item name blob
+    hero names, item names
+
+The (low, high) bounds of each item follow from its max and kind, exactly as
+Ability.bounds(), Weapon.bounds() and Armor.bounds() compute them. Opening a
+file only maps it; heroes are read on access through MappedHero and
+MappedTeam views, and arrays() hands the sections to NumPy without copying.
+
+    team, _ = roster.load_team('team.csv')
+    write_team(team, 'team.shr')
+    with BinaryRoster('team.shr') as mapped:
+        batch.fight_many(mapped.team[0], mapped.team[1], 1000)
+'''
+
+import mmap
+import os
+import struct
+import sys
+from array import array
+
+from superheroes import Ability, Armor, Team, Weapon
+
+MAGIC = b'SHRO'
+VERSION = 1
+HEADER = struct.Struct('<4sHHqqqqqqq')
+
+# Array sections in file order, with a function giving their length from
+# (heroes, abilities, weapons, armors).
+SECTIONS = (
+    ('health', lambda h, a, w, r: h),
+    ('ability_start', lambda h, a, w, r: h + 1),
+    ('weapon_start', lambda h, a, w, r: h + 1),
+    ('armor_start', lambda h, a, w, r: h + 1),
+    ('ability_max', lambda h, a, w, r: a),
+    ('weapon_max', lambda h, a, w, r: w),
+    ('armor_max', lambda h, a, w, r: r),
+    ('name_start', lambda h, a, w, r: h + 1),
+    ('item_start', lambda h, a, w, r: a + w + r + 1),
+)
+
+
+def _padded(size):
+    return (size + 7) & ~7
+
+
+def write_roster(heroes, path, name='Roster'):
+    '''Write heroes to a binary roster file and return how many were written.
+
+    heroes: iterable of Hero Objects
+    path: str
+    name: str, the team name stored in the file
+    '''
+
+    if sys.byteorder != 'little':
+        raise ValueError('Binary rosters can only be written on little-endian machines')
+    columns = {section: array('q') for section, _ in SECTIONS}
+    for section in ('ability_start', 'weapon_start', 'armor_start', 'name_start', 'item_start'):
+        columns[section].append(0)
+    hero_names = bytearray()
+    ability_names = bytearray()
+    ability_ends = array('q')
+    weapon_names = bytearray()
+    weapon_ends = array('q')
+    armor_names = bytearray()
+    armor_ends = array('q')
+
+    for hero in heroes:
+        columns['health'].append(hero.starting_health)
+        hero_names += hero.name.encode()
+        columns['name_start'].append(len(hero_names))
+        for item in hero.abilities:
+            if isinstance(item, Weapon):
+                columns['weapon_max'].append(item.max_damage)
+                weapon_names += item.name.encode()
+                weapon_ends.append(len(weapon_names))
+            else:
+                columns['ability_max'].append(item.max_damage)
+                ability_names += item.name.encode()
+                ability_ends.append(len(ability_names))
+        for item in hero.armors:
+            columns['armor_max'].append(item.max_block)
+            armor_names += item.name.encode()
+            armor_ends.append(len(armor_names))
+        columns['ability_start'].append(len(columns['ability_max']))
+        columns['weapon_start'].append(len(columns['weapon_max']))
+        columns['armor_start'].append(len(columns['armor_max']))
+
+    # Item names are stored abilities first, then weapons, then armors.
+    item_start = columns['item_start']
+    item_start.extend(ability_ends)
+    item_start.extend(end + len(ability_names) for end in weapon_ends)
+    item_start.extend(end + len(ability_names) + len(weapon_names) for end in armor_ends)
+    item_names = ability_names + weapon_names + armor_names
+
+    team_name = name.encode()
+    counts = (len(columns['health']), len(columns['ability_max']),
+              len(columns['weapon_max']), len(columns['armor_max']))
+    with open(path, 'wb') as output:
+        output.write(HEADER.pack(MAGIC, VERSION, 0, *counts,
+                                 len(team_name), len(hero_names), len(item_names)))
+        output.write(team_name.ljust(_padded(len(team_name)), b'\0'))
+        for section, _ in SECTIONS:
+            columns[section].tofile(output)
+        for blob in (hero_names, item_names):
+            output.write(bytes(blob).ljust(_padded(len(blob)), b'\0'))
+    return counts[0]
+
+
+def write_team(team, path):
+    '''Write every hero of team to a binary roster file.
+
+    team: Team Object
+    path: str
+    '''
+
+    return write_roster(team.heroes, path, team.name)
+
+
+class BinaryRoster:
+    '''A memory-mapped binary roster. Nothing is parsed or copied when it is
+    opened; close() (or leaving a with block) unmaps the file.
+
+    path: str
+    '''
+
+    def __init__(self, path):
+        if sys.byteorder != 'little':
+            raise ValueError('Binary rosters can only be read on little-endian machines')
+        self.path = path
+        with open(path, 'rb') as handle:
+            if os.fstat(handle.fileno()).st_size < HEADER.size:
+                raise ValueError(f'{path} is too short to be a binary roster')
+            self._map = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+        self.offsets = {}
+        self._team = None
+        try:
+            self._parse()
+        except BaseException:
+            self.close()
+            raise
+
+    def _parse(self):
+        (magic, version, _, self.heroes, self.abilities, self.weapons, self.armors,
+         team_name_size, hero_names_size, item_names_size) = HEADER.unpack_from(self._map)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f'{self.path} is not a version {VERSION} binary roster')
+        counts = (self.heroes, self.abilities, self.weapons, self.armors)
+        sizes = (team_name_size, hero_names_size, item_names_size)
+        if min(counts + sizes) < 0:
+            raise ValueError(f'{self.path} has a corrupt header')
+
+        # Check the whole layout fits before casting any section, since a
+        # short memoryview fails to cast with a TypeError.
+        position = HEADER.size + _padded(team_name_size)
+        for section, length in SECTIONS:
+            count = length(*counts)
+            self.offsets[section] = (position, count)
+            position += 8 * count
+        self._hero_names = position
+        self._item_names = position + _padded(hero_names_size)
+        if self._item_names + item_names_size > len(self._map):
+            raise ValueError(f'{self.path} is truncated')
+
+        self.name = self._map[HEADER.size:HEADER.size + team_name_size].decode()
+        self._view = memoryview(self._map)
+        for section, (position, count) in self.offsets.items():
+            setattr(self, section, self._view[position:position + 8 * count].cast('q'))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __len__(self):
+        return self.heroes
+
+    def close(self):
+        '''Release the array views and unmap the file. If NumPy arrays from
+        arrays() are still alive the mapping stays open until they are gone.
+        '''
+
+        if self._map.closed:
+            return
+        for section, _ in SECTIONS:
+            if hasattr(self, section):
+                getattr(self, section).release()
+        if hasattr(self, '_view'):
+            self._view.release()
+        try:
+            self._map.close()
+        except BufferError:
+            pass
+
+    def arrays(self):
+        '''Return the array sections as NumPy arrays sharing the mapped
+        memory. Needs NumPy.
+        '''
+
+        import numpy as np
+        return {section: np.frombuffer(self._map, dtype='<i8', count=count, offset=offset)
+                for section, (offset, count) in self.offsets.items()}
+
+    def hero_name(self, index):
+        start = self._hero_names + self.name_start[index]
+        return self._map[start:self._hero_names + self.name_start[index + 1]].decode()
+
+    def item_name(self, item):
+        '''Return the name of item, counting abilities, then weapons, then
+        armors.
+        '''
+
+        start = self._item_names + self.item_start[item]
+        return self._map[start:self._item_names + self.item_start[item + 1]].decode()
+
+    @property
+    def team(self):
+        '''A MappedTeam over every hero in the file.'''
+
+        if self._team is None:
+            self._team = MappedTeam(self)
+        return self._team
+
+
+class MappedHero:
+    '''A read-only Hero view of one hero in a BinaryRoster. Items are built
+    on access; to_hero() makes a real Hero that can fight.
+
+    roster: BinaryRoster Object
+    index: int
+    '''
+
+    __slots__ = ('roster', 'index')
+
+    def __init__(self, roster, index):
+        self.roster = roster
+        self.index = index
+
+    def __repr__(self):
+        return f'MappedHero({self.name!r})'
+
+    @property
+    def name(self):
+        return self.roster.hero_name(self.index)
+
+    @property
+    def starting_health(self):
+        return self.roster.health[self.index]
+
+    @property
+    def current_health(self):
+        return self.starting_health
+
+    def _items(self, section):
+        roster = self.roster
+        starts = getattr(roster, section + '_start')
+        return range(starts[self.index], starts[self.index + 1])
+
+    @property
+    def abilities(self):
+        '''Abilities followed by Weapons, the order the file stores them in.'''
+
+        roster = self.roster
+        items = [Ability(roster.item_name(item), roster.ability_max[item])
+                 for item in self._items('ability')]
+        items.extend(Weapon(roster.item_name(roster.abilities + item), roster.weapon_max[item])
+                     for item in self._items('weapon'))
+        return items
+
+    @property
+    def armors(self):
+        roster = self.roster
+        first = roster.abilities + roster.weapons
+        return [Armor(roster.item_name(first + item), roster.armor_max[item])
+                for item in self._items('armor')]
+
+    def damage_bounds(self):
+        '''Return the (low, high) range of Hero.attack() without building
+        any items.
+        '''
+
+        roster = self.roster
+        high = sum(roster.ability_max[item] for item in self._items('ability'))
+        low = 0
+        for item in self._items('weapon'):
+            low += roster.weapon_max[item] // 2
+            high += roster.weapon_max[item]
+        return (low, high)
+
+    def block_bounds(self):
+        '''Return the (low, high) range of Hero.defend().'''
+
+        roster = self.roster
+        return (0, sum(roster.armor_max[item] for item in self._items('armor')))
+
+    def can_hurt(self, opponent):
+        return self.damage_bounds()[1] > opponent.block_bounds()[0]
+
+    def is_alive(self):
+        return self.starting_health > 0
+
+    def to_hero(self):
+        '''Return a new Hero with the same name, health and items.'''
+
+        import roster
+        hero = roster.build_hero(self.name, self.starting_health)
+        hero.abilities = self.abilities
+        hero.armors = self.armors
+        return hero
+
+
+class MappedTeam:
+    '''A read-only Team view of a BinaryRoster. Heroes are MappedHero views
+    made on access.
+
+    roster: BinaryRoster Object
+    '''
+
+    def __init__(self, roster):
+        self.roster = roster
+        self.name = roster.name
+        self._by_name = None
+
+    def __len__(self):
+        return self.roster.heroes
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += self.roster.heroes
+        if not 0 <= index < self.roster.heroes:
+            raise IndexError('hero index out of range')
+        return MappedHero(self.roster, index)
+
+    def __iter__(self):
+        for index in range(self.roster.heroes):
+            yield MappedHero(self.roster, index)
+
+    @property
+    def heroes(self):
+        return tuple(self)
+
+    def alive_count(self):
+        return sum(1 for health in self.roster.health if health > 0)
+
+    def get_hero(self, name):
+        '''Return the first hero called name, or None. The name index is
+        built on the first call.
+
+        name: str
+        '''
+
+        if self._by_name is None:
+            self._by_name = {}
+            for index in range(self.roster.heroes):
+                self._by_name.setdefault(self.roster.hero_name(index), index)
+        index = self._by_name.get(name)
+        return None if index is None else MappedHero(self.roster, index)
+
+    def to_team(self):
+        '''Return a new Team holding a real Hero for every mapped hero.'''
+
+        team = Team(self.name)
+        for hero in self:
+            team.add_hero(hero.to_hero())
+        return team
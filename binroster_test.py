@@ -0,0 +1,85 @@
+import pytest
+import binroster
+import roster
+import superheroes
+
+
+def build_team():
+    team = superheroes.Team("Mapped")
+    team.add_hero(roster.build_hero("Athena", 120, [("Science", 40), ("Luck", 10)],
+                                    [("Laser Sword", 60)], [("Thick Fog", 30)]))
+    team.add_hero(roster.build_hero("Gamora", 90, (), [("Knife", 21)], ()))
+    team.add_hero(roster.build_hero("Étoile", 100, [("Stars", 5)], (), [("Cape", 1), ("Mask", 2)]))
+    return team
+
+
+def test_round_trip(tmp_path):
+    path = str(tmp_path / "team.shr")
+    team = build_team()
+    assert binroster.write_team(team, path) == 3
+    with binroster.BinaryRoster(path) as mapped:
+        assert mapped.name == "Mapped"
+        assert len(mapped.team) == 3
+        assert [roster.hero_to_record(hero.to_hero()) for hero in mapped.team] == \
+            [roster.hero_to_record(hero) for hero in team.heroes]
+        rebuilt = mapped.team.to_team()
+    assert rebuilt.name == "Mapped"
+    assert rebuilt.alive_count() == 3
+
+
+def test_mapped_hero_bounds_match_hero(tmp_path):
+    path = str(tmp_path / "team.shr")
+    team = build_team()
+    binroster.write_team(team, path)
+    with binroster.BinaryRoster(path) as mapped:
+        for hero, view in zip(team.heroes, mapped.team):
+            assert view.name == hero.name
+            assert view.starting_health == hero.starting_health
+            assert view.damage_bounds() == hero.damage_bounds()
+            assert view.block_bounds() == hero.block_bounds()
+        assert mapped.team.get_hero("Gamora").index == 1
+        assert mapped.team.get_hero("Nobody") is None
+        assert mapped.team[-1].name == "Étoile"
+        with pytest.raises(IndexError):
+            mapped.team[3]
+
+
+def test_empty_roster(tmp_path):
+    path = str(tmp_path / "empty.shr")
+    binroster.write_roster([], path)
+    with binroster.BinaryRoster(path) as mapped:
+        assert len(mapped) == 0
+        assert mapped.team.heroes == ()
+
+
+def test_rejects_other_files(tmp_path):
+    path = tmp_path / "team.csv"
+    path.write_text("name,health,abilities,weapons,armors\n" * 4)
+    with pytest.raises(ValueError):
+        binroster.BinaryRoster(str(path))
+
+
+def test_numpy_arrays_share_the_mapping(tmp_path):
+    np = pytest.importorskip("numpy")
+    batch = pytest.importorskip("batch")
+    path = str(tmp_path / "team.shr")
+    binroster.write_team(build_team(), path)
+    with binroster.BinaryRoster(path) as mapped:
+        arrays = mapped.arrays()
+        assert arrays["health"].tolist() == [120, 90, 100]
+        assert not arrays["health"].flags.writeable
+        assert np.diff(arrays["armor_start"]).tolist() == [1, 0, 2]
+        result = batch.fight_many(mapped.team[0], mapped.team[1], 50, rng=3)
+        assert len(result.winner) == 50
+
+
+@pytest.mark.parametrize("keep", [0, 10, binroster.HEADER.size, 100, -8])
+def test_truncated_files_raise_value_error(tmp_path, keep):
+    path = str(tmp_path / "team.shr")
+    binroster.write_team(build_team(), path)
+    with open(path, "rb") as handle:
+        data = handle.read()
+    with open(path, "wb") as handle:
+        handle.write(data[:keep])
+    with pytest.raises(ValueError):
+        binroster.BinaryRoster(path)
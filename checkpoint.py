@@ -0,0 +1,315 @@
+'''Checkpoint and resume for long runs of team battles.
+
+A checkpoint file is a sequence of appended snapshot records, each a
+24 byte header (magic, payload size, step, CRC32 of the payload) and a
+payload of little-endian int64 arrays:
+
+    outcomes      how many battles ended DRAW, FIRST, SECOND, STALEMATE, TIMEOUT
+    random state  the Mersenne Twister words, or a pickle for other generators
+    per team      hero count, CRC32 of the hero names, then health, kills and
+                  deaths in roster order and the alive index as roster positions
+
+Only the last complete record matters. A record cut short by a crash fails
+its CRC and is dropped when the run resumes. Restoring a snapshot puts back
+the exact alive index order and random state, so a resumed run plays the
+same battles it would have played without stopping.
+
+    outcomes = run_battles(team_one, team_two, 100000, 'run.ckpt', rng=7)
+'''
+
+import os
+import pickle
+import struct
+import sys
+import time
+import zlib
+from array import array
+
+from events import NullSink
+from streams import as_random
+
+MAGIC = b'SHCK'
+RECORD = struct.Struct('<4sIqI')
+OUTCOMES = 5
+MERSENNE = 0
+PICKLED = 1
+
+
+class Snapshot:
+    '''One checkpoint record.
+
+    step: int, battles played
+    outcomes: list of OUTCOMES ints, indexed by battle result
+    rng_state: state for the generator's setstate(), or None
+    teams: list of (names_crc, health, kills, deaths, alive) tuples
+    '''
+
+    def __init__(self, step, outcomes, rng_state, teams):
+        self.step = step
+        self.outcomes = outcomes
+        self.rng_state = rng_state
+        self.teams = teams
+
+
+def _names_crc(team):
+    return zlib.crc32('\0'.join(hero.name for hero in team.heroes).encode())
+
+
+def _words(view, offset, count):
+    '''Return count int64 words of view starting at byte offset.'''
+
+    words = array('q')
+    words.frombytes(view[offset:offset + 8 * count])
+    return words
+
+
+def _padded(size):
+    return (size + 7) & ~7
+
+
+def _pack_state(state):
+    '''Pack a random.Random state as int64 words, anything else as a pickle.'''
+
+    if state is None:
+        return array('q', [PICKLED, 0, 0]).tobytes()
+    if (isinstance(state, tuple) and len(state) == 3 and isinstance(state[1], tuple)
+            and state[2] is None):
+        words = array('q', [MERSENNE, state[0], len(state[1])])
+        words.extend(state[1])
+        return words.tobytes()
+    blob = pickle.dumps(state)
+    return array('q', [PICKLED, len(blob), 0]).tobytes() + blob.ljust(_padded(len(blob)), b'\0')
+
+
+def _unpack_state(view, offset):
+    '''Return (state, offset just past it) for a state packed at offset.'''
+
+    kind, first, second = _words(view, offset, 3)
+    offset += 24
+    if kind == MERSENNE:
+        words = tuple(_words(view, offset, second))
+        return (first, words, None), offset + 8 * second
+    if first == 0:
+        return None, offset
+    return pickle.loads(view[offset:offset + first]), offset + _padded(first)
+
+
+def encode(step, outcomes, rng_state, teams):
+    '''Return the bytes of one snapshot record.
+
+    step: int
+    outcomes: list of OUTCOMES ints
+    rng_state: result of the generator's getstate(), or None
+    teams: list of Team Objects
+    '''
+
+    parts = [array('q', outcomes).tobytes()]
+    parts.append(_pack_state(rng_state))
+    parts.append(array('q', [len(teams)]).tobytes())
+    for team in teams:
+        heroes = team.heroes
+        alive = team._alive_positions()
+        columns = array('q', [len(heroes), _names_crc(team), len(alive)])
+        columns.extend(hero._current_health for hero in heroes)
+        columns.extend(hero.kills for hero in heroes)
+        columns.extend(hero.deaths for hero in heroes)
+        columns.extend(alive)
+        parts.append(columns.tobytes())
+    payload = b''.join(parts)
+    return RECORD.pack(MAGIC, len(payload), step, zlib.crc32(payload)) + payload
+
+
+def decode(payload, step):
+    '''Return the Snapshot stored in the payload of a record.'''
+
+    view = memoryview(payload)
+    outcomes = list(_words(view, 0, OUTCOMES))
+    offset = 8 * OUTCOMES
+    rng_state, offset = _unpack_state(view, offset)
+    count = _words(view, offset, 1)[0]
+    offset += 8
+    teams = []
+    for _ in range(count):
+        heroes, names_crc, alive = _words(view, offset, 3)
+        offset += 24
+        columns = _words(view, offset, 3 * heroes + alive)
+        offset += 8 * (3 * heroes + alive)
+        teams.append((names_crc, columns[:heroes], columns[heroes:2 * heroes],
+                      columns[2 * heroes:3 * heroes], columns[3 * heroes:]))
+    return Snapshot(step, outcomes, rng_state, teams)
+
+
+def scan(path):
+    '''Return (Snapshot, end) for the last complete record in path, where end
+    is the byte offset just past it, or (None, 0) if there is none.
+    '''
+
+    last = None
+    end = 0
+    with open(path, 'rb') as handle:
+        while True:
+            header = handle.read(RECORD.size)
+            if len(header) < RECORD.size:
+                break
+            magic, size, step, crc = RECORD.unpack(header)
+            if magic != MAGIC:
+                break
+            payload = handle.read(size)
+            if len(payload) < size or zlib.crc32(payload) != crc:
+                break
+            last = (payload, step)
+            end = handle.tell()
+    if last is None:
+        return None, 0
+    return decode(*last), end
+
+
+def load(path):
+    '''Return the last complete Snapshot in path, or None.'''
+
+    if not os.path.exists(path):
+        return None
+    return scan(path)[0]
+
+
+def restore(snapshot, teams, rng=None):
+    '''Put the heroes of teams and rng back in the state saved in snapshot.
+
+    snapshot: Snapshot Object
+    teams: list of Team Objects, with the same heroes in the same order
+    rng: generator with setstate(), or None to skip the random state
+    '''
+
+    if len(teams) != len(snapshot.teams):
+        raise ValueError(f'Checkpoint has {len(snapshot.teams)} teams, not {len(teams)}')
+    for team, (names_crc, health, kills, deaths, alive) in zip(teams, snapshot.teams):
+        if len(team.heroes) != len(health) or _names_crc(team) != names_crc:
+            raise ValueError(f'{team.name} does not match the checkpointed roster')
+        team._restore(health, kills, deaths, alive)
+    if rng is not None and snapshot.rng_state is not None:
+        rng.setstate(snapshot.rng_state)
+
+
+class Checkpointer:
+    '''Appends snapshots to a checkpoint file at most every interval seconds.
+
+    An existing file is appended to, after dropping a torn last record. A
+    non-empty file that does not start with a complete record raises
+    ValueError rather than being overwritten.
+
+    path: str
+    interval: float, seconds between snapshots (default = 1.0)
+    max_bytes: int, the file is rewritten with only the latest snapshot once
+        it grows past this size
+    sync: bool, fsync after every snapshot
+    '''
+
+    def __init__(self, path, interval=1.0, max_bytes=64 << 20, sync=False):
+        if sys.byteorder != 'little':
+            raise ValueError('Checkpoints can only be written on little-endian machines')
+        self.path = path
+        self.interval = interval
+        self.max_bytes = max_bytes
+        self.sync = sync
+        self.snapshots = 0
+        self.seconds = 0.0
+        if os.path.exists(path) and os.path.getsize(path):
+            end = scan(path)[1]
+            if not end:
+                raise ValueError(f'{path} is not a checkpoint file')
+            self._output = open(path, 'r+b')
+            # Drop a record torn by a crash before appending after it.
+            self._output.truncate(end)
+            self._output.seek(end)
+        else:
+            self._output = open(path, 'wb')
+        self._last = time.perf_counter()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        self._output.close()
+
+    def due(self):
+        return time.perf_counter() - self._last >= self.interval
+
+    def save(self, step, outcomes, rng, teams):
+        '''Append a snapshot now.
+
+        step: int
+        outcomes: list of OUTCOMES ints
+        rng: generator with getstate(), or None
+        teams: list of Team Objects
+        '''
+
+        start = time.perf_counter()
+        record = encode(step, outcomes, rng.getstate() if rng is not None else None, teams)
+        if self._output.tell() + len(record) > self.max_bytes:
+            self._rewrite(record)
+        else:
+            self._output.write(record)
+            self._output.flush()
+            if self.sync:
+                os.fsync(self._output.fileno())
+        self.snapshots += 1
+        self._last = time.perf_counter()
+        self.seconds += self._last - start
+
+    def maybe_save(self, step, outcomes, rng, teams):
+        '''Append a snapshot if interval seconds have passed since the last.'''
+
+        if self.due():
+            self.save(step, outcomes, rng, teams)
+
+    def _rewrite(self, record):
+        self._output.close()
+        temporary = self.path + '.tmp'
+        with open(temporary, 'wb') as output:
+            output.write(record)
+            output.flush()
+            os.fsync(output.fileno())
+        os.replace(temporary, self.path)
+        self._output = open(self.path, 'r+b')
+        self._output.seek(0, os.SEEK_END)
+
+
+def run_battles(team_one, team_two, battles, path, rng=None, sink=None, interval=1.0,
+                revive=True, max_rounds=None, max_duels=None):
+    '''Play team_one.attack(team_two) battles times, checkpointing to path,
+    and return the list of outcome counts. If path already holds a checkpoint
+    of these teams the run carries on from it.
+
+    team_one, team_two: Team Objects
+    battles: int, total battles including those already played
+    path: str
+    rng: random.Random or seed (default = the random module)
+    sink: event sink (default = NullSink())
+    interval: float, seconds between checkpoints
+    revive: bool, revive both teams before every battle
+    '''
+
+    rng = as_random(rng)
+    if sink is None:
+        sink = NullSink()
+    teams = [team_one, team_two]
+    step = 0
+    outcomes = [0] * OUTCOMES
+    snapshot = load(path)
+    if snapshot is not None:
+        restore(snapshot, teams, rng)
+        step = snapshot.step
+        outcomes = snapshot.outcomes
+    with Checkpointer(path, interval) as checkpointer:
+        while step < battles:
+            if revive:
+                team_one.revive_heroes()
+                team_two.revive_heroes()
+            outcomes[team_one.attack(team_two, sink, rng, max_rounds, max_duels)] += 1
+            step += 1
+            checkpointer.maybe_save(step, outcomes, rng, teams)
+        checkpointer.save(step, outcomes, rng, teams)
+    return outcomes
@@ -0,0 +1,93 @@
+import os
+import random
+import pytest
+import checkpoint
+import superheroes
+from seeded_teams import build_team, counters
+
+
+def test_resumed_run_matches_uninterrupted_run(tmp_path):
+    one, two = build_team("One", seed=1), build_team("Two", seed=2)
+    expected = checkpoint.run_battles(one, two, 40, str(tmp_path / "full.ckpt"), rng=7)
+
+    path = str(tmp_path / "split.ckpt")
+    checkpoint.run_battles(build_team("One", seed=1), build_team("Two", seed=2), 15, path, rng=7)
+    # A new process builds fresh teams; the seed is replaced by the saved state.
+    resumed_one, resumed_two = build_team("One", seed=1), build_team("Two", seed=2)
+    outcomes = checkpoint.run_battles(resumed_one, resumed_two, 40, path, rng=7)
+    assert outcomes == expected
+    assert sum(outcomes) == 40
+    assert counters(resumed_one, resumed_two) == counters(one, two)
+
+
+def test_restore_keeps_alive_order_and_random_state(tmp_path):
+    one, two = build_team("One", 8, seed=3), build_team("Two", 8, seed=4)
+    rng = random.Random(5)
+    one.attack(two, superheroes.events.NullSink(), rng, max_duels=4)
+    path = str(tmp_path / "mid.ckpt")
+    with checkpoint.Checkpointer(path) as checkpointer:
+        checkpointer.save(1, [0] * checkpoint.OUTCOMES, rng, [one, two])
+    expected = [hero.name for hero in one._alive]
+    draws = [rng.random() for _ in range(3)]
+
+    copy_one, copy_two = build_team("One", 8, seed=3), build_team("Two", 8, seed=4)
+    copy_rng = random.Random()
+    checkpoint.restore(checkpoint.load(path), [copy_one, copy_two], copy_rng)
+    assert [hero.name for hero in copy_one._alive] == expected
+    assert copy_one.total_kills == one.total_kills
+    assert copy_two.alive_count() == two.alive_count()
+    assert [copy_rng.random() for _ in range(3)] == draws
+
+
+def test_torn_record_is_dropped(tmp_path):
+    path = str(tmp_path / "torn.ckpt")
+    one, two = build_team("One"), build_team("Two")
+    with checkpoint.Checkpointer(path) as checkpointer:
+        checkpointer.save(1, [1, 0, 0, 0, 0], random.Random(1), [one, two])
+        checkpointer.save(2, [2, 0, 0, 0, 0], random.Random(1), [one, two])
+    with open(path, "r+b") as handle:
+        handle.truncate(os.path.getsize(path) - 5)
+    assert checkpoint.load(path).step == 1
+    with checkpoint.Checkpointer(path) as checkpointer:
+        checkpointer.save(3, [3, 0, 0, 0, 0], None, [one, two])
+    snapshot = checkpoint.load(path)
+    assert snapshot.step == 3
+    assert snapshot.rng_state is None
+
+
+def test_file_is_compacted_past_max_bytes(tmp_path):
+    path = str(tmp_path / "small.ckpt")
+    one, two = build_team("One"), build_team("Two")
+    with checkpoint.Checkpointer(path, max_bytes=20000) as checkpointer:
+        for step in range(50):
+            checkpointer.save(step, [step, 0, 0, 0, 0], random.Random(step), [one, two])
+    assert os.path.getsize(path) <= 20000
+    assert checkpoint.load(path).step == 49
+
+
+def test_restore_rejects_other_rosters(tmp_path):
+    path = str(tmp_path / "other.ckpt")
+    with checkpoint.Checkpointer(path) as checkpointer:
+        checkpointer.save(1, [0] * 5, None, [build_team("One"), build_team("Two")])
+    with pytest.raises(ValueError):
+        checkpoint.restore(checkpoint.load(path), [build_team("One"), build_team("Three")])
+
+
+def test_other_files_are_not_overwritten(tmp_path):
+    path = str(tmp_path / "notes.txt")
+    with open(path, "wb") as handle:
+        handle.write(b"not a checkpoint")
+    with pytest.raises(ValueError):
+        checkpoint.Checkpointer(path)
+    with pytest.raises(ValueError):
+        checkpoint.run_battles(build_team("One"), build_team("Two"), 3, path, rng=7)
+    with open(path, "rb") as handle:
+        assert handle.read() == b"not a checkpoint"
+
+
+def test_empty_file_is_used(tmp_path):
+    path = str(tmp_path / "empty.ckpt")
+    open(path, "wb").close()
+    with checkpoint.Checkpointer(path) as checkpointer:
+        checkpointer.save(1, [1, 0, 0, 0, 0], None, [build_team("One"), build_team("Two")])
+    assert checkpoint.load(path).step == 1
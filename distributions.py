@@ -0,0 +1,88 @@
+'''Exact damage and block distributions with alias-table sampling.
+
+The total damage of a hero is a sum of independent uniform integers, one per
+ability. Its exact distribution is the convolution of those uniform ranges,
+and an alias table built from it gives a new total in O(1) with two random
+draws, no matter how many abilities the hero has.
+'''
+
+import random
+
+
+def uniform_sum_counts(bounds):
+    '''Return (offset, counts) for the sum of independent uniform integers.
+    counts[i] is the number of ways the sum equals offset + i.
+
+    bounds: list of (low, high) tuples
+    '''
+
+    counts = [1]
+    offset = 0
+    for low, high in bounds:
+        width = high - low + 1
+        offset += low
+        # Convolve with a run of width ones using a sliding window sum.
+        result = []
+        window = 0
+        for index in range(len(counts) + width - 1):
+            if index < len(counts):
+                window += counts[index]
+            if index >= width:
+                window -= counts[index - width]
+            result.append(window)
+        counts = result
+    return offset, counts
+
+
+def support_size(bounds):
+    '''Return the number of values the sum of bounds can take.'''
+
+    return sum(high - low for low, high in bounds) + 1
+
+
+class AliasTable:
+    '''Samples integers from a fixed discrete distribution in O(1) using
+    Vose's alias method.
+
+    offset: int, the value of the first weight
+    weights: list of non-negative numbers
+    '''
+
+    def __init__(self, offset, weights):
+        self.offset = offset
+        size = len(weights)
+        total = sum(weights)
+        scaled = [weight * size / total for weight in weights]
+        self.prob = [1.0] * size
+        self.alias = list(range(size))
+
+        small = [index for index, value in enumerate(scaled) if value < 1.0]
+        large = [index for index, value in enumerate(scaled) if value >= 1.0]
+        while small and large:
+            less = small.pop()
+            more = large.pop()
+            self.prob[less] = scaled[less]
+            self.alias[less] = more
+            scaled[more] -= 1.0 - scaled[less]
+            if scaled[more] < 1.0:
+                small.append(more)
+            else:
+                large.append(more)
+
+    @classmethod
+    def from_bounds(cls, bounds):
+        '''Build the table of the sum of uniform integers in bounds.
+
+        bounds: list of (low, high) tuples
+        '''
+
+        offset, counts = uniform_sum_counts(bounds)
+        return cls(offset, counts)
+
+    def sample(self, rng=random):
+        '''Return one value drawn from the distribution.'''
+
+        index = int(rng.random() * len(self.prob))
+        if rng.random() < self.prob[index]:
+            return self.offset + index
+        return self.offset + self.alias[index]
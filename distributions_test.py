@@ -0,0 +1,58 @@
+import pytest
+import random
+import superheroes
+import distributions
+
+
+def test_uniform_sum_counts_single_range():
+    assert distributions.uniform_sum_counts([(2, 4)]) == (2, [1, 1, 1])
+
+
+def test_uniform_sum_counts_two_dice():
+    offset, counts = distributions.uniform_sum_counts([(1, 6), (1, 6)])
+    assert offset == 2
+    assert counts == [1, 2, 3, 4, 5, 6, 5, 4, 3, 2, 1]
+
+
+def test_support_size():
+    assert distributions.support_size([(0, 10), (5, 10)]) == 16
+    assert distributions.support_size([]) == 1
+
+
+def test_alias_table_frequencies():
+    table = distributions.AliasTable(10, [1, 2, 3, 4])
+    rng = random.Random(4)
+    draws = [table.sample(rng) for _ in range(40000)]
+    assert min(draws) == 10 and max(draws) == 13
+    for value, weight in zip(range(10, 14), [1, 2, 3, 4]):
+        assert draws.count(value) / len(draws) == pytest.approx(weight / 10, abs=0.015)
+
+
+def test_hero_tabulated_attack_range():
+    hero = superheroes.Hero("Athena")
+    hero.add_ability(superheroes.Ability("Strength", 30))
+    hero.add_weapon(superheroes.Weapon("Sword", 40))
+    hero.tabulate()
+    attacks = [hero.attack() for _ in range(3000)]
+    assert min(attacks) >= 20 and max(attacks) <= 70
+    assert sum(attacks) / len(attacks) == pytest.approx(45, abs=1.5)
+
+
+def test_hero_tables_rebuilt_on_new_loadout():
+    hero = superheroes.Hero("Athena")
+    hero.add_armor(superheroes.Armor("Socks", 5))
+    hero.tabulate()
+    assert max(hero.defend() for _ in range(500)) <= 5
+    hero.add_armor(superheroes.Armor("Shield", 100))
+    assert max(hero.defend() for _ in range(500)) > 5
+    hero.add_weapon(superheroes.Weapon("Sword", 1000))
+    assert min(hero.attack() for _ in range(100)) >= 500
+
+
+def test_hero_tables_fall_back_when_too_large():
+    hero = superheroes.Hero("Athena")
+    hero.add_ability(superheroes.Ability("Strength", 700000))
+    hero.tabulate()
+    attack = hero.attack()
+    assert 0 <= attack <= 700000
+    assert hero._attack_table is False
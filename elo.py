@@ -0,0 +1,213 @@
+'''Elo ratings for heroes and teams, fed by fight outcomes.
+
+Ratings live in NumPy arrays indexed by player id, so results are applied in
+vectorized batches. Inside one batch every result is scored against the
+ratings from before the batch and the changes are summed per player, the
+rating-period approach Glicko uses. Results recorded one at a time are
+buffered and applied batch_size at a time, and every query applies the
+buffer first.
+
+    ratings = EloRatings()
+    team_one.attack(team_two, sink=RatingSink(ratings, teams=team_ratings))
+    ratings.top(10)
+
+Outcomes are scored from the first player's side: FIRST is a win, SECOND a
+loss, and DRAW, STALEMATE and TIMEOUT are draws.
+'''
+
+import numpy as np
+
+import events
+from superheroes import DRAW, FIRST, SECOND, STALEMATE, TIMEOUT
+
+# Score of the first player for every outcome code.
+SCORES = np.empty(5)
+SCORES[[DRAW, FIRST, SECOND, STALEMATE, TIMEOUT]] = (0.5, 1.0, 0.0, 0.5, 0.5)
+
+
+def _name(player):
+    return player.name
+
+
+class EloRatings:
+    '''Elo ratings of any number of players.
+
+    initial: float, rating of a new player (default = 1500)
+    k: float, largest change from one result (default = 32)
+    batch_size: int, buffered results applied at once (default = 4096)
+    key: function from a player to its id key (default = its name)
+    '''
+
+    def __init__(self, initial=1500.0, k=32.0, batch_size=4096, key=_name):
+        self.initial = initial
+        self.k = k
+        self.batch_size = batch_size
+        self.key = key
+        self.keys = []
+        self._ids = {}
+        self._ratings = np.full(64, initial)
+        self._games = np.zeros(64, dtype=np.int64)
+        self._pending = ([], [], [])
+
+    def __len__(self):
+        return len(self.keys)
+
+    def _key_of(self, player):
+        return player if isinstance(player, (str, int)) else self.key(player)
+
+    def id(self, key):
+        '''Return the id of key, adding a new player if needed.'''
+
+        player = self._ids.get(key)
+        if player is None:
+            player = len(self.keys)
+            if player == len(self._ratings):
+                self._ratings = np.concatenate([self._ratings, np.full(player, self.initial)])
+                self._games = np.concatenate([self._games, np.zeros(player, dtype=np.int64)])
+            self._ids[key] = player
+            self.keys.append(key)
+        return player
+
+    def ids(self, keys):
+        '''Return an int64 array with the id of every key.'''
+
+        return np.fromiter((self.id(key) for key in keys), dtype=np.int64)
+
+    @property
+    def ratings(self):
+        '''Read-only view of every player's rating, indexed by id.'''
+
+        self.flush()
+        view = self._ratings[:len(self.keys)]
+        view.flags.writeable = False
+        return view
+
+    @property
+    def games(self):
+        self.flush()
+        view = self._games[:len(self.keys)]
+        view.flags.writeable = False
+        return view
+
+    def rating(self, player):
+        '''Return the rating of a player or str/int key, or initial if it is
+        unknown.
+        '''
+
+        self.flush()
+        player_id = self._ids.get(self._key_of(player))
+        return self.initial if player_id is None else float(self._ratings[player_id])
+
+    def expected(self, first, second):
+        '''Return the expected score of first against second.'''
+
+        return 1.0 / (1.0 + 10.0 ** ((self.rating(second) - self.rating(first)) / 400.0))
+
+    def update(self, first, second, scores):
+        '''Apply a batch of results at once.
+
+        first, second: int arrays of player ids
+        scores: float array, the first player's score in each result
+        '''
+
+        first = np.asarray(first, dtype=np.int64)
+        second = np.asarray(second, dtype=np.int64)
+        scores = np.asarray(scores, dtype=np.float64)
+        if first.size == 0:
+            return
+        ratings = self._ratings
+        expected = 1.0 / (1.0 + 10.0 ** ((ratings[second] - ratings[first]) / 400.0))
+        change = self.k * (scores - expected)
+        size = len(ratings)
+        ratings += np.bincount(first, change, size) - np.bincount(second, change, size)
+        self._games += np.bincount(first, minlength=size) + np.bincount(second, minlength=size)
+
+    def record_outcomes(self, first, second, outcomes):
+        '''Apply a batch of outcome codes, such as batch.BatchResult.winner.
+
+        first, second: int arrays of player ids
+        outcomes: int array of DRAW, FIRST, SECOND, STALEMATE or TIMEOUT
+        '''
+
+        self.flush()
+        self.update(first, second, SCORES[np.asarray(outcomes, dtype=np.int64)])
+
+    def record(self, first, second, outcome):
+        '''Buffer one result between two players.
+
+        first, second: Hero or Team Objects, or str/int keys
+        outcome: DRAW, FIRST, SECOND, STALEMATE or TIMEOUT
+        '''
+
+        ones, twos, outcomes = self._pending
+        ones.append(self.id(self._key_of(first)))
+        twos.append(self.id(self._key_of(second)))
+        outcomes.append(outcome)
+        if len(outcomes) >= self.batch_size:
+            self.flush()
+
+    def record_duel(self, hero, opponent, outcome):
+        '''Buffer the result of hero.fight(opponent).'''
+
+        self.record(hero, opponent, outcome)
+
+    def record_team(self, team, other_team, outcome):
+        '''Buffer the result of team.attack(other_team).'''
+
+        self.record(team, other_team, outcome)
+
+    def flush(self):
+        '''Apply every buffered result.'''
+
+        ones, twos, outcomes = self._pending
+        if outcomes:
+            self._pending = ([], [], [])
+            self.update(ones, twos, SCORES[outcomes])
+
+    def top(self, k=10):
+        '''Return the k highest rated players as (key, rating) pairs, best
+        first. Costs O(n + k log k).
+        '''
+
+        ratings = self.ratings
+        k = min(k, len(ratings))
+        if k == 0:
+            return []
+        best = np.argpartition(-ratings, k - 1)[:k]
+        best = best[np.argsort(-ratings[best], kind='stable')]
+        return [(self.keys[player], float(ratings[player])) for player in best]
+
+
+class RatingSink:
+    '''Event sink that feeds duel and team results into EloRatings.
+
+    heroes: EloRatings for duels, or None
+    teams: EloRatings for team battles, or None
+    forward: another sink to pass every event on to, or None
+    '''
+
+    duel_events = {
+        events.DUEL_END: FIRST,
+        events.DUEL_DRAW: DRAW,
+        events.DUEL_STALEMATE: STALEMATE,
+        events.DUEL_TIMEOUT: TIMEOUT,
+    }
+    team_events = {
+        events.TEAM_WIN: FIRST,
+        events.TEAM_DRAW: DRAW,
+        events.TEAM_STALEMATE: STALEMATE,
+        events.TEAM_TIMEOUT: TIMEOUT,
+    }
+
+    def __init__(self, heroes=None, teams=None, forward=None):
+        self.heroes = heroes
+        self.teams = teams
+        self.forward = forward
+
+    def emit(self, event, *args):
+        if self.heroes is not None and event in self.duel_events:
+            self.heroes.record_duel(args[0], args[1], self.duel_events[event])
+        elif self.teams is not None and event in self.team_events:
+            self.teams.record_team(args[0], args[1], self.team_events[event])
+        if self.forward is not None:
+            self.forward.emit(event, *args)
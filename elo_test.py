@@ -0,0 +1,77 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+
+import elo
+import superheroes
+from events import RingBufferSink
+from superheroes import DRAW, FIRST, SECOND
+
+
+def make_hero(name, max_damage):
+    hero = superheroes.Hero(name, 100)
+    hero.add_ability(superheroes.Ability("Punch", max_damage))
+    return hero
+
+
+def test_single_results_follow_elo():
+    ratings = elo.EloRatings(batch_size=1)
+    ratings.record("Athena", "Gamora", FIRST)
+    assert ratings.rating("Athena") == 1516
+    assert ratings.rating("Gamora") == 1484
+    expected = ratings.expected("Gamora", "Athena")
+    ratings.record("Athena", "Gamora", SECOND)
+    assert ratings.rating("Gamora") == pytest.approx(1484 + 32 * (1 - expected))
+    ratings.record("Athena", "Gamora", DRAW)
+    assert ratings.rating("Athena") + ratings.rating("Gamora") == pytest.approx(3000)
+    assert ratings.games.tolist() == [3, 3]
+    assert ratings.rating("Nobody") == 1500
+
+
+def test_batch_matches_summed_changes():
+    ratings = elo.EloRatings()
+    first = ratings.ids(["A", "A", "B"])
+    second = ratings.ids(["B", "C", "C"])
+    ratings.record_outcomes(first, second, [FIRST, FIRST, SECOND])
+    # Every result is scored at 1500 vs 1500, so each moves 16 points.
+    assert ratings.ratings.tolist() == [1532, 1468, 1500]
+    assert ratings.games.tolist() == [2, 2, 2]
+
+
+def test_buffered_results_are_applied_before_queries():
+    ratings = elo.EloRatings(batch_size=1000)
+    for _ in range(10):
+        ratings.record("Strong", "Weak", FIRST)
+    assert ratings.top(1)[0][0] == "Strong"
+    assert ratings.rating("Weak") < 1500
+
+
+def test_top_k():
+    ratings = elo.EloRatings()
+    keys = [f"Hero {index}" for index in range(100)]
+    rng = np.random.default_rng(1)
+    first = ratings.ids(keys)
+    for _ in range(20):
+        second = rng.permutation(first)
+        ratings.record_outcomes(first, second, np.where(first > second, FIRST, SECOND))
+    top = ratings.top(5)
+    assert [rating for _, rating in top] == sorted(ratings.ratings.tolist(), reverse=True)[:5]
+    assert ratings.rating(top[0][0]) == top[0][1]
+    assert len(ratings.top(1000)) == 100
+
+
+def test_rating_sink_scores_fights_and_battles():
+    heroes = elo.EloRatings(batch_size=1)
+    teams = elo.EloRatings(batch_size=1)
+    forward = RingBufferSink()
+    sink = elo.RatingSink(heroes, teams, forward)
+    one, two = superheroes.Team("One"), superheroes.Team("Two")
+    one.add_hero(make_hero("Strong", 1000))
+    two.add_hero(make_hero("Weak", 0))
+    two.add_hero(make_hero("Weaker", 0))
+    assert one.attack(two, sink) == FIRST
+    assert heroes.rating(one.heroes[0]) > 1500
+    assert heroes.rating("Weak") < 1500
+    assert teams.top(1)[0][0] == "One"
+    assert teams.rating(two) == 1484
+    assert forward.events("team_win")
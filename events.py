@@ -0,0 +1,110 @@
+'''Structured battle events.
+
+Hero.fight and the Team methods report what happens through a sink instead
+of calling print. A sink only needs an emit(event, *args) method:
+
+    NullSink      drops everything, for headless simulations
+    RingBufferSink keeps the last N events in memory
+    ConsoleSink   prints the classic messages, for the interactive Arena
+
+The default sink is a ConsoleSink; set_sink() changes it for the whole
+process and every battle method also takes a sink argument.
+'''
+
+from collections import deque
+
+# Event names and the arguments that come with them.
+DUEL_START = 'duel_start'      # hero, opponent
+DUEL_END = 'duel_end'          # winner, loser
+DUEL_DRAW = 'duel_draw'        # hero, opponent (both died)
+NO_CONTEST = 'no_contest'      # hero, opponent (neither had abilities)
+DUEL_STALEMATE = 'duel_stalemate'  # hero, opponent (neither can hurt the other)
+DUEL_TIMEOUT = 'duel_timeout'  # hero, opponent (max_rounds reached)
+BATTLE_START = 'battle_start'  # team, other_team
+TEAM_WIN = 'team_win'          # winning team, losing team
+TEAM_DRAW = 'team_draw'        # team, other_team
+TEAM_STALEMATE = 'team_stalemate'  # team, other_team
+TEAM_TIMEOUT = 'team_timeout'  # team, other_team (max_duels reached)
+HERO_LISTED = 'hero_listed'    # hero
+SURVIVOR = 'survivor'          # hero
+
+
+class NullSink:
+    '''Ignores every event.'''
+
+    def emit(self, event, *args):
+        pass
+
+
+class RingBufferSink:
+    '''Keeps the last size events as (event, args) tuples.
+
+    size: int (default = 1000)
+    '''
+
+    def __init__(self, size=1000):
+        self.buffer = deque(maxlen=size)
+
+    def emit(self, event, *args):
+        self.buffer.append((event, args))
+
+    def events(self, event=None):
+        '''Return the buffered events, optionally only those named event.'''
+
+        if event is None:
+            return list(self.buffer)
+        return [item for item in self.buffer if item[0] == event]
+
+    def clear(self):
+        self.buffer.clear()
+
+
+class ConsoleSink:
+    '''Prints the same messages the game has always printed.
+
+    stream: file object (default = sys.stdout at the time of printing)
+    '''
+
+    messages = {
+        DUEL_END: lambda winner, loser: f'{winner.name} won a battle.',
+        DUEL_DRAW: lambda hero, opponent: f'{hero.name} and {opponent.name} drew the battle',
+        NO_CONTEST: lambda hero, opponent: 'Draw',
+        DUEL_STALEMATE: lambda hero, opponent: f'{hero.name} and {opponent.name} cannot hurt each other',
+        DUEL_TIMEOUT: lambda hero, opponent: f'{hero.name} and {opponent.name} ran out of rounds',
+        BATTLE_START: lambda team, other_team: '\n',
+        TEAM_WIN: lambda team, other_team: f'{team.name} has won!',
+        TEAM_DRAW: lambda team, other_team: 'Its a draw!',
+        TEAM_STALEMATE: lambda team, other_team: 'Nobody left can win, its a stalemate!',
+        TEAM_TIMEOUT: lambda team, other_team: 'Out of time, its a draw!',
+        HERO_LISTED: lambda hero: hero.name,
+        SURVIVOR: lambda hero: hero.name,
+    }
+
+    def __init__(self, stream=None):
+        self.stream = stream
+
+    def emit(self, event, *args):
+        message = self.messages.get(event)
+        if message is not None:
+            print(message(*args), file=self.stream)
+
+
+_sink = ConsoleSink()
+
+
+def get_sink():
+    '''Return the sink used when a battle method is not given one.'''
+
+    return _sink
+
+
+def set_sink(sink):
+    '''Replace the default sink and return the previous one.
+
+    sink: any object with an emit(event, *args) method
+    '''
+
+    global _sink
+    previous = _sink
+    _sink = sink
+    return previous
@@ -0,0 +1,78 @@
+import pytest
+import io
+import sys
+import superheroes
+import events
+
+
+def capture_console_output(function_body):
+    # _io.StringIO object
+    string_io = io.StringIO()
+    sys.stdout = string_io
+    function_body()
+    sys.stdout = sys.__stdout__
+    return string_io.getvalue()
+
+
+def build_teams():
+    team_one = superheroes.Team("One")
+    jodie = superheroes.Hero("Jodie Foster")
+    jodie.add_ability(superheroes.Ability("Alien Friends", 10000))
+    team_one.add_hero(jodie)
+    team_two = superheroes.Team("Two")
+    athena = superheroes.Hero("Athena")
+    athena.add_armor(superheroes.Armor("Socks", 10))
+    team_two.add_hero(athena)
+    return team_one, team_two
+
+
+def test_console_sink_keeps_messages():
+    team_one, team_two = build_teams()
+    output = capture_console_output(lambda: team_one.attack(team_two))
+    assert "Jodie Foster won a battle." in output
+    assert "One has won!" in output
+
+
+def test_null_sink_prints_nothing():
+    team_one, team_two = build_teams()
+    output = capture_console_output(lambda: team_one.attack(team_two, events.NullSink()))
+    assert output == ""
+    assert team_two.heroes[0].deaths == 1
+
+
+def test_ring_buffer_sink_records_battle():
+    team_one, team_two = build_teams()
+    sink = events.RingBufferSink()
+    assert team_one.attack(team_two, sink) == superheroes.FIRST
+    names = [event for event, _ in sink.events()]
+    assert names == [events.BATTLE_START, events.DUEL_START, events.DUEL_END, events.TEAM_WIN]
+    winner, loser = sink.events(events.DUEL_END)[0][1]
+    assert winner.name == "Jodie Foster" and loser.name == "Athena"
+
+
+def test_ring_buffer_sink_keeps_last_events():
+    sink = events.RingBufferSink(size=2)
+    team, _ = build_teams()
+    team.add_hero(superheroes.Hero("Athena"))
+    team.add_hero(superheroes.Hero("Gamora"))
+    team.view_all_heroes(sink)
+    assert [args[0].name for _, args in sink.events()] == ["Athena", "Gamora"]
+
+
+def test_draw_events():
+    sink = events.RingBufferSink()
+    jodie = superheroes.Hero("Jodie Foster")
+    athena = superheroes.Hero("Athena")
+    assert jodie.fight(athena, sink) == superheroes.DRAW
+    assert sink.events()[0][0] == events.NO_CONTEST
+
+
+def test_set_sink():
+    sink = events.RingBufferSink()
+    previous = events.set_sink(sink)
+    try:
+        team, _ = build_teams()
+        team.surviving_victors()
+    finally:
+        events.set_sink(previous)
+    assert sink.events(events.SURVIVOR)[0][1][0].name == "Jodie Foster"
@@ -0,0 +1,201 @@
+'''Exact duel odds for Hero.fight.
+
+A duel is a Markov chain over the pair of current_health values. Every round
+the first hero's health changes by its armor block minus the opponent's
+damage, and the same happens to the opponent, independently. The solver
+pushes the probability mass through that chain round by round and collects
+the mass that reaches a win, a loss or a draw, which also gives the
+distribution of round counts.
+
+Transition tables and finished results are cached per loadout, so repeated
+queries for the same matchup are instant. Matchups whose state space is
+larger than max_states are estimated with the batch engine instead.
+'''
+
+import functools
+from collections import namedtuple
+
+import numpy as np
+
+import batch
+from superheroes import DRAW, FIRST, MAX_ROUNDS, SECOND, TIMEOUT, check_limit
+
+DuelOdds = namedtuple('DuelOdds', ['win', 'loss', 'draw', 'rounds', 'unresolved', 'exact'])
+DuelOdds.__doc__ = '''Outcome probabilities of a duel, from the first hero's side.
+
+win, loss, draw: float
+rounds: read-only array, rounds[n] is the probability the duel takes n rounds
+unresolved: float, mass that was not resolved within tolerance or that healed
+    above the tracked health ceiling
+exact: bool, False when the odds come from the Monte Carlo fallback
+'''
+
+
+def _uniform_sum_pmf(bounds):
+    '''Return (offset, pmf) of the sum of independent uniform integers.
+
+    bounds: tuple of (low, high) tuples
+    '''
+
+    pmf = np.ones(1)
+    offset = 0
+    for low, high in bounds:
+        pmf = np.convolve(pmf, np.full(high - low + 1, 1.0 / (high - low + 1)))
+        offset += low
+    return offset, pmf
+
+
+def _support(bounds):
+    return sum(high - low + 1 for low, high in bounds)
+
+
+@functools.lru_cache(maxsize=256)
+def _transition(attack, block, cap):
+    '''Return the transition table of one hero's health for one round.
+
+    Rows are the current health 1..cap. Columns are dead, health 1..cap and
+    above cap.
+
+    attack: the opponent's attack bounds
+    block: the hero's block bounds
+    cap: int, highest tracked health
+    '''
+
+    attack_offset, attack_pmf = _uniform_sum_pmf(attack)
+    block_offset, block_pmf = _uniform_sum_pmf(block)
+    # Health loss per round is damage minus block.
+    loss = np.convolve(attack_pmf, block_pmf[::-1])
+    offset = attack_offset - (block_offset + block_pmf.size - 1)
+
+    health = np.arange(1, cap + 1)
+    table = np.zeros((cap, cap + 2))
+    index = health[:, None] - health[None, :] - offset
+    valid = (index >= 0) & (index < loss.size)
+    table[:, 1:cap + 1][valid] = loss[index[valid]]
+
+    cumulative = np.concatenate(([0.0], np.cumsum(loss)))
+    # Dead when the loss is at least the current health.
+    first_lethal = np.clip(health - offset, 0, loss.size)
+    table[:, 0] = cumulative[-1] - cumulative[first_lethal]
+    # Above cap when the loss is below health - cap.
+    last_escape = np.clip(health - cap - offset, 0, loss.size)
+    table[:, cap + 1] = cumulative[last_escape]
+    table.setflags(write=False)
+    return table
+
+
+@functools.lru_cache(maxsize=1024)
+def _solve(one, two, health_one, health_two, cap_one, cap_two, tol, max_rounds):
+    '''Solve a duel between two loadouts. Loadouts are (attack, block) tuples.'''
+
+    table_one = _transition(two[0], one[1], cap_one)
+    table_two = _transition(one[0], two[1], cap_two)
+
+    state = np.zeros((cap_one, cap_two))
+    state[health_one - 1, health_two - 1] = 1.0
+    win = loss = draw = unresolved = 0.0
+    rounds = [0.0]
+    while state.sum() > tol and len(rounds) <= max_rounds:
+        full = table_one.T @ state @ table_two
+        draw += full[0, 0]
+        loss += full[0, 1:].sum()
+        win += full[1:, 0].sum()
+        unresolved += full[cap_one + 1, 1:].sum() + full[1:cap_one + 1, cap_two + 1].sum()
+        rounds.append(full[0, :].sum() + full[1:, 0].sum())
+        state = full[1:cap_one + 1, 1:cap_two + 1]
+    unresolved += state.sum()
+
+    rounds = np.array(rounds)
+    rounds.setflags(write=False)
+    return DuelOdds(win, loss, draw, rounds, unresolved, True)
+
+
+def _instant(outcome):
+    '''Odds of a duel that is decided before the first round. A stalemate
+    is reported as fully unresolved.
+    '''
+
+    rounds = np.ones(1)
+    rounds.setflags(write=False)
+    return DuelOdds(float(outcome == 'win'), float(outcome == 'loss'),
+                    float(outcome == 'draw'), rounds, float(outcome == 'stalemate'), True)
+
+
+def loadout(hero):
+    '''Return the canonical (attack bounds, block bounds) tuple of hero.'''
+
+    return (tuple(sorted(batch.attack_bounds(hero))),
+            tuple(sorted(batch.block_bounds(hero))))
+
+
+def monte_carlo(hero, opponent, samples=100000, rng=None, max_rounds=None, ceilings=None):
+    '''Estimate DuelOdds for hero against opponent with the batch engine.
+    Duels still going after max_rounds rounds, or in which a hero healed
+    above its ceiling, count as unresolved.
+
+    hero, opponent: Hero Objects
+    samples: int
+    rng: None, an int seed or a numpy.random.Generator
+    max_rounds: int (default = None, superheroes.MAX_ROUNDS)
+    ceilings: (int, int), highest tracked health of each hero
+        (default = None, no ceiling)
+    '''
+
+    result = batch.fight_many(hero, opponent, samples, rng, max_rounds, ceilings)
+    finished = result.winner != TIMEOUT
+    rounds = np.bincount(result.rounds[finished]) / samples
+    rounds.setflags(write=False)
+    return DuelOdds(float(np.mean(result.winner == FIRST)),
+                    float(np.mean(result.winner == SECOND)),
+                    float(np.mean(result.winner == DRAW)),
+                    rounds, float(np.mean(~finished)), False)
+
+
+def solve(hero, opponent, max_states=250000, heal_margin=None, tol=1e-12,
+          max_rounds=MAX_ROUNDS, samples=100000, rng=None):
+    '''Return the DuelOdds of hero fighting opponent, starting from their
+    current health.
+
+    hero, opponent: Hero Objects
+    max_states: int, largest state space solved exactly before falling back
+        to Monte Carlo
+    heal_margin: int, how far above its current health a hero's health is
+        tracked when its armor can out-block the damage it takes
+        (default = its current health)
+    tol: float, probability mass left unresolved before stopping
+    max_rounds: int, rounds solved or simulated before stopping, as in
+        Hero.fight (default = superheroes.MAX_ROUNDS)
+    samples, rng: passed to monte_carlo when falling back
+    '''
+
+    check_limit('max_rounds', max_rounds)
+    if not hero.abilities and not opponent.abilities:
+        return _instant('draw')
+    alive_one = hero.current_health > 0
+    alive_two = opponent.current_health > 0
+    if not (alive_one and alive_two):
+        return _instant('win' if alive_one else 'loss' if alive_two else 'draw')
+    if not (hero.can_hurt(opponent) or opponent.can_hurt(hero)):
+        return _instant('stalemate')
+
+    one = loadout(hero)
+    two = loadout(opponent)
+    caps = []
+    for health, block, attack in ((hero.current_health, one[1], two[0]),
+                                  (opponent.current_health, two[1], one[0])):
+        can_heal = sum(high for _, high in block) > sum(low for low, _ in attack)
+        margin = health if heal_margin is None else heal_margin
+        caps.append(health + margin if can_heal else health)
+
+    size = caps[0] * caps[1] + caps[0] * _support(two[0] + one[1]) + caps[1] * _support(one[0] + two[1])
+    if size > max_states:
+        return monte_carlo(hero, opponent, samples, rng, max_rounds, caps)
+    return _solve(one, two, hero.current_health, opponent.current_health,
+                  caps[0], caps[1], tol, max_rounds)
+
+
+def clear_cache():
+    '''Drop every cached transition table and result.'''
+
+    _transition.cache_clear()
+    _solve.cache_clear()
@@ -0,0 +1,89 @@
+import pytest
+import superheroes
+
+np = pytest.importorskip("numpy")
+import batch
+import exact
+
+
+def make_hero(name, health=100, ability=None, weapon=None, armor=None):
+    hero = superheroes.Hero(name, health)
+    if ability is not None:
+        hero.add_ability(superheroes.Ability("Power", ability))
+    if weapon is not None:
+        hero.add_weapon(superheroes.Weapon("Sword", weapon))
+    if armor is not None:
+        hero.add_armor(superheroes.Armor("Shield", armor))
+    return hero
+
+
+def test_exact_one_shot():
+    odds = exact.solve(make_hero("Jodie Foster", weapon=1000), make_hero("Athena"))
+    assert odds.win == pytest.approx(1.0)
+    assert odds.exact
+    assert odds.rounds[1] == pytest.approx(1.0)
+
+
+def test_exact_certain_draw():
+    odds = exact.solve(make_hero("Jodie Foster", weapon=1000), make_hero("Athena", weapon=1000))
+    assert odds.draw == pytest.approx(1.0)
+
+
+def test_exact_no_abilities():
+    odds = exact.solve(make_hero("Jodie Foster"), make_hero("Athena"))
+    assert odds.draw == 1.0
+    assert odds.rounds[0] == 1.0
+
+
+def test_exact_probabilities_sum_to_one():
+    one = make_hero("Athena", 60, ability=20, armor=5)
+    two = make_hero("Gamora", 50, weapon=16)
+    odds = exact.solve(one, two)
+    assert odds.win + odds.loss + odds.draw + odds.unresolved == pytest.approx(1.0)
+    assert odds.rounds.sum() == pytest.approx(1.0 - odds.unresolved)
+
+
+def test_exact_matches_batch_engine():
+    one = make_hero("Athena", 60, ability=20, armor=5)
+    two = make_hero("Gamora", 50, weapon=16)
+    odds = exact.solve(one, two)
+    result = batch.fight_many(one, two, 100000, rng=11)
+    assert odds.win == pytest.approx(np.mean(result.winner == superheroes.FIRST), abs=0.01)
+    assert odds.draw == pytest.approx(np.mean(result.winner == superheroes.DRAW), abs=0.01)
+    mean_rounds = (odds.rounds * np.arange(odds.rounds.size)).sum()
+    assert mean_rounds == pytest.approx(result.rounds.mean(), abs=0.05)
+
+
+def test_exact_is_cached():
+    exact.clear_cache()
+    one = make_hero("Athena", 40, ability=10)
+    two = make_hero("Gamora", 40, ability=12)
+    first = exact.solve(one, two)
+    second = exact.solve(make_hero("Copy", 40, ability=10), two)
+    assert first is second
+
+
+def test_exact_falls_back_to_monte_carlo():
+    one = make_hero("Athena", 5000, ability=300)
+    two = make_hero("Gamora", 5000, ability=300)
+    odds = exact.solve(one, two, max_states=1000, samples=2000, rng=1)
+    assert not odds.exact
+    assert odds.win + odds.loss + odds.draw == pytest.approx(1.0)
+
+
+def test_exact_stalemate_is_unresolved():
+    odds = exact.solve(make_hero("Glare", ability=0), make_hero("Socks", armor=10))
+    assert odds.unresolved == 1.0
+    assert odds.win == odds.loss == odds.draw == 0.0
+
+
+def test_exact_fallback_stops_at_max_rounds():
+    one = make_hero("Athena", 5000, ability=50, armor=200)
+    two = make_hero("Gamora", 5000, ability=50, armor=200)
+    odds = exact.solve(one, two, max_states=1000, max_rounds=50, samples=200, rng=1)
+    assert not odds.exact
+    assert odds.unresolved == 1.0
+    assert odds.win + odds.loss + odds.draw == 0.0
+    assert odds.rounds.sum() == 0.0
+    healed = exact.solve(one, two, max_states=1000, samples=200, rng=1)
+    assert healed.unresolved == 1.0
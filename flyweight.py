@@ -0,0 +1,144 @@
+'''Shared, immutable Ability, Weapon and Armor instances.
+
+Generated rosters repeat the same items over and over. An ItemFactory hands
+out one frozen instance per (type, name, bound) and one tuple per distinct
+loadout, so a hero built through it holds references to shared objects
+instead of its own copies. Two heroes built through the same factory have
+equal loadouts exactly when their abilities and armors are the same tuples,
+which same_loadout() checks by identity.
+
+Shared items refuse attribute changes. Heroes holding a shared loadout
+tuple still accept add_ability, add_weapon and add_armor, which give the
+hero its own list first.
+
+    items = ItemFactory()
+    team, _ = roster.load_team('big.csv', factory=items)
+'''
+
+from superheroes import Ability, Armor, Weapon
+
+
+class _Frozen:
+    '''Mixin that makes a slotted item immutable after the factory builds it.'''
+
+    __slots__ = ()
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f'{type(self).__name__} is shared and cannot be changed')
+
+    def __delattr__(self, name):
+        raise AttributeError(f'{type(self).__name__} is shared and cannot be changed')
+
+    def __reduce__(self):
+        return (_build, (type(self), self.name, self.bounds()[1]))
+
+
+class SharedAbility(_Frozen, Ability):
+    __slots__ = ()
+
+
+class SharedWeapon(_Frozen, Weapon):
+    __slots__ = ()
+
+
+class SharedArmor(_Frozen, Armor):
+    __slots__ = ()
+
+
+# The shared class and value attribute for every item class.
+SHARED = {
+    Ability: (SharedAbility, 'max_damage'),
+    Weapon: (SharedWeapon, 'max_damage'),
+    Armor: (SharedArmor, 'max_block'),
+    SharedAbility: (SharedAbility, 'max_damage'),
+    SharedWeapon: (SharedWeapon, 'max_damage'),
+    SharedArmor: (SharedArmor, 'max_block'),
+}
+
+
+def _build(shared_class, name, value):
+    item = shared_class.__new__(shared_class)
+    object.__setattr__(item, 'name', name)
+    object.__setattr__(item, SHARED[shared_class][1], value)
+    return item
+
+
+class ItemFactory:
+    '''Interns items by (type, name, bound) and loadouts by their items.'''
+
+    def __init__(self):
+        self._items = {}
+        self._loadouts = {}
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._items)
+
+    def _item(self, item_class, name, value):
+        shared_class, _ = SHARED[item_class]
+        key = (shared_class, name, value)
+        item = self._items.get(key)
+        if item is None:
+            item = self._items[key] = _build(shared_class, name, value)
+            self.misses += 1
+        else:
+            self.hits += 1
+        return item
+
+    def ability(self, name, max_damage):
+        return self._item(Ability, name, max_damage)
+
+    def weapon(self, name, max_damage):
+        return self._item(Weapon, name, max_damage)
+
+    def armor(self, name, max_block):
+        return self._item(Armor, name, max_block)
+
+    def intern(self, item):
+        '''Return the shared instance equal to item.
+
+        item: Ability, Weapon or Armor Object
+        '''
+
+        item_class = type(item)
+        return self._item(item_class, item.name, getattr(item, SHARED[item_class][1]))
+
+    def loadout(self, items):
+        '''Return the shared tuple of the shared instances of items, in order.
+
+        items: iterable of Ability, Weapon or Armor Objects
+        '''
+
+        loadout = tuple(self.intern(item) for item in items)
+        return self._loadouts.setdefault(loadout, loadout)
+
+    def intern_hero(self, hero):
+        '''Point hero's abilities and armors at shared loadout tuples and
+        return the hero.
+
+        hero: Hero Object
+        '''
+
+        hero.abilities = self.loadout(hero.abilities)
+        hero.armors = self.loadout(hero.armors)
+        return hero
+
+    def intern_team(self, team):
+        '''Intern the loadout of every hero on team.'''
+
+        for hero in team.heroes:
+            self.intern_hero(hero)
+        return team
+
+    def stats(self):
+        return {'items': len(self._items), 'loadouts': len(self._loadouts),
+                'hits': self.hits, 'misses': self.misses}
+
+
+def same_loadout(hero, other):
+    '''Return True if two heroes interned by the same factory have equal
+    loadouts. Costs two identity checks.
+    '''
+
+    return hero.abilities is other.abilities and hero.armors is other.armors
@@ -0,0 +1,56 @@
+import io
+import pickle
+import pytest
+import flyweight
+import roster
+import superheroes
+
+
+def test_equal_items_are_one_frozen_instance():
+    items = flyweight.ItemFactory()
+    sword = items.weapon("Laser Sword", 500)
+    assert items.weapon("Laser Sword", 500) is sword
+    assert items.ability("Laser Sword", 500) is not sword
+    assert items.intern(superheroes.Weapon("Laser Sword", 500)) is sword
+    assert isinstance(sword, superheroes.Weapon)
+    assert sword.bounds() == (250, 500)
+    assert len(items) == 2
+    assert items.stats()["hits"] == 2
+    with pytest.raises(AttributeError):
+        sword.max_damage = 1
+    with pytest.raises(AttributeError):
+        items.armor("Thick Fog", 300).name = "Thin Fog"
+
+
+def test_shared_loadouts_make_equality_an_identity_check():
+    items = flyweight.ItemFactory()
+    athena = roster.build_hero("Athena", 100, [("Science", 40)], [("Sword", 60)], [("Fog", 30)], items)
+    gamora = roster.build_hero("Gamora", 90, [("Science", 40)], [("Sword", 60)], [("Fog", 30)], items)
+    other = roster.build_hero("Other", 90, [("Science", 41)], [("Sword", 60)], [("Fog", 30)], items)
+    assert flyweight.same_loadout(athena, gamora)
+    assert not flyweight.same_loadout(athena, other)
+    assert athena.abilities[1] is other.abilities[1]
+
+
+def test_adding_items_copies_a_shared_loadout():
+    items = flyweight.ItemFactory()
+    one = items.intern_hero(roster.build_hero("One", 100, [("Punch", 10)]))
+    two = items.intern_hero(roster.build_hero("Two", 100, [("Punch", 10)]))
+    assert one.abilities is two.abilities
+    one.add_weapon(superheroes.Weapon("Sword", 20))
+    one.add_armor(superheroes.Armor("Shield", 5))
+    assert len(one.abilities) == 2 and len(two.abilities) == 1
+    assert two.armors == ()
+
+
+def test_interned_heroes_fight_and_pickle():
+    items = flyweight.ItemFactory()
+    csv = "name,health,abilities,weapons,armors\nA,100,Punch:50,,Fog:5\nB,100,Punch:50,,Fog:5\n"
+    team, report = roster.load_team(io.StringIO(csv), format="csv", factory=items)
+    first, second = team.heroes
+    assert first.abilities is second.abilities
+    copy = pickle.loads(pickle.dumps(team))
+    assert type(copy.heroes[0].abilities[0]) is flyweight.SharedAbility
+    outcome = first.fight(second, superheroes.events.NullSink(), 1)
+    assert outcome in (superheroes.DRAW, superheroes.FIRST, superheroes.SECOND)
+    assert not (first.is_alive() and second.is_alive())
@@ -298,3 +298,124 @@ def test_print_heroes():
 
     assert "Jodie Foster" in output_string
     assert "Athena" in output_string
+
+
+def test_team_get_hero():
+    team = superheroes.Team("One")
+    jodie = superheroes.Hero("Jodie Foster")
+    team.add_hero(jodie)
+    assert team.get_hero("Jodie Foster") is jodie
+    assert team.get_hero("Athena") is None
+
+
+def test_team_remove_duplicate_names():
+    team = superheroes.Team("One")
+    for _ in range(3):
+        team.add_hero(superheroes.Hero("Athena"))
+    team.add_hero(superheroes.Hero("Jodie Foster"))
+    assert team.remove_hero("Athena") == 3
+    assert [hero.name for hero in team.heroes] == ["Jodie Foster"]
+    assert team.get_hero("Athena") is None
+
+
+def test_team_remove_heroes_bulk():
+    team = superheroes.Team("One")
+    for index in range(1000):
+        team.add_hero(superheroes.Hero(f"Hero {index}"))
+    removed = team.remove_heroes(f"Hero {index}" for index in range(0, 1000, 2))
+    assert removed == 500
+    assert len(team.heroes) == 500
+    assert team.heroes[0].name == "Hero 1"
+    assert len(team._alive) == 500
+
+
+def test_hero_fight_stalemate():
+    jodie = superheroes.Hero("Jodie Foster")
+    jodie.add_ability(superheroes.Ability("Harmless Glare", 0))
+    athena = superheroes.Hero("Athena")
+    athena.add_armor(superheroes.Armor("Socks", 10))
+    output = capture_console_output(lambda: jodie.fight(athena))
+    assert "cannot hurt each other" in output
+    assert jodie.fight(athena, superheroes.events.NullSink()) == superheroes.STALEMATE
+    assert jodie.kills == 0 and athena.deaths == 0
+
+
+def test_hero_fight_timeout():
+    jodie = superheroes.Hero("Jodie Foster", 10000)
+    jodie.add_ability(superheroes.Ability("Poke", 2))
+    athena = superheroes.Hero("Athena", 10000)
+    athena.add_armor(superheroes.Armor("Wall of Walls", 1000))
+    result = jodie.fight(athena, superheroes.events.NullSink(), max_rounds=25)
+    assert result == superheroes.TIMEOUT
+    assert jodie.is_alive() and athena.is_alive()
+    assert athena.deaths == 0
+
+
+def healer(name):
+    hero = superheroes.Hero(name)
+    hero.add_ability(superheroes.Ability("Jab", 50))
+    hero.add_armor(superheroes.Armor("Bulwark", 200))
+    return hero
+
+
+def test_hero_fight_default_round_cap():
+    jodie = healer("Jodie Foster")
+    athena = healer("Athena")
+    assert jodie.fight(athena, superheroes.events.NullSink(), rng=1) == superheroes.TIMEOUT
+    assert jodie.is_alive() and athena.is_alive()
+
+
+def test_team_attack_default_duel_cap():
+    team_one = superheroes.Team("One")
+    team_one.add_hero(healer("Jodie Foster"))
+    team_two = superheroes.Team("Two")
+    team_two.add_hero(healer("Athena"))
+    assert team_one.attack(team_two, superheroes.events.NullSink(), rng=1) == superheroes.TIMEOUT
+
+
+def test_team_attack_stalemate():
+    team_one = superheroes.Team("One")
+    team_one.add_hero(superheroes.Hero("Jodie Foster"))
+    team_two = superheroes.Team("Two")
+    team_two.add_hero(superheroes.Hero("Athena"))
+    assert team_one.attack(team_two, superheroes.events.NullSink()) == superheroes.STALEMATE
+
+
+def test_team_attack_max_duels():
+    team_one = superheroes.Team("One")
+    jodie = superheroes.Hero("Jodie Foster", 10000)
+    jodie.add_ability(superheroes.Ability("Poke", 2))
+    team_one.add_hero(jodie)
+    team_two = superheroes.Team("Two")
+    athena = superheroes.Hero("Athena", 10000)
+    athena.add_armor(superheroes.Armor("Wall of Walls", 1000))
+    team_two.add_hero(athena)
+    result = team_one.attack(team_two, superheroes.events.NullSink(), max_rounds=10, max_duels=3)
+    assert result == superheroes.TIMEOUT
+
+
+def test_team_attack_many_harmless_heroes():
+    team_one = superheroes.Team("One")
+    team_two = superheroes.Team("Two")
+    for index in range(50):
+        team_one.add_hero(superheroes.Hero(f"Bystander {index}"))
+        team_two.add_hero(superheroes.Hero(f"Onlooker {index}"))
+    jodie = superheroes.Hero("Jodie Foster")
+    jodie.add_ability(superheroes.Ability("Punch", 1000))
+    team_one.add_hero(jodie)
+    assert team_one.attack(team_two, superheroes.events.NullSink(), rng=2) == superheroes.FIRST
+    assert jodie.kills == 50
+
+
+def test_negative_limits_are_rejected():
+    jodie = healer("Jodie Foster")
+    athena = healer("Athena")
+    with pytest.raises(ValueError, match="max_rounds"):
+        jodie.fight(athena, superheroes.events.NullSink(), max_rounds=-1)
+    team_one = superheroes.Team("One")
+    team_one.add_hero(jodie)
+    team_two = superheroes.Team("Two")
+    team_two.add_hero(athena)
+    with pytest.raises(ValueError, match="max_duels"):
+        team_one.attack(team_two, superheroes.events.NullSink(), max_duels=-3)
+    assert jodie.current_health == athena.current_health == 100
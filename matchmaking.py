@@ -0,0 +1,239 @@
+'''Power ratings and a sorted rating index for balanced matchmaking.
+
+A hero's power rating comes straight from its loadout bounds, with no
+simulation. Each round a hero deals its expected attack and soaks up its
+expected block, so its per-round swing is expected damage plus expected
+block. Holding out longer is worth as much as hitting harder, so the rating
+is the geometric mean of that swing and starting_health:
+
+    rating = sqrt((expected damage + expected block) * starting_health)
+
+Heroes with equal ratings are roughly even, and the ratio of two ratings
+grows with how lopsided their fight is.
+
+RatingIndex keeps heroes sorted by rating. It finds the k closest-rated
+heroes in O(log n + k) and follows loadout and roster changes through the
+Hero and Team observer hooks. The hooks hold the index only weakly, so
+heroes and teams never keep an index alive or carry it when pickled.
+'''
+
+import weakref
+from bisect import bisect_left
+from itertools import count
+from math import sqrt
+
+
+def expected_damage(hero):
+    '''Return the mean of hero.attack() from its ability and weapon bounds.'''
+
+    return sum((low + high) / 2 for low, high in (item.bounds() for item in hero.abilities))
+
+
+def expected_block(hero):
+    '''Return the mean of hero.defend() from its armor bounds.'''
+
+    return sum((low + high) / 2 for low, high in (item.bounds() for item in hero.armors))
+
+
+def power_rating(hero):
+    '''Return the power rating of hero.
+
+    hero: Hero Object
+    '''
+
+    return sqrt(max(0.0, (expected_damage(hero) + expected_block(hero)) * hero.starting_health))
+
+
+def team_rating(team):
+    '''Return the power rating of a whole team, the rating of a single hero
+    with the team's summed health and summed swing.
+
+    team: Team Object
+    '''
+
+    heroes = team.heroes
+    swing = sum(expected_damage(hero) + expected_block(hero) for hero in heroes)
+    health = sum(hero.starting_health for hero in heroes)
+    return sqrt(max(0.0, swing * health))
+
+
+class _Watcher:
+    '''The observer a RatingIndex registers on its heroes and teams. It
+    reaches the index through a weak reference and pickles as a detached
+    watcher that ignores every change.
+
+    index: RatingIndex Object, or None for a detached watcher
+    '''
+
+    __slots__ = ('index',)
+
+    def __init__(self, index=None):
+        self.index = None if index is None else weakref.ref(index)
+
+    def __reduce__(self):
+        return (_Watcher, ())
+
+    def _target(self):
+        return None if self.index is None else self.index()
+
+    def loadout_changed(self, hero):
+        index = self._target()
+        if index is not None:
+            index.update(hero)
+
+    def hero_added(self, team, hero):
+        index = self._target()
+        if index is not None:
+            index.add(hero)
+
+    def hero_removed(self, team, hero):
+        index = self._target()
+        if index is not None:
+            index.remove(hero)
+
+
+class RatingIndex:
+    '''Heroes kept in order of power rating.
+
+    heroes: iterable of Hero Objects to start with
+    rate: function giving the rating of a hero (default = power_rating)
+
+    add() and remove() cost O(log n) to find the spot plus a list shift.
+    Ratings are computed once when a hero is added and again when its
+    loadout changes. Call update(hero) after changing starting_health.
+    '''
+
+    def __init__(self, heroes=(), rate=power_rating):
+        self.rate = rate
+        self._keys = []
+        self._heroes = []
+        self._key_of = {}
+        self._serial = count()
+        self._watcher = _Watcher(self)
+        self.extend(heroes)
+
+    def __len__(self):
+        return len(self._heroes)
+
+    def __contains__(self, hero):
+        return hero in self._key_of
+
+    def __iter__(self):
+        '''Heroes from lowest to highest rating.'''
+
+        return iter(list(self._heroes))
+
+    def rating(self, hero):
+        '''Return the indexed rating of hero.'''
+
+        return self._key_of[hero][0]
+
+    def add(self, hero):
+        '''Index hero and follow its loadout changes. Adding an indexed hero
+        refreshes its rating.
+        '''
+
+        if hero in self._key_of:
+            self._take_out(hero)
+        key = (self.rate(hero), next(self._serial))
+        position = bisect_left(self._keys, key)
+        self._keys.insert(position, key)
+        self._heroes.insert(position, hero)
+        self._key_of[hero] = key
+        hero.add_observer(self._watcher)
+
+    def extend(self, heroes):
+        '''Index many heroes with one sort instead of one insert each.'''
+
+        added = []
+        for hero in heroes:
+            if hero in self._key_of:
+                self._take_out(hero)
+            key = (self.rate(hero), next(self._serial))
+            self._key_of[hero] = key
+            added.append((key, hero))
+            hero.add_observer(self._watcher)
+        if not added:
+            return
+        entries = sorted(list(zip(self._keys, self._heroes)) + added, key=lambda entry: entry[0])
+        self._keys = [key for key, _ in entries]
+        self._heroes = [hero for _, hero in entries]
+
+    def remove(self, hero):
+        '''Drop hero from the index. Returns False if it was not indexed.'''
+
+        if hero not in self._key_of:
+            return False
+        self._take_out(hero)
+        hero.remove_observer(self._watcher)
+        return True
+
+    def update(self, hero):
+        '''Recompute the rating of an indexed hero.'''
+
+        if hero in self._key_of:
+            self.add(hero)
+
+    def _take_out(self, hero):
+        position = bisect_left(self._keys, self._key_of.pop(hero))
+        del self._keys[position]
+        del self._heroes[position]
+
+    def watch(self, team):
+        '''Index every hero of team and follow the team's roster changes.
+
+        team: Team Object
+        '''
+
+        self.extend(team.heroes)
+        team.add_observer(self._watcher)
+
+    def unwatch(self, team):
+        '''Stop following team and drop its heroes from the index.'''
+
+        team.remove_observer(self._watcher)
+        for hero in team.heroes:
+            self.remove(hero)
+
+    def nearest(self, target, k=1):
+        '''Return up to k heroes whose ratings are closest to target, closest
+        first. A hero target is never returned as its own match.
+
+        target: Hero Object or a rating
+        k: int (default = 1)
+        '''
+
+        if target in self._key_of:
+            position = bisect_left(self._keys, self._key_of[target])
+            rating = self._keys[position][0]
+            left, right = position - 1, position + 1
+        else:
+            rating = target if isinstance(target, (int, float)) else self.rate(target)
+            position = bisect_left(self._keys, (rating,))
+            left, right = position - 1, position
+        matches = []
+        keys = self._keys
+        while len(matches) < k and (left >= 0 or right < len(keys)):
+            if right >= len(keys) or (left >= 0 and rating - keys[left][0] <= keys[right][0] - rating):
+                matches.append(self._heroes[left])
+                left -= 1
+            else:
+                matches.append(self._heroes[right])
+                right += 1
+        return matches
+
+    def within(self, low, high):
+        '''Return the heroes rated from low to high, lowest first.'''
+
+        start = bisect_left(self._keys, (low,))
+        end = bisect_left(self._keys, (high, float('inf')))
+        return self._heroes[start:end]
+
+    def balanced_pairs(self):
+        '''Pair neighbouring heroes in rating order, which minimises the
+        total rating gap over all pairings. With an odd count the
+        highest-rated hero is left out.
+        '''
+
+        heroes = self._heroes
+        return [(heroes[index], heroes[index + 1]) for index in range(0, len(heroes) - 1, 2)]
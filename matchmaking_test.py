@@ -0,0 +1,116 @@
+import gc
+import pickle
+import random
+import weakref
+import matchmaking
+import superheroes
+
+
+def make_hero(name, health=100, max_damage=40, max_block=None):
+    hero = superheroes.Hero(name, health)
+    hero.add_ability(superheroes.Ability("Punch", max_damage))
+    if max_block is not None:
+        hero.add_armor(superheroes.Armor("Shield", max_block))
+    return hero
+
+
+def test_power_rating_from_bounds():
+    hero = make_hero("Athena", 100, 40, 20)
+    hero.add_weapon(superheroes.Weapon("Sword", 20))
+    assert matchmaking.expected_damage(hero) == 20 + 15
+    assert matchmaking.expected_block(hero) == 10
+    assert matchmaking.power_rating(hero) == (45 * 100) ** 0.5
+    team = superheroes.Team("One")
+    team.add_hero(make_hero("A", 100, 40))
+    team.add_hero(make_hero("B", 300, 40))
+    assert matchmaking.team_rating(team) == (40 * 400) ** 0.5
+
+
+def test_nearest_matches_brute_force():
+    rng = random.Random(4)
+    heroes = [make_hero(f"Hero {index}", rng.randint(50, 500), rng.randint(1, 100))
+              for index in range(200)]
+    index = matchmaking.RatingIndex(heroes)
+    for hero in heroes[:20]:
+        rating = matchmaking.power_rating(hero)
+        expected = sorted((other for other in heroes if other is not hero),
+                          key=lambda other: abs(matchmaking.power_rating(other) - rating))
+        found = index.nearest(hero, 5)
+        assert len(found) == 5
+        assert hero not in found
+        assert [abs(index.rating(other) - rating) for other in found] == \
+            [abs(matchmaking.power_rating(other) - rating) for other in expected[:5]]
+    assert index.nearest(0.0, 1)[0] is min(heroes, key=matchmaking.power_rating)
+    assert len(index.nearest(heroes[0], 1000)) == 199
+
+
+def test_index_follows_loadout_changes():
+    weak, middle, strong = make_hero("Weak", max_damage=10), make_hero("Middle", max_damage=40), \
+        make_hero("Strong", max_damage=90)
+    index = matchmaking.RatingIndex([weak, middle, strong])
+    assert list(index) == [weak, middle, strong]
+    weak.add_weapon(superheroes.Weapon("Cannon", 400))
+    assert list(index) == [middle, strong, weak]
+    assert index.nearest(strong, 1) == [middle]
+    middle.starting_health = 10000
+    index.update(middle)
+    assert list(index)[-1] is middle
+    assert index.remove(middle)
+    middle.add_ability(superheroes.Ability("Kick", 5))
+    assert middle not in index
+    assert not index.remove(middle)
+
+
+def test_index_follows_roster_changes():
+    one, two = superheroes.Team("One"), superheroes.Team("Two")
+    athena = make_hero("Athena")
+    one.add_hero(athena)
+    index = matchmaking.RatingIndex()
+    index.watch(one)
+    assert athena in index
+    gamora = make_hero("Gamora", max_damage=80)
+    one.add_hero(gamora)
+    assert index.nearest(athena) == [gamora]
+    two.add_hero(gamora)
+    assert gamora not in index
+    one.remove_hero("Athena")
+    assert len(index) == 0
+    one.add_hero(athena)
+    index.unwatch(one)
+    assert len(index) == 0
+
+
+def test_within_and_balanced_pairs():
+    heroes = [make_hero(f"Hero {damage}", 100, damage) for damage in (4, 9, 16, 25, 36)]
+    index = matchmaking.RatingIndex(reversed(heroes))
+    assert index.within(25, 40) == heroes[2:4]
+    assert index.balanced_pairs() == [(heroes[0], heroes[1]), (heroes[2], heroes[3])]
+
+
+def test_pickled_team_leaves_the_index_behind():
+    team = superheroes.Team("One")
+    for index in range(4):
+        team.add_hero(make_hero(f"Hero {index}"))
+    alone = len(pickle.dumps(team))
+    index = matchmaking.RatingIndex(make_hero(f"Spare {number}") for number in range(200))
+    index.watch(team)
+    assert len(pickle.dumps(team)) < alone + 200
+    copy = pickle.loads(pickle.dumps(team))
+    copy.add_hero(make_hero("Zeus"))
+    copy.heroes[0].add_ability(superheroes.Ability("Kick", 10))
+    assert len(index) == 204
+    assert [hero.name for hero in copy.heroes] == [f"Hero {number}" for number in range(4)] + ["Zeus"]
+
+
+def test_watched_heroes_do_not_keep_the_index_alive():
+    team = superheroes.Team("One")
+    team.add_hero(make_hero("Athena"))
+    index = matchmaking.RatingIndex()
+    index.watch(team)
+    reference = weakref.ref(index)
+    del index
+    gc.collect()
+    assert reference() is None
+    team.add_hero(make_hero("Gamora"))
+    team.heroes[0].add_ability(superheroes.Ability("Kick", 10))
+    assert len(team.heroes) == 2
@@ -0,0 +1,193 @@
+'''Cache of duel statistics keyed by canonical loadout signatures.
+
+Two heroes whose abilities, weapons and armors have the same bounds and who
+start with the same health fight exactly alike, whatever their names or the
+order of their items. loadout_signature() reduces a hero to that hashable
+description, and MatchupCache maps pairs of signatures to duel statistics
+with LRU eviction, an optional TTL, hit and miss counts and a pickle file to
+warm it from at startup.
+
+Pairs are stored once, in signature order. The reverse matchup is the same
+entry with win and loss swapped.
+
+    cache = MatchupCache(maxsize=10000, ttl=3600)
+    cache.warm('matchups.pickle')
+    odds = cache.lookup(hero, opponent)
+    cache.save('matchups.pickle')
+'''
+
+import os
+import pickle
+import time
+from collections import OrderedDict
+
+from superheroes import Ability, Armor, Hero, Weapon
+
+VERSION = 1
+
+
+def loadout_signature(hero):
+    '''Return the canonical (starting_health, attack bounds, block bounds)
+    tuple of hero, with the bounds sorted.
+
+    hero: Hero Object
+    '''
+
+    return (hero.starting_health,
+            tuple(sorted(item.bounds() for item in hero.abilities)),
+            tuple(sorted(item.bounds() for item in hero.armors)))
+
+
+def hero_from_signature(signature, name='Signature'):
+    '''Build a Hero that fights exactly like every hero with signature.'''
+
+    health, attack, block = signature
+    hero = Hero(name, health)
+    for low, high in attack:
+        hero.abilities.append(Weapon('Weapon', high) if low else Ability('Ability', high))
+    for _, high in block:
+        hero.armors.append(Armor('Armor', high))
+    return hero
+
+
+def duel_odds(one, two):
+    '''Default statistics for a signature pair: exact.solve() odds of fresh
+    heroes. Needs NumPy.
+    '''
+
+    import exact
+    return exact.solve(hero_from_signature(one), hero_from_signature(two))
+
+
+def _swapped(stats):
+    return stats._replace(win=stats.loss, loss=stats.win)
+
+
+class MatchupCache:
+    '''Bounded LRU cache from signature pairs to duel statistics.
+
+    maxsize: int, most entries kept (default = 4096)
+    ttl: float, seconds an entry stays valid, or None to keep it until it
+        is evicted
+    compute: function(signature, signature) returning statistics as a
+        namedtuple with win and loss fields (default = duel_odds)
+    clock: function returning the time in seconds (default = time.time,
+        so ages carry over through save() and warm())
+    '''
+
+    def __init__(self, maxsize=4096, ttl=None, compute=duel_odds, clock=time.time):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.compute = compute
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self._entries = OrderedDict()
+
+    def __len__(self):
+        return len(self._entries)
+
+    @property
+    def hit_rate(self):
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def _key(self, one, two):
+        '''Return (key, swapped) for the signature pair.'''
+
+        if two < one:
+            return (two, one), True
+        return (one, two), False
+
+    def get(self, one, two):
+        '''Return the statistics cached for signatures one against two, or
+        None. Counts a hit or a miss.
+        '''
+
+        key, swapped = self._key(one, two)
+        entry = self._entries.get(key)
+        if entry is not None and self.ttl is not None and self.clock() - entry[0] > self.ttl:
+            del self._entries[key]
+            self.expirations += 1
+            entry = None
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._entries.move_to_end(key)
+        return _swapped(entry[1]) if swapped else entry[1]
+
+    def put(self, one, two, stats):
+        '''Cache stats for signatures one against two.'''
+
+        key, swapped = self._key(one, two)
+        self._entries[key] = (self.clock(), _swapped(stats) if swapped else stats)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def lookup(self, hero, opponent):
+        '''Return the statistics of hero fighting opponent from full health,
+        computing and caching them on a miss.
+
+        hero, opponent: Hero Objects
+        '''
+
+        one = loadout_signature(hero)
+        two = loadout_signature(opponent)
+        stats = self.get(one, two)
+        if stats is None:
+            key, swapped = self._key(one, two)
+            stats = self.compute(*key)
+            self.put(*key, stats)
+            if swapped:
+                stats = _swapped(stats)
+        return stats
+
+    def clear(self):
+        self._entries.clear()
+
+    def stats(self):
+        '''Return the cache counters as a dict.'''
+
+        return {'size': len(self._entries), 'maxsize': self.maxsize, 'hits': self.hits,
+                'misses': self.misses, 'hit_rate': self.hit_rate,
+                'evictions': self.evictions, 'expirations': self.expirations}
+
+    def save(self, path):
+        '''Write every entry to path, replacing it atomically.'''
+
+        temporary = f'{path}.tmp'
+        with open(temporary, 'wb') as output:
+            pickle.dump((VERSION, list(self._entries.items())), output,
+                        protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temporary, path)
+
+    def warm(self, path):
+        '''Load the entries saved in path, skipping expired ones, and return
+        how many of them are still cached once the oldest entries beyond
+        maxsize have been evicted. A missing file loads nothing.
+        '''
+
+        if not os.path.exists(path):
+            return 0
+        with open(path, 'rb') as source:
+            version, entries = pickle.load(source)
+        if version != VERSION:
+            return 0
+        now = self.clock()
+        loaded = set()
+        for key, (stamp, stats) in entries:
+            if self.ttl is not None and now - stamp > self.ttl:
+                continue
+            self._entries[key] = (stamp, stats)
+            self._entries.move_to_end(key)
+            loaded.add(key)
+            while len(self._entries) > self.maxsize:
+                evicted, _ = self._entries.popitem(last=False)
+                self.evictions += 1
+                loaded.discard(evicted)
+        return len(loaded)
@@ -0,0 +1,117 @@
+from collections import namedtuple
+import pytest
+import matchups
+import superheroes
+
+Odds = namedtuple("Odds", ["win", "loss", "draw"])
+
+
+def make_hero(name, health=100, abilities=(), weapons=(), armors=()):
+    hero = superheroes.Hero(name, health)
+    for value in abilities:
+        hero.add_ability(superheroes.Ability(f"{name} ability", value))
+    for value in weapons:
+        hero.add_weapon(superheroes.Weapon(f"{name} weapon", value))
+    for value in armors:
+        hero.add_armor(superheroes.Armor(f"{name} armor", value))
+    return hero
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def counting_compute(calls):
+    def compute(one, two):
+        calls.append((one, two))
+        return Odds(one[0] / (one[0] + two[0]), two[0] / (one[0] + two[0]), 0.0)
+    return compute
+
+
+def test_signature_ignores_names_and_order():
+    one = make_hero("Athena", 120, [40, 10], [30], [5, 7])
+    two = make_hero("Gamora", 120, [10, 40], [30], [7, 5])
+    assert matchups.loadout_signature(one) == matchups.loadout_signature(two)
+    assert hash(matchups.loadout_signature(one)) == hash(matchups.loadout_signature(two))
+    assert matchups.loadout_signature(one) != matchups.loadout_signature(make_hero("X", 100, [40, 10], [30], [5, 7]))
+    rebuilt = matchups.hero_from_signature(matchups.loadout_signature(one))
+    assert matchups.loadout_signature(rebuilt) == matchups.loadout_signature(one)
+
+
+def test_repeat_and_reverse_matchups_are_lookups():
+    calls = []
+    cache = matchups.MatchupCache(compute=counting_compute(calls))
+    strong, weak = make_hero("Strong", 300, [50]), make_hero("Weak", 100, [50])
+    first = cache.lookup(strong, weak)
+    assert first.win == 0.75
+    assert cache.lookup(make_hero("Other", 300, [50]), weak) == first
+    reverse = cache.lookup(weak, strong)
+    assert (reverse.win, reverse.loss) == (first.loss, first.win)
+    assert len(calls) == 1
+    assert (cache.hits, cache.misses) == (2, 1)
+    assert cache.stats()["hit_rate"] == pytest.approx(2 / 3)
+
+
+def test_lru_eviction_and_ttl():
+    clock = Clock()
+    cache = matchups.MatchupCache(maxsize=2, ttl=10, compute=counting_compute([]), clock=clock)
+    heroes = [make_hero(f"Hero {index}", 100 + index, [10]) for index in range(4)]
+    cache.lookup(heroes[0], heroes[1])
+    cache.lookup(heroes[0], heroes[2])
+    cache.lookup(heroes[0], heroes[1])
+    cache.lookup(heroes[0], heroes[3])
+    assert cache.evictions == 1
+    signature = matchups.loadout_signature
+    assert cache.get(signature(heroes[0]), signature(heroes[2])) is None
+    clock.now = 11
+    assert cache.get(signature(heroes[0]), signature(heroes[1])) is None
+    assert cache.expirations == 1
+
+
+def test_save_and_warm(tmp_path):
+    path = str(tmp_path / "matchups.pickle")
+    clock = Clock()
+    cache = matchups.MatchupCache(ttl=100, compute=counting_compute([]), clock=clock)
+    heroes = [make_hero(f"Hero {index}", 100 + index, [10]) for index in range(3)]
+    cache.lookup(heroes[0], heroes[1])
+    clock.now = 50
+    cache.lookup(heroes[0], heroes[2])
+    cache.save(path)
+
+    clock.now = 120
+    calls = []
+    warmed = matchups.MatchupCache(ttl=100, compute=counting_compute(calls), clock=clock)
+    assert warmed.warm(path) == 1
+    warmed.lookup(heroes[2], heroes[0])
+    assert calls == []
+    assert warmed.warm(str(tmp_path / "missing.pickle")) == 0
+
+
+def test_warm_counts_entries_it_keeps(tmp_path):
+    path = str(tmp_path / "matchups.pickle")
+    cache = matchups.MatchupCache(compute=counting_compute([]))
+    heroes = [make_hero(f"Hero {index}", 100 + index, [10]) for index in range(4)]
+    for opponent in heroes[1:]:
+        cache.lookup(heroes[0], opponent)
+    cache.save(path)
+
+    small = matchups.MatchupCache(maxsize=2, compute=counting_compute([]))
+    small.lookup(heroes[1], heroes[2])
+    assert small.warm(path) == 2
+    assert small.evictions == 2
+    assert len(small) == 2
+
+
+def test_default_statistics_are_exact_odds():
+    pytest.importorskip("numpy")
+    cache = matchups.MatchupCache()
+    strong = make_hero("Strong", 100, [60], armors=[5])
+    weak = make_hero("Weak", 50, [20])
+    odds = cache.lookup(strong, weak)
+    assert odds.exact
+    assert odds.win + odds.loss + odds.draw + odds.unresolved == pytest.approx(1.0)
+    assert cache.lookup(weak, strong).loss == odds.win
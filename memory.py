@@ -0,0 +1,141 @@
+'''Measures how many bytes a Hero with a typical loadout takes in memory.
+
+Compares the __slots__ classes in superheroes with equivalent classes that
+keep their attributes in a per-instance __dict__, the way they did before,
+and rosters of repeated items built with and without a flyweight
+ItemFactory.
+
+    python memory.py [heroes]
+'''
+
+import sys
+import tracemalloc
+
+import roster
+import superheroes
+from flyweight import ItemFactory
+
+
+class _DictAbility:
+    def __init__(self, name, max_damage):
+        self.name = name
+        self.max_damage = max_damage
+
+
+class _DictWeapon(_DictAbility):
+    pass
+
+
+class _DictArmor:
+    def __init__(self, name, max_block):
+        self.name = name
+        self.max_block = max_block
+
+
+class _DictHero:
+    def __init__(self, name, starting_health=100):
+        self.name = name
+        self.starting_health = starting_health
+        self.current_health = starting_health
+        self.abilities = []
+        self.armors = []
+        self.deaths = 0
+        self.kills = 0
+        self.use_tables = False
+        self._attack_table = None
+        self._block_table = None
+        self.team = None
+        self._observers = ()
+
+
+SLOTTED = (superheroes.Hero, superheroes.Ability, superheroes.Weapon, superheroes.Armor)
+DICT_BASED = (_DictHero, _DictAbility, _DictWeapon, _DictArmor)
+
+
+def build_hero(classes, index, abilities=2, weapons=1, armors=1):
+    '''Build one hero with the given classes and loadout. Names and values
+    are distinct per hero so nothing is shared between heroes.
+
+    classes: (hero, ability, weapon, armor) classes
+    index: int
+    '''
+
+    hero_class, ability_class, weapon_class, armor_class = classes
+    hero = hero_class(f'Hero {index}', 100 + index)
+    for number in range(abilities):
+        hero.abilities.append(ability_class(f'Ability {index}.{number}', 1000 + index))
+    for number in range(weapons):
+        hero.abilities.append(weapon_class(f'Weapon {index}.{number}', 2000 + index))
+    for number in range(armors):
+        hero.armors.append(armor_class(f'Armor {index}.{number}', 3000 + index))
+    return hero
+
+
+def bytes_per_hero(classes, count=10000, **loadout):
+    '''Return the average number of bytes allocated per hero.
+
+    classes: (hero, ability, weapon, armor) classes
+    count: int, heroes built for the measurement
+    loadout: abilities, weapons and armors counts passed to build_hero
+    '''
+
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    heroes = [build_hero(classes, index, **loadout) for index in range(count)]
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del heroes
+    return (after - before) / count
+
+
+def bytes_per_roster_hero(count=10000, distinct=10, interned=False):
+    '''Return the average number of bytes allocated per hero of a roster
+    whose items and loadouts repeat, each drawn from distinct variants.
+
+    count: int, heroes built for the measurement
+    distinct: int, variants of every item slot
+    interned: bool, build the heroes through one ItemFactory
+    '''
+
+    factory = ItemFactory() if interned else None
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    heroes = []
+    for index in range(count):
+        variant = index % distinct
+        heroes.append(roster.build_hero(
+            f'Hero {index}', 100,
+            [('Laser Beam', 400 + variant), ('Super Strength', 300 + variant)],
+            [('Laser Sword', 500 + variant)], [('Thick Fog', 300 + variant)], factory))
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del heroes
+    return (after - before) / count
+
+
+def report(count=10000):
+    '''Return a list of (loadout, dict-based bytes, slotted bytes) rows.'''
+
+    rows = []
+    for loadout in ({'abilities': 1, 'weapons': 1, 'armors': 1},
+                    {'abilities': 2, 'weapons': 1, 'armors': 1},
+                    {'abilities': 8, 'weapons': 4, 'armors': 4}):
+        rows.append((loadout,
+                     bytes_per_hero(DICT_BASED, count, **loadout),
+                     bytes_per_hero(SLOTTED, count, **loadout)))
+    return rows
+
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    print(f'{"abilities/weapons/armors":>26} {"__dict__":>10} {"__slots__":>10} {"saved":>7}')
+    for loadout, dict_bytes, slot_bytes in report(count):
+        label = '{abilities}/{weapons}/{armors}'.format(**loadout)
+        saved = 1 - slot_bytes / dict_bytes
+        print(f'{label:>26} {dict_bytes:>10.0f} {slot_bytes:>10.0f} {saved:>7.0%}')
+    print()
+    print(f'{"distinct loadouts":>26} {"own items":>10} {"shared":>10} {"saved":>7}')
+    for distinct in (1, 100, count):
+        own = bytes_per_roster_hero(count, distinct)
+        shared = bytes_per_roster_hero(count, distinct, interned=True)
+        print(f'{distinct:>26} {own:>10.0f} {shared:>10.0f} {1 - shared / own:>7.0%}')
@@ -0,0 +1,30 @@
+import pytest
+import pickle
+import superheroes
+import memory
+
+
+def test_items_have_no_instance_dict():
+    for item in (superheroes.Ability("Punch", 10), superheroes.Weapon("Sword", 10),
+                 superheroes.Armor("Socks", 10), superheroes.Hero("Athena")):
+        assert not hasattr(item, "__dict__")
+
+
+def test_slotted_hero_pickles():
+    hero = superheroes.Hero("Athena", 150)
+    hero.add_weapon(superheroes.Weapon("Sword", 40))
+    copy = pickle.loads(pickle.dumps(hero))
+    assert copy.name == "Athena" and copy.current_health == 150
+    assert copy.abilities[0].bounds() == (20, 40)
+
+
+def test_slotted_heroes_are_smaller():
+    dict_bytes = memory.bytes_per_hero(memory.DICT_BASED, 2000)
+    slot_bytes = memory.bytes_per_hero(memory.SLOTTED, 2000)
+    assert slot_bytes < dict_bytes
+
+
+def test_interned_rosters_are_smaller_when_items_repeat():
+    own = memory.bytes_per_roster_hero(2000, 10)
+    shared = memory.bytes_per_roster_hero(2000, 10, interned=True)
+    assert shared < own / 2
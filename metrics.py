@@ -0,0 +1,211 @@
+'''Opt-in counters and histograms for fights and team battles.
+
+Instrumentation is off by default and then costs one attribute check per
+hooked call. After enable(), Hero.fight, Hero.take_damage and Team.attack
+record into the module REGISTRY, which can be exported with as_dict() or
+prometheus(). Recording never changes the results of a battle.
+'''
+
+import time
+
+enabled = False
+clock = time.perf_counter
+
+
+class Counter:
+    '''A value that only goes up.'''
+
+    kind = 'counter'
+
+    def __init__(self, name, help):
+        self.name = name
+        self.help = help
+        self.value = 0
+
+    def inc(self, amount=1):
+        self.value += amount
+
+    def reset(self):
+        self.value = 0
+
+    def as_dict(self):
+        return self.value
+
+    def samples(self):
+        return [(self.name, '', self.value)]
+
+
+class Histogram:
+    '''Counts observations into cumulative buckets, Prometheus style.
+
+    buckets: sorted list of upper bounds
+    '''
+
+    kind = 'histogram'
+
+    def __init__(self, name, help, buckets):
+        self.name = name
+        self.help = help
+        self.buckets = list(buckets)
+        self.reset()
+
+    def observe(self, value):
+        self.count += 1
+        self.sum += value
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[index] += 1
+                break
+
+    def reset(self):
+        self.counts = [0] * len(self.buckets)
+        self.count = 0
+        self.sum = 0
+
+    def cumulative(self):
+        total = 0
+        result = []
+        for count in self.counts:
+            total += count
+            result.append(total)
+        return result
+
+    def as_dict(self):
+        return {'count': self.count, 'sum': self.sum,
+                'buckets': dict(zip(self.buckets, self.cumulative()))}
+
+    def samples(self):
+        samples = [(self.name + '_bucket', f'{{le="{bound}"}}', count)
+                   for bound, count in zip(self.buckets, self.cumulative())]
+        samples.append((self.name + '_bucket', '{le="+Inf"}', self.count))
+        samples.append((self.name + '_sum', '', self.sum))
+        samples.append((self.name + '_count', '', self.count))
+        return samples
+
+
+class Registry:
+    '''A named collection of counters and histograms.'''
+
+    def __init__(self):
+        self.metrics = {}
+
+    def counter(self, name, help):
+        self.metrics[name] = Counter(name, help)
+        return self.metrics[name]
+
+    def histogram(self, name, help, buckets):
+        self.metrics[name] = Histogram(name, help, buckets)
+        return self.metrics[name]
+
+    def reset(self):
+        for metric in self.metrics.values():
+            metric.reset()
+
+    def as_dict(self):
+        return {name: metric.as_dict() for name, metric in self.metrics.items()}
+
+    def prometheus(self):
+        '''Return every metric in the Prometheus text exposition format.'''
+
+        lines = []
+        for metric in self.metrics.values():
+            lines.append(f'# HELP {metric.name} {metric.help}')
+            lines.append(f'# TYPE {metric.name} {metric.kind}')
+            for name, labels, value in metric.samples():
+                lines.append(f'{name}{labels} {value}')
+        return '\n'.join(lines) + '\n'
+
+
+ROUND_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 10000)
+SECOND_BUCKETS = (1e-6, 1e-5, 1e-4, 1e-3, 1e-2, 0.1, 1.0, 10.0)
+
+REGISTRY = Registry()
+FIGHTS = REGISTRY.counter('superheroes_fights_total', 'Hero.fight calls')
+FIGHT_DRAWS = REGISTRY.counter('superheroes_fight_draws_total', 'Hero.fight calls that ended in a draw')
+FIGHT_ROUNDS = REGISTRY.histogram('superheroes_fight_rounds', 'Rounds per Hero.fight', ROUND_BUCKETS)
+FIGHT_SECONDS = REGISTRY.histogram('superheroes_fight_seconds', 'Wall time per Hero.fight', SECOND_BUCKETS)
+DAMAGE_TAKEN = REGISTRY.counter('superheroes_take_damage_total', 'Hero.take_damage calls')
+HEALS = REGISTRY.counter('superheroes_heals_total', 'Hero.take_damage calls where block exceeded damage')
+BATTLES = REGISTRY.counter('superheroes_team_battles_total', 'Team.attack calls')
+BATTLE_SECONDS = REGISTRY.histogram('superheroes_team_battle_seconds', 'Wall time per Team.attack',
+                                    SECOND_BUCKETS)
+SELECTION_SECONDS = REGISTRY.counter('superheroes_team_selection_seconds_total',
+                                     'Time Team.attack spent picking heroes')
+FIGHTING_SECONDS = REGISTRY.counter('superheroes_team_fighting_seconds_total',
+                                    'Time Team.attack spent in Hero.fight')
+RNG_CALLS = REGISTRY.counter('superheroes_rng_calls_total', 'Random draws made by battles')
+
+
+class CountingRandom:
+    '''Random-like wrapper that counts every draw in RNG_CALLS.
+
+    rng: random-like object
+    '''
+
+    __slots__ = ('rng',)
+
+    def __init__(self, rng):
+        self.rng = rng
+
+    def randint(self, a, b):
+        RNG_CALLS.value += 1
+        return self.rng.randint(a, b)
+
+    def random(self):
+        RNG_CALLS.value += 1
+        return self.rng.random()
+
+    def choice(self, seq):
+        RNG_CALLS.value += 1
+        return self.rng.choice(seq)
+
+
+def counting(rng):
+    '''Wrap rng in a CountingRandom unless it already is one.'''
+
+    if isinstance(rng, CountingRandom):
+        return rng
+    return CountingRandom(rng)
+
+
+def record_fight(rounds, draw, seconds):
+    FIGHTS.value += 1
+    if draw:
+        FIGHT_DRAWS.value += 1
+    FIGHT_ROUNDS.observe(rounds)
+    FIGHT_SECONDS.observe(seconds)
+
+
+def record_damage(damage, blocked):
+    DAMAGE_TAKEN.value += 1
+    if blocked > damage:
+        HEALS.value += 1
+
+
+def record_battle(seconds, selecting, fighting):
+    BATTLES.value += 1
+    BATTLE_SECONDS.observe(seconds)
+    SELECTION_SECONDS.value += selecting
+    FIGHTING_SECONDS.value += fighting
+
+
+def enable():
+    global enabled
+    enabled = True
+
+
+def disable():
+    global enabled
+    enabled = False
+
+
+def as_dict():
+    return REGISTRY.as_dict()
+
+
+def prometheus():
+    return REGISTRY.prometheus()
+
+
+def reset():
+    REGISTRY.reset()
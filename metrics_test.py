@@ -0,0 +1,76 @@
+import pytest
+import random
+import superheroes
+import metrics
+from events import NullSink
+
+
+@pytest.fixture
+def enabled_metrics():
+    metrics.reset()
+    metrics.enable()
+    yield metrics
+    metrics.disable()
+    metrics.reset()
+
+
+def build_team(name, size):
+    team = superheroes.Team(name)
+    for index in range(size):
+        hero = superheroes.Hero(f"{name} {index}", 150)
+        hero.add_ability(superheroes.Ability("Punch", 60))
+        hero.add_armor(superheroes.Armor("Shield", 20))
+        team.add_hero(hero)
+    return team
+
+
+def play(seed):
+    team_one = build_team("One", 4)
+    team_two = build_team("Two", 4)
+    result = team_one.attack(team_two, NullSink(), random.Random(seed))
+    return result, [(hero.current_health, hero.kills) for hero in team_one.heroes + team_two.heroes]
+
+
+def test_disabled_metrics_record_nothing():
+    metrics.reset()
+    play(1)
+    assert metrics.FIGHTS.value == 0
+    assert metrics.RNG_CALLS.value == 0
+
+
+def test_metrics_do_not_change_results(enabled_metrics):
+    with_metrics = play(3)
+    metrics.disable()
+    assert play(3) == with_metrics
+
+
+def test_fight_metrics(enabled_metrics):
+    jodie = superheroes.Hero("Jodie Foster")
+    jodie.add_weapon(superheroes.Weapon("Laser Sword", 1000))
+    athena = superheroes.Hero("Athena")
+    athena.add_armor(superheroes.Armor("Socks", 10))
+    jodie.fight(athena, NullSink(), random.Random(1))
+    exported = metrics.as_dict()
+    assert exported["superheroes_fights_total"] == 1
+    assert exported["superheroes_fight_draws_total"] == 0
+    assert exported["superheroes_fight_rounds"]["count"] == 1
+    assert exported["superheroes_fight_rounds"]["buckets"][1] == 1
+    assert exported["superheroes_take_damage_total"] == 2
+    # One weapon roll and one armor roll.
+    assert exported["superheroes_rng_calls_total"] == 2
+
+
+def test_team_battle_metrics(enabled_metrics):
+    play(5)
+    assert metrics.BATTLES.value == 1
+    assert metrics.FIGHTS.value >= 4
+    assert metrics.FIGHTING_SECONDS.value > 0
+    assert metrics.BATTLE_SECONDS.sum >= metrics.FIGHTING_SECONDS.value
+
+
+def test_prometheus_export(enabled_metrics):
+    play(7)
+    text = metrics.prometheus()
+    assert "# TYPE superheroes_fights_total counter" in text
+    assert 'superheroes_fight_rounds_bucket{le="+Inf"}' in text
+    assert "superheroes_team_battles_total 1" in text
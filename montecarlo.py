@@ -0,0 +1,157 @@
+'''Monte Carlo estimate of the probability that one Team beats another.
+
+Simulated battles are split into shards and run on a process pool. Every
+worker gets its own pickled copy of both rosters and its own random stream,
+so the caller's Team and Hero objects are never touched.
+'''
+
+import math
+import os
+import random
+from concurrent.futures import ProcessPoolExecutor
+
+from events import NullSink
+from streams import as_random, spawn
+from superheroes import FIRST, SECOND
+
+
+def wilson_interval(successes, trials, z=1.96):
+    '''Return the (low, high) Wilson score interval of a proportion.
+
+    successes: int
+    trials: int
+    z: float (default = 1.96, a 95% interval)
+    '''
+
+    if trials == 0:
+        return (0.0, 1.0)
+    p = successes / trials
+    denominator = 1 + z * z / trials
+    centre = (p + z * z / (2 * trials)) / denominator
+    margin = z * math.sqrt(p * (1 - p) / trials + z * z / (4 * trials * trials)) / denominator
+    return (max(0.0, centre - margin), min(1.0, centre + margin))
+
+
+class Estimate:
+    '''Merged results of many simulated battles between two teams.
+
+    Kill and death totals are lists in the same order as each team's heroes.
+    '''
+
+    def __init__(self, team_one_size, team_two_size):
+        self.wins = 0
+        self.draws = 0
+        self.losses = 0
+        self.kills_one = [0] * team_one_size
+        self.deaths_one = [0] * team_one_size
+        self.kills_two = [0] * team_two_size
+        self.deaths_two = [0] * team_two_size
+
+    @property
+    def trials(self):
+        return self.wins + self.draws + self.losses
+
+    def merge(self, other):
+        '''Add the counts of another Estimate to this one and return self.
+
+        other: Estimate Object
+        '''
+
+        self.wins += other.wins
+        self.draws += other.draws
+        self.losses += other.losses
+        for totals, extra in ((self.kills_one, other.kills_one),
+                              (self.deaths_one, other.deaths_one),
+                              (self.kills_two, other.kills_two),
+                              (self.deaths_two, other.deaths_two)):
+            for index, value in enumerate(extra):
+                totals[index] += value
+        return self
+
+    def win_probability(self):
+        return self.wins / self.trials if self.trials else 0.0
+
+    def draw_probability(self):
+        return self.draws / self.trials if self.trials else 0.0
+
+    def loss_probability(self):
+        return self.losses / self.trials if self.trials else 0.0
+
+    def win_interval(self, z=1.96):
+        return wilson_interval(self.wins, self.trials, z)
+
+    def draw_interval(self, z=1.96):
+        return wilson_interval(self.draws, self.trials, z)
+
+    def loss_interval(self, z=1.96):
+        return wilson_interval(self.losses, self.trials, z)
+
+
+def simulate(team_one, team_two, battles, rng=None):
+    '''Run battles between team_one and team_two, reviving both teams before
+    each one, and return an Estimate. Kill and death totals only count what
+    happened during these battles.
+
+    team_one, team_two: Team Objects (modified in place)
+    battles: int
+    rng: random.Random, numpy.random.Generator or seed
+    '''
+
+    rng = as_random(rng)
+    estimate = Estimate(len(team_one.heroes), len(team_two.heroes))
+    kills_before = [hero.kills for hero in team_one.heroes + team_two.heroes]
+    deaths_before = [hero.deaths for hero in team_one.heroes + team_two.heroes]
+    sink = NullSink()
+    for _ in range(battles):
+        team_one.revive_heroes()
+        team_two.revive_heroes()
+        result = team_one.attack(team_two, sink, rng)
+        if result == FIRST:
+            estimate.wins += 1
+        elif result == SECOND:
+            estimate.losses += 1
+        else:
+            estimate.draws += 1
+
+    size = len(team_one.heroes)
+    for index, hero in enumerate(team_one.heroes + team_two.heroes):
+        kills = hero.kills - kills_before[index]
+        deaths = hero.deaths - deaths_before[index]
+        if index < size:
+            estimate.kills_one[index] = kills
+            estimate.deaths_one[index] = deaths
+        else:
+            estimate.kills_two[index - size] = kills
+            estimate.deaths_two[index - size] = deaths
+    return estimate
+
+
+def _shard_sizes(trials, shards):
+    '''Split trials into shard sizes that differ by at most one.'''
+
+    base, extra = divmod(trials, shards)
+    return [base + (1 if index < extra else 0) for index in range(shards)]
+
+
+def estimate_win_probability(team_one, team_two, trials, processes=None, seed=None):
+    '''Estimate how often team_one beats team_two by running trials
+    simulated battles on a process pool, and return the merged Estimate.
+
+    team_one, team_two: Team Objects (left untouched)
+    trials: int
+    processes: int (default = number of CPUs)
+    seed: int or None
+    '''
+
+    processes = processes or os.cpu_count() or 1
+    shards = min(processes, trials) or 1
+    if seed is None:
+        seed = random.getrandbits(128)
+
+    estimate = Estimate(len(team_one.heroes), len(team_two.heroes))
+    with ProcessPoolExecutor(max_workers=processes) as pool:
+        futures = [pool.submit(simulate, team_one, team_two, size, shard_rng)
+                   for size, shard_rng in zip(_shard_sizes(trials, shards), spawn(seed, shards))]
+        for future in futures:
+            estimate.merge(future.result())
+    return estimate
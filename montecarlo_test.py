@@ -0,0 +1,58 @@
+import pytest
+import superheroes
+import montecarlo
+
+
+def build_team(name, size, max_damage, health=100):
+    team = superheroes.Team(name)
+    for index in range(size):
+        hero = superheroes.Hero(f"{name} {index}", health)
+        hero.add_ability(superheroes.Ability("Punch", max_damage))
+        team.add_hero(hero)
+    return team
+
+
+def test_wilson_interval_contains_proportion():
+    low, high = montecarlo.wilson_interval(30, 100)
+    assert low < 0.3 < high
+    assert montecarlo.wilson_interval(0, 0) == (0.0, 1.0)
+
+
+def test_estimate_merge():
+    one = montecarlo.Estimate(1, 2)
+    one.wins, one.kills_one, one.deaths_two = 3, [2], [1, 1]
+    two = montecarlo.Estimate(1, 2)
+    two.losses, two.kills_one, two.deaths_two = 1, [1], [0, 2]
+    one.merge(two)
+    assert one.trials == 4
+    assert one.kills_one == [3]
+    assert one.deaths_two == [1, 3]
+
+
+def test_simulate_counts_every_battle():
+    team_one = build_team("One", 3, 1000)
+    team_two = build_team("Two", 3, 1)
+    estimate = montecarlo.simulate(team_one, team_two, 20, rng=1)
+    assert estimate.wins == 20
+    assert sum(estimate.deaths_two) == 60
+    assert sum(estimate.kills_one) == 60
+
+
+def test_estimate_win_probability():
+    team_one = build_team("One", 2, 1000)
+    team_two = build_team("Two", 2, 1)
+    estimate = montecarlo.estimate_win_probability(team_one, team_two, 40, processes=2, seed=7)
+    assert estimate.trials == 40
+    assert estimate.win_probability() == 1.0
+    assert estimate.win_interval()[0] > 0.9
+    # The caller's rosters are untouched.
+    assert all(hero.kills == 0 for hero in team_one.heroes)
+
+
+def test_estimate_is_reproducible():
+    team_one = build_team("One", 3, 60)
+    team_two = build_team("Two", 3, 55)
+    first = montecarlo.estimate_win_probability(team_one, team_two, 60, processes=2, seed=3)
+    second = montecarlo.estimate_win_probability(team_one, team_two, 60, processes=2, seed=3)
+    assert (first.wins, first.draws, first.losses) == (second.wins, second.draws, second.losses)
+    assert first.kills_one == second.kills_one
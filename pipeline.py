@@ -0,0 +1,347 @@
+'''Streaming battle results and constant-memory aggregators.
+
+battles() and duels() are generators that run simulations on demand and
+yield one small record per result, so nothing is collected in a list. The
+aggregators keep running totals only: OutcomeRates counts outcomes,
+RunningStats keeps Welford's running mean and variance of one record field
+and KillDeathRatios keeps two counters per hero. Heroes are told apart by
+hero_key(), not by name. Their memory depends on
+the roster, never on how many results stream through.
+
+Every aggregator has merge(), so shards run in separate processes can be
+summed into one result, as montecarlo.Estimate does.
+
+    summary = Aggregators(OutcomeRates(), RunningStats('duels'), KillDeathRatios())
+    aggregate(battles(team_one, team_two, 1000000, rng=7), summary)
+    summary.parts[1].mean, summary.parts[1].stdev
+'''
+
+import math
+from collections import namedtuple
+
+import events
+from montecarlo import wilson_interval
+from streams import as_random
+from superheroes import DRAW, FIRST, SECOND, STALEMATE, TIMEOUT
+
+DuelRecord = namedtuple('DuelRecord', ['first', 'second', 'outcome', 'rounds'])
+DuelRecord.__doc__ = '''Result of one duel.
+
+first, second: hero_key() of the heroes
+outcome: DRAW, FIRST, SECOND, STALEMATE or TIMEOUT
+rounds: int, rounds fought
+'''
+
+BattleRecord = namedtuple('BattleRecord', ['first', 'second', 'outcome', 'duels', 'heroes'])
+BattleRecord.__doc__ = '''Result of one team battle.
+
+first, second: names of the teams
+outcome: DRAW, FIRST, SECOND, STALEMATE or TIMEOUT
+duels: int, duels fought
+heroes: tuple of (hero_key(), kills, deaths) for every hero that scored a
+    kill or a death in this battle
+'''
+
+_DUEL_EVENTS = (events.DUEL_END, events.DUEL_DRAW, events.NO_CONTEST,
+                events.DUEL_STALEMATE, events.DUEL_TIMEOUT)
+
+
+def hero_key(hero, index=None):
+    '''Return the key results of hero are counted under: (team name, roster
+    index) for a hero on a team and (None, name) for one that is not.
+
+    hero: Hero Object
+    index: int, hero's roster index if already known
+    '''
+
+    if hero.team is None:
+        return (None, hero.name)
+    if index is None:
+        index = hero.team.heroes.index(hero)
+    return (hero.team.name, index)
+
+
+def _team_keys(team_one, team_two):
+    '''Return a dict from every hero of both teams to its hero_key().'''
+
+    if team_one.name == team_two.name:
+        raise ValueError(f'Both teams are called {team_one.name!r}')
+    return {hero: hero_key(hero, index)
+            for team in (team_one, team_two) for index, hero in enumerate(team.heroes)}
+
+
+class _BattleSink:
+    '''Counts the duels of one battle and the kills and deaths they give.
+
+    keys: dict from Hero Objects to their hero_key()
+    '''
+
+    def __init__(self, forward, keys):
+        self.forward = forward
+        self.keys = keys
+        self.duels = 0
+        self.scores = {}
+
+    def _score(self, hero, kills, deaths):
+        key = self.keys[hero]
+        score = self.scores.get(key)
+        if score is None:
+            score = self.scores[key] = [0, 0]
+        score[0] += kills
+        score[1] += deaths
+
+    def emit(self, event, *args):
+        if event in _DUEL_EVENTS:
+            self.duels += 1
+            if event == events.DUEL_END:
+                self._score(args[0], 1, 0)
+                self._score(args[1], 0, 1)
+            elif event == events.DUEL_DRAW:
+                self._score(args[0], 1, 1)
+                self._score(args[1], 1, 1)
+        if self.forward is not None:
+            self.forward.emit(event, *args)
+
+
+def battles(team_one, team_two, count=None, rng=None, revive=True, max_rounds=None,
+            max_duels=None, sink=None):
+    '''Yield a BattleRecord for each of count battles of team_one against
+    team_two, running each one only when it is asked for.
+
+    team_one, team_two: Team Objects with different names (modified in place)
+    count: int (default = None, never stop)
+    rng: random.Random, numpy.random.Generator or seed
+    revive: bool, revive both teams before every battle (default = True)
+    max_rounds, max_duels: passed to Team.attack
+    sink: event sink to pass every event on to (default = None)
+    '''
+
+    rng = as_random(rng)
+    played = 0
+    while count is None or played < count:
+        if revive:
+            team_one.revive_heroes()
+            team_two.revive_heroes()
+        counted = _BattleSink(sink, _team_keys(team_one, team_two))
+        outcome = team_one.attack(team_two, counted, rng, max_rounds, max_duels)
+        heroes = tuple((key, kills, deaths) for key, (kills, deaths) in counted.scores.items())
+        yield BattleRecord(team_one.name, team_two.name, outcome, counted.duels, heroes)
+        played += 1
+
+
+def duels(hero, opponent, count=None, rng=None, max_rounds=None, chunk_size=4096):
+    '''Yield a DuelRecord for each of count independent duels of hero
+    against opponent from their current health. Duels are run chunk_size at
+    a time by batch.fight_many, so the heroes are never modified. Needs
+    NumPy.
+
+    hero, opponent: Hero Objects with different hero_key()
+    count: int (default = None, never stop)
+    rng: None, an int seed or a numpy.random.Generator
+    max_rounds: int (default = None, superheroes.MAX_ROUNDS)
+    chunk_size: int (default = 4096)
+    '''
+
+    import batch
+    first, second = hero_key(hero), hero_key(opponent)
+    if first == second:
+        raise ValueError(f'{hero.name} and {opponent.name} would be counted as one hero')
+    rng = batch.as_generator(rng)
+    played = 0
+    while count is None or played < count:
+        size = chunk_size if count is None else min(chunk_size, count - played)
+        result = batch.fight_many(hero, opponent, size, rng, max_rounds)
+        for outcome, rounds in zip(result.winner.tolist(), result.rounds.tolist()):
+            yield DuelRecord(first, second, outcome, rounds)
+        played += size
+
+
+class OutcomeRates:
+    '''Counts of every outcome code, from the first side's point of view.'''
+
+    def __init__(self):
+        self.counts = [0] * 5
+
+    @property
+    def trials(self):
+        return sum(self.counts)
+
+    def update(self, record):
+        self.counts[record.outcome] += 1
+
+    def merge(self, other):
+        '''Add the counts of another OutcomeRates to this one and return self.'''
+
+        for outcome, count in enumerate(other.counts):
+            self.counts[outcome] += count
+        return self
+
+    def rate(self, outcome):
+        '''Return the share of results with outcome.'''
+
+        return self.counts[outcome] / self.trials if self.trials else 0.0
+
+    def win_rate(self):
+        return self.rate(FIRST)
+
+    def loss_rate(self):
+        return self.rate(SECOND)
+
+    def draw_rate(self):
+        '''Return the share of DRAW, STALEMATE and TIMEOUT results.'''
+
+        return self.rate(DRAW) + self.rate(STALEMATE) + self.rate(TIMEOUT)
+
+    def win_interval(self, z=1.96):
+        return wilson_interval(self.counts[FIRST], self.trials, z)
+
+
+class RunningStats:
+    '''Running count, mean and variance of one numeric record field, kept
+    with Welford's update and merged with Chan's pairwise formula.
+
+    field: str, name of the record field (default = 'rounds')
+    '''
+
+    def __init__(self, field='rounds'):
+        self.field = field
+        self.count = 0
+        self.mean = 0.0
+        self._squares = 0.0
+        self.minimum = None
+        self.maximum = None
+
+    def add(self, value):
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self._squares += delta * (value - self.mean)
+        if self.minimum is None or value < self.minimum:
+            self.minimum = value
+        if self.maximum is None or value > self.maximum:
+            self.maximum = value
+
+    def update(self, record):
+        self.add(getattr(record, self.field))
+
+    def merge(self, other):
+        '''Combine another RunningStats of the same field into this one and
+        return self.
+        '''
+
+        if other.count == 0:
+            return self
+        if self.count == 0:
+            self.count, self.mean, self._squares = other.count, other.mean, other._squares
+            self.minimum, self.maximum = other.minimum, other.maximum
+            return self
+        count = self.count + other.count
+        delta = other.mean - self.mean
+        self.mean += delta * other.count / count
+        self._squares += other._squares + delta * delta * self.count * other.count / count
+        self.count = count
+        self.minimum = min(self.minimum, other.minimum)
+        self.maximum = max(self.maximum, other.maximum)
+        return self
+
+    @property
+    def variance(self):
+        '''Sample variance, or 0.0 with fewer than two values.'''
+
+        return self._squares / (self.count - 1) if self.count > 1 else 0.0
+
+    @property
+    def stdev(self):
+        return math.sqrt(self.variance)
+
+
+class KillDeathRatios:
+    '''Kill and death totals of every hero, keyed by hero_key().
+
+    DuelRecords give the first hero a kill and the second a death on FIRST,
+    the reverse on SECOND, and both a kill and a death on DRAW. BattleRecords
+    carry their own per-hero totals.
+    '''
+
+    def __init__(self):
+        self.scores = {}
+
+    def __len__(self):
+        return len(self.scores)
+
+    def _add(self, key, kills, deaths):
+        score = self.scores.get(key)
+        if score is None:
+            score = self.scores[key] = [0, 0]
+        score[0] += kills
+        score[1] += deaths
+
+    def update(self, record):
+        if isinstance(record, BattleRecord):
+            for key, kills, deaths in record.heroes:
+                self._add(key, kills, deaths)
+        elif record.outcome == FIRST:
+            self._add(record.first, 1, 0)
+            self._add(record.second, 0, 1)
+        elif record.outcome == SECOND:
+            self._add(record.first, 0, 1)
+            self._add(record.second, 1, 0)
+        elif record.outcome == DRAW and record.rounds:
+            self._add(record.first, 1, 1)
+            self._add(record.second, 1, 1)
+
+    def merge(self, other):
+        '''Add the totals of another KillDeathRatios to this one and return self.'''
+
+        for key, (kills, deaths) in other.scores.items():
+            self._add(key, kills, deaths)
+        return self
+
+    def kills(self, key):
+        return self.scores.get(key, (0, 0))[0]
+
+    def deaths(self, key):
+        return self.scores.get(key, (0, 0))[1]
+
+    def ratio(self, key):
+        '''Return kills divided by deaths, or the kills of a hero that never died.'''
+
+        kills, deaths = self.scores.get(key, (0, 0))
+        return kills / deaths if deaths else float(kills)
+
+
+class Aggregators:
+    '''Several aggregators fed and merged together.
+
+    parts: aggregator Objects with update() and merge()
+    '''
+
+    def __init__(self, *parts):
+        self.parts = parts
+
+    def update(self, record):
+        for part in self.parts:
+            part.update(record)
+
+    def merge(self, other):
+        '''Merge each part of another Aggregators of the same shape into the
+        matching part of this one and return self.
+        '''
+
+        for part, extra in zip(self.parts, other.parts):
+            part.merge(extra)
+        return self
+
+
+def aggregate(records, *aggregators):
+    '''Feed every record to every aggregator and return the aggregators,
+    or the single aggregator if only one was given.
+
+    records: iterable of DuelRecord or BattleRecord tuples
+    aggregators: aggregator Objects with update()
+    '''
+
+    for record in records:
+        for aggregator in aggregators:
+            aggregator.update(record)
+    return aggregators[0] if len(aggregators) == 1 else aggregators
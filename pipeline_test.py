@@ -0,0 +1,86 @@
+import random
+import statistics
+import pytest
+import pipeline
+import superheroes
+from seeded_teams import build_team
+
+
+def test_running_stats_match_statistics_and_merge():
+    rng = random.Random(1)
+    values = [rng.gauss(10, 3) for _ in range(200)]
+    whole = pipeline.RunningStats()
+    for value in values:
+        whole.add(value)
+    left, right = pipeline.RunningStats(), pipeline.RunningStats()
+    for value in values[:37]:
+        left.add(value)
+    for value in values[37:]:
+        right.add(value)
+    left.merge(right)
+    for stats in (whole, left):
+        assert stats.count == len(values)
+        assert stats.mean == pytest.approx(statistics.mean(values))
+        assert stats.variance == pytest.approx(statistics.variance(values))
+        assert (stats.minimum, stats.maximum) == (min(values), max(values))
+
+
+def test_battles_stream_matches_hero_counters():
+    one, two = build_team("One", seed=1), build_team("Two", seed=2)
+    records = pipeline.battles(one, two, rng=3)
+    assert next(records).first == "One"
+    rates, lengths, ratios = pipeline.aggregate(
+        pipeline.battles(one, two, 50, rng=4),
+        pipeline.OutcomeRates(), pipeline.RunningStats("duels"), pipeline.KillDeathRatios())
+    assert rates.trials == lengths.count == 50
+    assert rates.win_rate() + rates.loss_rate() + rates.draw_rate() == pytest.approx(1.0)
+    assert lengths.minimum >= len(one.heroes)
+    # The first streamed battle is counted on the heroes but not in ratios.
+    hero = one.heroes[0]
+    key = pipeline.hero_key(hero)
+    assert key == ("One", 0)
+    assert ratios.kills(key) <= hero.kills <= ratios.kills(key) + len(two.heroes)
+
+
+def test_sharded_aggregates_merge_to_single_run():
+    one, two = build_team("One", seed=1), build_team("Two", seed=2)
+    whole = pipeline.Aggregators(pipeline.OutcomeRates(), pipeline.KillDeathRatios())
+    shards = []
+    for seed in (5, 6):
+        shard = pipeline.Aggregators(pipeline.OutcomeRates(), pipeline.KillDeathRatios())
+        records = list(pipeline.battles(one, two, 10, rng=seed))
+        pipeline.aggregate(records, whole)
+        shards.append(pipeline.aggregate(records, shard))
+    merged = shards[0].merge(shards[1])
+    assert merged.parts[0].counts == whole.parts[0].counts
+    assert merged.parts[1].scores == whole.parts[1].scores
+
+
+def test_duel_stream_is_lazy_and_counts_outcomes():
+    pytest.importorskip("numpy")
+    hero, opponent = build_team("One", 1, seed=1).heroes[0], build_team("Two", 1, seed=2).heroes[0]
+    stream = pipeline.duels(hero, opponent, rng=7, chunk_size=64)
+    first = next(stream)
+    assert first.first == pipeline.hero_key(hero) and first.rounds >= 1
+    rates, rounds, ratios = pipeline.aggregate(
+        pipeline.duels(hero, opponent, 1000, rng=8, chunk_size=100),
+        pipeline.OutcomeRates(), pipeline.RunningStats(), pipeline.KillDeathRatios())
+    assert rates.trials == rounds.count == 1000
+    assert ratios.kills(pipeline.hero_key(hero)) == ratios.deaths(pipeline.hero_key(opponent))
+    assert ratios.kills(pipeline.hero_key(opponent)) == rates.counts[superheroes.SECOND] + rates.counts[superheroes.DRAW]
+    assert hero.current_health == hero.starting_health
+
+
+def test_heroes_sharing_a_name_keep_their_own_ratios():
+    one, two = superheroes.Team("One"), superheroes.Team("Two")
+    for team, damages in ((one, (1000, 0)), (two, (0,))):
+        for damage in damages:
+            hero = superheroes.Hero("Clone")
+            hero.add_ability(superheroes.Ability("Punch", damage))
+            team.add_hero(hero)
+    ratios = pipeline.aggregate(pipeline.battles(one, two, 20, rng=1), pipeline.KillDeathRatios())
+    assert len(ratios) == 2
+    assert ratios.kills(("One", 0)) == ratios.deaths(("Two", 0)) == 20
+    assert ratios.kills(("One", 1)) == ratios.deaths(("One", 1)) == 0
+    with pytest.raises(ValueError):
+        next(pipeline.battles(one, superheroes.Team("One")))
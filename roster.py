@@ -0,0 +1,238 @@
+'''Streaming roster import and export.
+
+Rosters are read one line at a time, so files of any size load without being
+held in memory. Two formats are supported:
+
+CSV with a header row; items are "name:value" pairs separated by ";", with
+any ";" or backslash in an item name escaped by a backslash
+
+    name,health,abilities,weapons,armors
+    Athena,100,Science:40;Luck:10,Laser Sword:60,Thick Fog:30
+
+JSON Lines, one hero per line
+
+    {"name": "Athena", "health": 100, "abilities": [["Science", 40]],
+     "weapons": [["Laser Sword", 60]], "armors": [["Thick Fog", 30]]}
+'''
+
+import csv
+import io
+import json
+import time
+
+from superheroes import Ability, Armor, Hero, Team, Weapon
+
+CSV_FIELDS = ['name', 'health', 'abilities', 'weapons', 'armors']
+
+
+class LoadReport:
+    '''How many heroes a load added and how long it took.'''
+
+    def __init__(self, heroes, seconds):
+        self.heroes = heroes
+        self.seconds = seconds
+
+    @property
+    def heroes_per_second(self):
+        return self.heroes / self.seconds if self.seconds else float('inf')
+
+    def __str__(self):
+        return f'{self.heroes} heroes in {self.seconds:.2f}s ({self.heroes_per_second:,.0f}/s)'
+
+
+def build_hero(name, health, abilities=(), weapons=(), armors=(), factory=None):
+    '''Build a Hero from plain values.
+
+    name: str
+    health: int
+    abilities, weapons, armors: iterables of (name, value) pairs
+    factory: flyweight.ItemFactory to share items and loadouts through, or None
+    '''
+
+    hero = Hero(name, health)
+    if factory is not None:
+        hero.abilities = factory.loadout(
+            [factory.ability(item_name, value) for item_name, value in abilities]
+            + [factory.weapon(item_name, value) for item_name, value in weapons])
+        hero.armors = factory.loadout([factory.armor(item_name, value) for item_name, value in armors])
+        return hero
+    # A new hero has no tables to invalidate, so fill the lists directly.
+    hero.abilities = [Ability(item_name, value) for item_name, value in abilities]
+    hero.abilities.extend(Weapon(item_name, value) for item_name, value in weapons)
+    hero.armors = [Armor(item_name, value) for item_name, value in armors]
+    return hero
+
+
+def _record_items(record, field):
+    '''Return the (name, value) pairs of one item field of a JSON Lines
+    record, raising ValueError unless every value is an int.
+    '''
+
+    items = []
+    for item in record.get(field, ()):
+        item_name, value = item
+        if type(value) is not int:
+            raise ValueError(f'{field} value {value!r} of {item_name!r} is not an int')
+        items.append((item_name, value))
+    return items
+
+
+def hero_from_record(record, factory=None):
+    '''Build a Hero from a JSON Lines record dict. Raises ValueError if an
+    item value is not an int.
+    '''
+
+    return build_hero(record['name'], int(record.get('health', 100)),
+                      _record_items(record, 'abilities'), _record_items(record, 'weapons'),
+                      _record_items(record, 'armors'), factory)
+
+
+def hero_to_record(hero):
+    '''Return the JSON Lines record dict of hero.'''
+
+    abilities = [[item.name, item.max_damage] for item in hero.abilities
+                 if not isinstance(item, Weapon)]
+    weapons = [[item.name, item.max_damage] for item in hero.abilities
+               if isinstance(item, Weapon)]
+    armors = [[item.name, item.max_block] for item in hero.armors]
+    return {'name': hero.name, 'health': hero.starting_health,
+            'abilities': abilities, 'weapons': weapons, 'armors': armors}
+
+
+def _split_items(field):
+    '''Split a CSV item field on the ";" that are not escaped and drop the
+    escapes.
+    '''
+
+    items = []
+    item = []
+    characters = iter(field)
+    for character in characters:
+        if character == '\\':
+            item.append(next(characters, ''))
+        elif character == ';':
+            items.append(''.join(item))
+            item = []
+        else:
+            item.append(character)
+    items.append(''.join(item))
+    return items
+
+
+def _parse_items(field):
+    '''Split a CSV item field into (name, value) pairs.'''
+
+    items = []
+    if field:
+        for item in _split_items(field):
+            item_name, _, value = item.rpartition(':')
+            items.append((item_name, int(value)))
+    return items
+
+
+def _escape(item_name):
+    return item_name.replace('\\', '\\\\').replace(';', '\\;')
+
+
+def _format_items(items):
+    return ';'.join(f'{_escape(item_name)}:{value}' for item_name, value in items)
+
+
+def read_csv(lines, factory=None):
+    '''Yield a Hero for every row of a CSV roster.
+
+    lines: file object or any iterable of lines
+    factory: flyweight.ItemFactory, or None
+    '''
+
+    for row in csv.DictReader(lines):
+        yield build_hero(row['name'], int(row['health'] or 100),
+                         _parse_items(row.get('abilities')),
+                         _parse_items(row.get('weapons')),
+                         _parse_items(row.get('armors')), factory)
+
+
+def read_jsonl(lines, factory=None):
+    '''Yield a Hero for every line of a JSON Lines roster. Blank lines are
+    skipped.
+
+    lines: file object or any iterable of lines
+    factory: flyweight.ItemFactory, or None
+    '''
+
+    for line in lines:
+        if line.strip():
+            yield hero_from_record(json.loads(line), factory)
+
+
+def _reader(path, format):
+    if format is None:
+        format = 'csv' if str(path).endswith('.csv') else 'jsonl'
+    if format == 'csv':
+        return read_csv
+    if format == 'jsonl':
+        return read_jsonl
+    raise ValueError(f'Unknown roster format: {format}')
+
+
+def load_team(source, team=None, format=None, factory=None):
+    '''Stream heroes from a roster file into a Team and return
+    (team, LoadReport).
+
+    source: path or open text file
+    team: Team Object (default = a new Team named after the file)
+    format: 'csv' or 'jsonl' (default = from the file extension, else jsonl)
+    factory: flyweight.ItemFactory to share repeated items through, or None
+    '''
+
+    start = time.perf_counter()
+    if isinstance(source, io.IOBase):
+        name = getattr(source, 'name', 'Roster')
+        reader = _reader(name, format)
+        heroes = reader(source, factory)
+        handle = None
+    else:
+        name = str(source)
+        reader = _reader(name, format)
+        handle = open(source, newline='')
+        heroes = reader(handle, factory)
+    if team is None:
+        team = Team(name)
+    count = 0
+    try:
+        for hero in heroes:
+            team.add_hero(hero)
+            count += 1
+    finally:
+        if handle is not None:
+            handle.close()
+    return team, LoadReport(count, time.perf_counter() - start)
+
+
+def write_csv(heroes, output):
+    '''Write heroes as a CSV roster.
+
+    heroes: iterable of Hero Objects
+    output: open text file
+    '''
+
+    writer = csv.writer(output)
+    writer.writerow(CSV_FIELDS)
+    for hero in heroes:
+        record = hero_to_record(hero)
+        writer.writerow([record['name'], record['health'],
+                         _format_items(record['abilities']),
+                         _format_items(record['weapons']),
+                         _format_items(record['armors'])])
+
+
+def write_jsonl(heroes, output):
+    '''Write heroes as a JSON Lines roster.
+
+    heroes: iterable of Hero Objects
+    output: open text file
+    '''
+
+    for hero in heroes:
+        output.write(json.dumps(hero_to_record(hero)))
+        output.write('\n')
@@ -0,0 +1,75 @@
+import io
+import json
+import roster
+import superheroes
+
+
+CSV_ROSTER = """name,health,abilities,weapons,armors
+Athena,120,Science:40;Luck:10,Laser Sword:60,Thick Fog:30
+Gamora,,,Knife:20,
+"""
+
+
+def test_read_csv():
+    heroes = list(roster.read_csv(io.StringIO(CSV_ROSTER)))
+    athena, gamora = heroes
+    assert athena.name == "Athena"
+    assert athena.starting_health == 120
+    assert [(item.name, item.max_damage) for item in athena.abilities] == \
+        [("Science", 40), ("Luck", 10), ("Laser Sword", 60)]
+    assert isinstance(athena.abilities[2], superheroes.Weapon)
+    assert [(item.name, item.max_block) for item in athena.armors] == [("Thick Fog", 30)]
+    assert gamora.starting_health == 100
+    assert gamora.armors == []
+
+
+def test_read_jsonl_skips_blank_lines():
+    lines = [json.dumps({"name": "Athena", "health": 80, "abilities": [["Science", 40]]}),
+             "",
+             json.dumps({"name": "Gamora", "weapons": [["Knife", 20]]})]
+    heroes = list(roster.read_jsonl(io.StringIO("\n".join(lines))))
+    assert [hero.name for hero in heroes] == ["Athena", "Gamora"]
+    assert heroes[0].starting_health == 80
+    assert isinstance(heroes[1].abilities[0], superheroes.Weapon)
+
+
+def test_round_trip(tmp_path):
+    heroes = list(roster.read_csv(io.StringIO(CSV_ROSTER)))
+    for write, name in ((roster.write_csv, "team.csv"), (roster.write_jsonl, "team.jsonl")):
+        path = tmp_path / name
+        with open(path, "w", newline="") as output:
+            write(heroes, output)
+        team, report = roster.load_team(path)
+        assert report.heroes == 2
+        assert [roster.hero_to_record(hero) for hero in team.heroes] == \
+            [roster.hero_to_record(hero) for hero in heroes]
+
+
+def test_load_team_into_existing_team():
+    team = superheroes.Team("One")
+    loaded, report = roster.load_team(io.StringIO(CSV_ROSTER), team, format="csv")
+    assert loaded is team
+    assert team.alive_count() == 2
+    assert report.heroes_per_second > 0
+    assert "2 heroes" in str(report)
+
+
+def test_arena_loads_roster_files(tmp_path):
+    path = tmp_path / "one.csv"
+    path.write_text(CSV_ROSTER)
+    arena = superheroes.Arena()
+    report = arena.load_team_one(str(path))
+    assert report.heroes == 2
+    assert arena.team_one.get_hero("Athena") is not None
+    assert arena.team_two.heroes == ()
+
+
+def test_csv_round_trip_escapes_item_separator():
+    hero = superheroes.Hero("Athena", 90)
+    hero.add_ability(superheroes.Ability("Fire;Ice", 40))
+    hero.add_weapon(superheroes.Weapon("Back\\slash;", 20))
+    hero.add_armor(superheroes.Armor("Cloak: Grey", 10))
+    output = io.StringIO()
+    roster.write_csv([hero], output)
+    copy, = roster.read_csv(io.StringIO(output.getvalue()))
+    assert roster.hero_to_record(copy) == roster.hero_to_record(hero)
@@ -0,0 +1,26 @@
+'''Seeded teams shared by the checkpoint, pipeline and tracing tests.'''
+
+import random
+
+import superheroes
+
+
+def build_team(name, size=6, seed=0):
+    '''Return a Team of size heroes whose health, damage and block come from
+    seed, so the same arguments always build the same team.
+    '''
+
+    rng = random.Random(seed)
+    team = superheroes.Team(name)
+    for index in range(size):
+        hero = superheroes.Hero(f"{name} {index}", 50 + rng.randint(0, 100))
+        hero.add_ability(superheroes.Ability("Punch", 30 + rng.randint(0, 40)))
+        hero.add_armor(superheroes.Armor("Shield", rng.randint(0, 10)))
+        team.add_hero(hero)
+    return team
+
+
+def counters(*teams):
+    '''Return (health, kills, deaths) of every hero on teams, in roster order.'''
+
+    return [(hero.current_health, hero.kills, hero.deaths) for team in teams for hero in team.heroes]
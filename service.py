@@ -0,0 +1,470 @@
+'''Asyncio battle service on localhost.
+
+Clients open a TCP connection and send one JSON request per line. Every
+request gets one JSON reply line carrying the same id; replies can come back
+out of order when a client pipelines requests.
+
+    {"id": 1, "type": "duel", "hero": HERO, "opponent": HERO, "max_rounds": 1000}
+    {"id": 1, "winner": 1, "rounds": 7, "health_one": 12, "health_two": 0}
+
+    {"id": 2, "type": "battle", "team_one": [HERO, ...], "team_two": [HERO, ...]}
+    {"id": 2, "outcome": 2, "kills_one": 1, "deaths_one": 3, "kills_two": 3, "deaths_two": 1}
+
+HERO is a roster JSON Lines record. A request that cannot be run gets
+{"id": ..., "error": "..."} instead.
+
+max_rounds (duels and battles) and max_duels (battles) are optional
+non-negative ints. Missing or larger values are clamped to the service's own
+max_rounds and max_duels, so no request can keep the batcher busy forever.
+A team may have at most max_team_size heroes, and a request line may be at
+most max_line bytes long; a longer line gets an error reply and the
+connection is closed.
+
+Duel requests wait in a bounded queue. A single batcher takes everything
+queued and runs all the duels as one batch.fight_batch call, in an executor
+so the event loop never blocks. Team battles wait in a queue of their own
+and are played one at a time in a separate executor, so a long battle never
+holds up the duels. When a queue is full, reading from the clients stops
+until there is room again. The load test drives a service with many
+connections and reports latency percentiles and requests per second.
+
+    python service.py serve --port 8765
+    python service.py load --requests 5000 --concurrency 64
+'''
+
+import argparse
+import asyncio
+import json
+import random
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import batch
+from benchmark import percentile
+from events import NullSink
+from roster import hero_from_record
+from superheroes import MAX_ROUNDS, Team
+
+DUEL = 'duel'
+BATTLE = 'battle'
+
+# Most duels a team battle request may run.
+MAX_DUELS = 100000
+# Most heroes on either team of a battle request.
+MAX_TEAM_SIZE = 1000
+# Longest request line in bytes, newline included.
+MAX_LINE = 1 << 20
+
+
+def _team(name, records, most):
+    if len(records) > most:
+        raise ValueError(f'{name} has {len(records)} heroes, more than {most}')
+    team = Team(name)
+    for record in records:
+        team.add_hero(hero_from_record(record))
+    return team
+
+
+def _limit(request, key, most):
+    '''Return request[key] clamped to most, or most if it is missing.
+
+    Raises ValueError unless the value is a non-negative int.
+    '''
+
+    value = request.get(key)
+    if value is None:
+        return most
+    if type(value) is not int or value < 0:
+        raise ValueError(f'{key} must be a non-negative int, not {value!r}')
+    return min(value, most)
+
+
+def run_duels(requests, seed, max_rounds=MAX_ROUNDS):
+    '''Run every duel request in one batch per max_rounds value and return
+    the replies in request order.
+
+    requests: list of duel request dicts
+    seed: int
+    max_rounds: int, most rounds any duel may last
+    '''
+
+    replies = [None] * len(requests)
+    groups = {}
+    for position, request in enumerate(requests):
+        try:
+            groups.setdefault(_limit(request, 'max_rounds', max_rounds), []).append(position)
+        except ValueError as error:
+            replies[position] = {'error': f'bad duel request: {error!r}'}
+    rng = batch.as_generator(seed)
+    for rounds, positions in groups.items():
+        pairs = []
+        valid = []
+        for position in positions:
+            try:
+                pairs.append((hero_from_record(requests[position]['hero']),
+                              hero_from_record(requests[position]['opponent'])))
+                valid.append(position)
+            except (KeyError, TypeError, ValueError) as error:
+                replies[position] = {'error': f'bad duel request: {error!r}'}
+        if not pairs:
+            continue
+        try:
+            chunks = [(pairs, valid, batch.fight_batch(pairs, rng, rounds))]
+        except (TypeError, ValueError, OverflowError):
+            # Something got past the checks; run the group's duels one by one
+            # so only the request at fault fails.
+            chunks = []
+            for pair, position in zip(pairs, valid):
+                try:
+                    chunks.append(([pair], [position], batch.fight_batch([pair], rng, rounds)))
+                except (TypeError, ValueError, OverflowError) as error:
+                    replies[position] = {'error': f'bad duel request: {error!r}'}
+        for _, positions_run, result in chunks:
+            for row, position in enumerate(positions_run):
+                replies[position] = {'winner': int(result.winner[row]),
+                                     'rounds': int(result.rounds[row]),
+                                     'health_one': int(result.health_one[row]),
+                                     'health_two': int(result.health_two[row])}
+    return replies
+
+
+def run_battle(request, seed, max_rounds=MAX_ROUNDS, max_duels=MAX_DUELS,
+               max_team_size=MAX_TEAM_SIZE):
+    '''Play one team battle request and return its reply.
+
+    request: battle request dict
+    seed: int
+    max_rounds: int, most rounds any duel may last
+    max_duels: int, most duels the battle may run
+    max_team_size: int, most heroes on either team
+    '''
+
+    rounds = _limit(request, 'max_rounds', max_rounds)
+    duels = _limit(request, 'max_duels', max_duels)
+    team_one = _team('Team One', request['team_one'], max_team_size)
+    team_two = _team('Team Two', request['team_two'], max_team_size)
+    outcome = team_one.attack(team_two, NullSink(), random.Random(seed), rounds, duels)
+    return {'outcome': outcome,
+            'kills_one': team_one.total_kills, 'deaths_one': team_one.total_deaths,
+            'kills_two': team_two.total_kills, 'deaths_two': team_two.total_deaths}
+
+
+def run_requests(requests, seed, max_rounds=MAX_ROUNDS, max_duels=MAX_DUELS,
+                 max_team_size=MAX_TEAM_SIZE):
+    '''Run one batch of requests and return a reply dict for each, in order.
+    Runs in the executor.
+
+    requests: list of request dicts
+    seed: int
+    max_rounds: int, most rounds any duel may last
+    max_duels: int, most duels any battle may run
+    max_team_size: int, most heroes on either team of a battle
+    '''
+
+    rng = random.Random(seed)
+    replies = [None] * len(requests)
+    duels = []
+    for position, request in enumerate(requests):
+        kind = request.get('type')
+        if kind == DUEL:
+            duels.append(position)
+        elif kind == BATTLE:
+            try:
+                replies[position] = run_battle(request, rng.getrandbits(64), max_rounds,
+                                               max_duels, max_team_size)
+            except (KeyError, TypeError, ValueError) as error:
+                replies[position] = {'error': f'bad battle request: {error!r}'}
+        else:
+            replies[position] = {'error': f'unknown request type: {kind!r}'}
+    if duels:
+        results = run_duels([requests[position] for position in duels], rng.getrandbits(64),
+                            max_rounds)
+        for position, reply in zip(duels, results):
+            replies[position] = reply
+    return replies
+
+
+class BattleService:
+    '''Serves duel and team battle requests on a localhost TCP port.
+
+    host: str (default = '127.0.0.1')
+    port: int (default = 0, any free port)
+    max_queue: int, duel requests waiting before reading stops
+    max_batch: int, most requests run in one executor call
+    executor: concurrent.futures Executor for duels
+        (default = the loop's default)
+    seed: int or None
+    max_rounds: int, most rounds any duel may last
+    max_duels: int, most duels any battle may run
+    max_team_size: int, most heroes on either team of a battle
+    max_line: int, longest request line in bytes
+    max_battles: int, battle requests waiting before reading stops
+    battle_executor: concurrent.futures Executor for battles
+        (default = a one-thread executor of the service's own)
+    '''
+
+    def __init__(self, host='127.0.0.1', port=0, max_queue=1024, max_batch=512,
+                 executor=None, seed=None, max_rounds=MAX_ROUNDS, max_duels=MAX_DUELS,
+                 max_team_size=MAX_TEAM_SIZE, max_line=MAX_LINE, max_battles=16,
+                 battle_executor=None):
+        self.host = host
+        self.port = port
+        self.max_queue = max_queue
+        self.max_batch = max_batch
+        self.executor = executor
+        self.rng = random.Random(seed)
+        self.max_rounds = max_rounds
+        self.max_duels = max_duels
+        self.max_team_size = max_team_size
+        self.max_line = max_line
+        self.max_battles = max_battles
+        self.battle_executor = battle_executor
+        self.batches = 0
+        self.served = 0
+        self._queue = None
+        self._battles = None
+        self._own_battle_executor = None
+        self._server = None
+        self._batcher = None
+        self._battler = None
+
+    async def start(self):
+        '''Start listening and return the port in use.'''
+
+        self._queue = asyncio.Queue(self.max_queue)
+        self._battles = asyncio.Queue(self.max_battles)
+        if self.battle_executor is None:
+            self._own_battle_executor = ThreadPoolExecutor(1)
+        self._batcher = asyncio.create_task(self._run_batches())
+        self._battler = asyncio.create_task(self._run_battles())
+        self._server = await asyncio.start_server(self._handle, self.host, self.port,
+                                                  limit=self.max_line)
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self.port
+
+    async def stop(self):
+        self._server.close()
+        await self._server.wait_closed()
+        for task in (self._batcher, self._battler):
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        if self._own_battle_executor is not None:
+            self._own_battle_executor.shutdown(wait=False, cancel_futures=True)
+            self._own_battle_executor = None
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.stop()
+
+    def _queue_for(self, request):
+        '''Return the queue request waits in.'''
+
+        return self._battles if request.get('type') == BATTLE else self._queue
+
+    async def submit(self, request):
+        '''Queue one request dict and return its reply dict. Waits while the
+        queue is full.
+        '''
+
+        future = asyncio.get_running_loop().create_future()
+        await self._queue_for(request).put((request, future))
+        return await future
+
+    async def _run_batches(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            items = [await self._queue.get()]
+            while len(items) < self.max_batch and not self._queue.empty():
+                items.append(self._queue.get_nowait())
+            requests = [request for request, _ in items]
+            seed = self.rng.getrandbits(64)
+            try:
+                replies = await loop.run_in_executor(self.executor, run_requests, requests, seed,
+                                                     self.max_rounds, self.max_duels,
+                                                     self.max_team_size)
+            except Exception as error:
+                replies = [{'error': f'batch failed: {error!r}'}] * len(items)
+            self.batches += 1
+            self.served += len(items)
+            for (_, future), reply in zip(items, replies):
+                if not future.done():
+                    future.set_result(reply)
+
+    async def _run_battles(self):
+        loop = asyncio.get_running_loop()
+        executor = self.battle_executor or self._own_battle_executor
+        while True:
+            request, future = await self._battles.get()
+            seed = self.rng.getrandbits(64)
+            try:
+                reply, = await loop.run_in_executor(executor, run_requests, [request], seed,
+                                                    self.max_rounds, self.max_duels,
+                                                    self.max_team_size)
+            except Exception as error:
+                reply = {'error': f'battle failed: {error!r}'}
+            self.batches += 1
+            self.served += 1
+            if not future.done():
+                future.set_result(reply)
+
+    async def _reply(self, writer, request_id, future):
+        reply = dict(await future, id=request_id)
+        writer.write(json.dumps(reply).encode() + b'\n')
+        await writer.drain()
+
+    async def _handle(self, reader, writer):
+        pending = set()
+        try:
+            while True:
+                try:
+                    line = await reader.readline()
+                except (ValueError, asyncio.LimitOverrunError):
+                    # What is left of the line cannot be told from the next
+                    # request, so answer and hang up.
+                    error = f'request line longer than {self.max_line} bytes'
+                    writer.write(json.dumps({'id': None, 'error': error}).encode() + b'\n')
+                    break
+                if not line:
+                    break
+                if not line.strip():
+                    continue
+                try:
+                    request = json.loads(line)
+                except ValueError as error:
+                    writer.write(json.dumps({'id': None, 'error': f'bad json: {error}'}).encode() + b'\n')
+                    continue
+                if not isinstance(request, dict):
+                    writer.write(json.dumps({'id': None, 'error': 'request must be an object'}).encode() + b'\n')
+                    continue
+                future = asyncio.get_running_loop().create_future()
+                # Waiting for queue room here stops reading from this client.
+                await self._queue_for(request).put((request, future))
+                task = asyncio.create_task(self._reply(writer, request.get('id'), future))
+                pending.add(task)
+                task.add_done_callback(pending.discard)
+            if pending:
+                await asyncio.gather(*pending, return_exceptions=True)
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+
+def _record(name, health=100, max_damage=40):
+    return {'name': name, 'health': health, 'abilities': [['Punch', max_damage]],
+            'weapons': [['Sword', max_damage]], 'armors': [['Shield', max_damage // 4]]}
+
+
+def sample_request(kind, index, team_size=5):
+    '''Return a request dict of kind for the load test.'''
+
+    if kind == DUEL:
+        return {'id': index, 'type': DUEL, 'hero': _record('One', 100 + index % 50),
+                'opponent': _record('Two', 120)}
+    return {'id': index, 'type': BATTLE,
+            'team_one': [_record(f'One {i}', 100 + i) for i in range(team_size)],
+            'team_two': [_record(f'Two {i}', 110 + i) for i in range(team_size)]}
+
+
+async def load_test(host, port, requests=1000, concurrency=32, kind=DUEL):
+    '''Send requests of kind over concurrency connections, each waiting for
+    its reply before sending the next, and return a dict with rps and
+    latency percentiles in milliseconds.
+    '''
+
+    latencies = []
+    errors = 0
+
+    async def client(count, start_index):
+        nonlocal errors
+        reader, writer = await asyncio.open_connection(host, port)
+        try:
+            for index in range(start_index, start_index + count):
+                line = json.dumps(sample_request(kind, index)).encode() + b'\n'
+                started = time.perf_counter()
+                writer.write(line)
+                await writer.drain()
+                reply = json.loads(await reader.readline())
+                latencies.append(time.perf_counter() - started)
+                if 'error' in reply:
+                    errors += 1
+        finally:
+            writer.close()
+            await writer.wait_closed()
+
+    shares = [requests // concurrency + (index < requests % concurrency)
+              for index in range(concurrency)]
+    starts = [sum(shares[:index]) for index in range(concurrency)]
+    started = time.perf_counter()
+    await asyncio.gather(*(client(count, start) for count, start in zip(shares, starts) if count))
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    return {'requests': len(latencies), 'errors': errors, 'seconds': elapsed,
+            'rps': len(latencies) / elapsed if elapsed else 0.0,
+            'p50_ms': percentile(latencies, 0.50) * 1e3,
+            'p99_ms': percentile(latencies, 0.99) * 1e3}
+
+
+async def _serve(args):
+    service = BattleService(args.host, args.port, args.max_queue, args.max_batch, seed=args.seed,
+                            max_rounds=args.max_rounds, max_duels=args.max_duels,
+                            max_team_size=args.max_team_size, max_line=args.max_line)
+    await service.start()
+    print(f'Serving on {service.host}:{service.port}')
+    await asyncio.Event().wait()
+
+
+async def _load(args):
+    if args.port:
+        return await load_test(args.host, args.port, args.requests, args.concurrency, args.kind)
+    async with BattleService(args.host, 0, args.max_queue, args.max_batch, seed=args.seed,
+                             max_rounds=args.max_rounds, max_duels=args.max_duels,
+                             max_team_size=args.max_team_size, max_line=args.max_line) as service:
+        result = await load_test(args.host, service.port, args.requests, args.concurrency, args.kind)
+        result['batches'] = service.batches
+        return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('command', choices=('serve', 'load'))
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=0,
+                        help='port to serve on, or of the service to load test '
+                             '(default for load = start one in this process)')
+    parser.add_argument('--max-queue', type=int, default=1024)
+    parser.add_argument('--max-batch', type=int, default=512)
+    parser.add_argument('--seed', type=int)
+    parser.add_argument('--max-rounds', type=int, default=MAX_ROUNDS,
+                        help='most rounds any duel may last')
+    parser.add_argument('--max-duels', type=int, default=MAX_DUELS,
+                        help='most duels any team battle may run')
+    parser.add_argument('--max-team-size', type=int, default=MAX_TEAM_SIZE,
+                        help='most heroes on either team of a battle')
+    parser.add_argument('--max-line', type=int, default=MAX_LINE,
+                        help='longest request line in bytes')
+    parser.add_argument('--requests', type=int, default=5000)
+    parser.add_argument('--concurrency', type=int, default=64)
+    parser.add_argument('--kind', choices=(DUEL, BATTLE), default=DUEL)
+    args = parser.parse_args(argv)
+
+    if args.command == 'serve':
+        asyncio.run(_serve(args))
+        return 0
+    result = asyncio.run(_load(args))
+    print(f'{result["requests"]} requests, {result["errors"]} errors in {result["seconds"]:.2f}s: '
+          f'{result["rps"]:,.0f} req/s, p50 {result["p50_ms"]:.2f} ms, p99 {result["p99_ms"]:.2f} ms')
+    if 'batches' in result:
+        print(f'{result["batches"]} batches, {result["requests"] / max(result["batches"], 1):.1f} requests/batch')
+    return 1 if result['errors'] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
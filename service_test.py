@@ -0,0 +1,137 @@
+import asyncio
+import json
+import threading
+import pytest
+from concurrent.futures import ThreadPoolExecutor
+
+pytest.importorskip("numpy")
+
+import service
+from superheroes import FIRST, TIMEOUT
+
+
+def hero(name, health=100, max_damage=50):
+    return {"name": name, "health": health, "abilities": [["Punch", max_damage]]}
+
+
+async def exchange(port, lines):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    for line in lines:
+        writer.write(line.encode() + b"\n")
+    await writer.drain()
+    replies = [json.loads(await reader.readline()) for _ in lines]
+    writer.close()
+    await writer.wait_closed()
+    return {reply["id"]: reply for reply in replies}
+
+
+def test_duels_and_battles_are_answered():
+    async def run():
+        async with service.BattleService(seed=1) as server:
+            requests = [
+                {"id": 1, "type": "duel", "hero": hero("Strong", max_damage=1000),
+                 "opponent": hero("Weak", max_damage=0)},
+                {"id": 2, "type": "battle", "team_one": [hero("A", max_damage=1000)],
+                 "team_two": [hero("B", max_damage=0), hero("C", max_damage=0)]},
+                {"id": 3, "type": "duel", "hero": {"health": 1}, "opponent": hero("X")},
+                {"id": 4, "type": "dance"},
+            ]
+            return await exchange(server.port, [json.dumps(request) for request in requests] + ["[]"])
+    replies = asyncio.run(run())
+    assert replies[1]["winner"] == FIRST
+    assert replies[1]["health_two"] <= 0
+    assert replies[2]["outcome"] == FIRST
+    assert replies[2]["kills_one"] == 2
+    assert "error" in replies[3]
+    assert "error" in replies[4]
+    assert "error" in replies[None]
+
+
+def test_concurrent_requests_are_batched():
+    async def run():
+        async with service.BattleService(max_queue=8, max_batch=64, seed=2) as server:
+            replies = await asyncio.gather(*(server.submit(service.sample_request("duel", index))
+                                             for index in range(40)))
+            return replies, server.batches
+    replies, batches = asyncio.run(run())
+    assert len(replies) == 40
+    assert all("winner" in reply for reply in replies)
+    assert batches < 40
+
+
+def test_load_test_reports_latency():
+    async def run():
+        async with service.BattleService(seed=3) as server:
+            return await service.load_test("127.0.0.1", server.port, requests=60, concurrency=6)
+    result = asyncio.run(run())
+    assert result["requests"] == 60
+    assert result["errors"] == 0
+    assert result["p99_ms"] >= result["p50_ms"] > 0
+    assert result["rps"] > 0
+
+
+def test_bad_duel_only_fails_itself():
+    good = {"type": "duel", "hero": hero("Strong", max_damage=1000), "opponent": hero("Weak", max_damage=0)}
+    bad = {"type": "duel", "hero": {"name": "Bad", "abilities": [["x", "12"]]}, "opponent": hero("Y")}
+    odd = {"type": "duel", "hero": {"name": "Odd", "abilities": [["x", 12.5]]}, "opponent": hero("Z")}
+    replies = service.run_requests([good, bad, odd, good], seed=3)
+    assert replies[0]["winner"] == replies[3]["winner"] == FIRST
+    assert "error" in replies[1] and "error" in replies[2]
+
+
+def test_round_and_duel_limits_are_checked_and_clamped():
+    healer = {"name": "Healer", "health": 100, "abilities": [["Jab", 50]], "armors": [["Bulwark", 200]]}
+    duel = {"type": "duel", "hero": healer, "opponent": dict(healer, name="Other")}
+    battle = {"type": "battle", "team_one": [healer], "team_two": [dict(healer, name="Other")]}
+    requests = [duel, dict(duel, max_rounds=[3]), dict(duel, max_rounds="5"),
+                dict(duel, max_rounds=-1), dict(duel, max_rounds=2.5), dict(duel, max_rounds=10 ** 9),
+                dict(battle, max_duels=-2), battle]
+    replies = service.run_requests(requests, seed=4, max_rounds=50, max_duels=3)
+    assert replies[0]["winner"] == TIMEOUT and replies[0]["rounds"] == 50
+    assert all("max_rounds" in replies[index]["error"] for index in range(1, 5))
+    assert replies[5]["rounds"] == 50
+    assert "max_duels" in replies[6]["error"]
+    assert replies[7]["outcome"] == TIMEOUT
+
+
+def test_long_lines_and_large_teams_are_refused():
+    async def run():
+        async with service.BattleService(seed=5, max_line=1024, max_team_size=2) as server:
+            reader, writer = await asyncio.open_connection("127.0.0.1", server.port)
+            writer.write(json.dumps({"id": 1, "type": "duel", "padding": "x" * 4096}).encode() + b"\n")
+            await writer.drain()
+            refused = json.loads(await reader.readline())
+            closed = await reader.read()
+            writer.close()
+            await writer.wait_closed()
+            battle = {"id": 2, "type": "battle", "team_one": [hero(f"A{i}") for i in range(3)],
+                      "team_two": [hero("B")]}
+            duel = {"id": 3, "type": "duel", "hero": hero("C"), "opponent": hero("D")}
+            return refused, closed, await exchange(server.port, [json.dumps(battle), json.dumps(duel)])
+    refused, closed, replies = asyncio.run(run())
+    assert "1024 bytes" in refused["error"]
+    assert closed == b""
+    assert "more than 2" in replies[2]["error"]
+    assert "winner" in replies[3]
+
+
+def test_duels_are_answered_while_a_battle_runs():
+    battle_executor = ThreadPoolExecutor(1)
+    release = threading.Event()
+    # Keep the battle executor busy until the duel has been answered.
+    battle_executor.submit(release.wait)
+
+    async def run():
+        async with service.BattleService(seed=6, battle_executor=battle_executor) as server:
+            battle = asyncio.create_task(server.submit(service.sample_request("battle", 1)))
+            duel = await asyncio.wait_for(server.submit(service.sample_request("duel", 2)), 5)
+            assert not battle.done()
+            release.set()
+            return duel, await asyncio.wait_for(battle, 5)
+    try:
+        duel, battle = asyncio.run(run())
+    finally:
+        release.set()
+        battle_executor.shutdown()
+    assert "winner" in duel
+    assert "outcome" in battle
@@ -0,0 +1,97 @@
+'''Random number streams for reproducible simulations.
+
+Every roll in superheroes goes through a random-like object: anything with
+the randint(), random() and choice() methods of random.Random. The random
+module itself is the default. A NumPy Generator is wrapped in NumpyRandom.
+
+spawn() splits one seed into independent child streams, one per worker, so a
+simulation can be replayed exactly however it was parallelized.
+'''
+
+import hashlib
+import random
+
+
+class NumpyRandom:
+    '''Gives a numpy.random.Generator the random.Random methods used by the
+    game.
+
+    generator: numpy.random.Generator
+    '''
+
+    __slots__ = ('generator',)
+
+    def __init__(self, generator):
+        self.generator = generator
+
+    def randint(self, a, b):
+        return int(self.generator.integers(a, b + 1))
+
+    def random(self):
+        return float(self.generator.random())
+
+    def choice(self, seq):
+        return seq[int(self.generator.integers(len(seq)))]
+
+    def shuffle(self, seq):
+        self.generator.shuffle(seq)
+
+    def getstate(self):
+        return self.generator.bit_generator.state
+
+    def setstate(self, state):
+        self.generator.bit_generator.state = state
+
+
+def as_random(rng=None):
+    '''Return a random-like object for rng.
+
+    rng: None (the random module), a seed, a random.Random, a
+        numpy.random.Generator or an object that is already random-like
+    '''
+
+    if rng is None:
+        return random
+    if isinstance(rng, int):
+        return random.Random(rng)
+    if hasattr(rng, 'bit_generator'):
+        return NumpyRandom(rng)
+    if hasattr(rng, 'randint'):
+        return rng
+    raise TypeError(f'Cannot use {type(rng).__name__} as a random number generator')
+
+
+def child_seeds(seed, count):
+    '''Derive count independent 128-bit seeds from seed.
+
+    seed: int or str
+    count: int
+    '''
+
+    seeds = []
+    for index in range(count):
+        digest = hashlib.sha256(f'{seed}/{index}'.encode()).digest()
+        seeds.append(int.from_bytes(digest[:16], 'little'))
+    return seeds
+
+
+def spawn(seed, count):
+    '''Split seed into count independent random.Random streams.
+
+    seed: int or str
+    count: int
+    '''
+
+    return [random.Random(child) for child in child_seeds(seed, count)]
+
+
+def spawn_generators(seed, count):
+    '''Split seed into count independent numpy.random.Generator streams.
+
+    seed: int
+    count: int
+    '''
+
+    import numpy as np
+
+    return [np.random.default_rng(child) for child in np.random.SeedSequence(seed).spawn(count)]
@@ -0,0 +1,92 @@
+import pytest
+import random
+import superheroes
+import streams
+from events import NullSink
+
+
+def build_team(name, size):
+    team = superheroes.Team(name)
+    for index in range(size):
+        hero = superheroes.Hero(f"{name} {index}", 200)
+        hero.add_ability(superheroes.Ability("Punch", 60))
+        hero.add_weapon(superheroes.Weapon("Sword", 40))
+        hero.add_armor(superheroes.Armor("Shield", 20))
+        team.add_hero(hero)
+    return team
+
+
+def replay_battle(rng):
+    team_one = build_team("One", 6)
+    team_two = build_team("Two", 6)
+    result = team_one.attack(team_two, NullSink(), rng)
+    return result, [(hero.current_health, hero.kills, hero.deaths)
+                    for hero in team_one.heroes + team_two.heroes]
+
+
+def test_as_random():
+    assert streams.as_random() is random
+    generator = random.Random(3)
+    assert streams.as_random(generator) is generator
+    assert isinstance(streams.as_random(5), random.Random)
+    with pytest.raises(TypeError):
+        streams.as_random("not a generator")
+
+
+def test_ability_uses_injected_rng():
+    sword = superheroes.Weapon("Sword", 1000)
+    first = [sword.attack(random.Random(9)) for _ in range(3)]
+    second = [sword.attack(random.Random(9)) for _ in range(3)]
+    assert first == second
+
+
+def test_team_battle_replays_with_same_seed():
+    assert replay_battle(random.Random(42)) == replay_battle(random.Random(42))
+
+
+def test_team_battle_with_numpy_generator():
+    np = pytest.importorskip("numpy")
+    first = replay_battle(np.random.default_rng(42))
+    second = replay_battle(np.random.default_rng(42))
+    assert first == second
+
+
+def test_items_accept_numpy_generator_and_seed():
+    np = pytest.importorskip("numpy")
+    items = [superheroes.Ability("Punch", 60), superheroes.Weapon("Sword", 40),
+             superheroes.Armor("Shield", 20)]
+    for item in items:
+        roll = item.block if isinstance(item, superheroes.Armor) else item.attack
+        low, high = item.bounds()
+        first = [roll(np.random.default_rng(5)) for _ in range(3)]
+        assert first == [roll(np.random.default_rng(5)) for _ in range(3)]
+        assert all(low <= value <= high for value in first)
+        assert roll(11) == roll(11)
+        with pytest.raises(TypeError, match="random number generator"):
+            roll("not a generator")
+
+
+def test_hero_rolls_convert_a_seed_once():
+    hero = superheroes.Hero("Trio")
+    for _ in range(3):
+        hero.add_ability(superheroes.Ability("Punch", 1000))
+    stream = random.Random(7)
+    assert hero.attack(7) == sum(ability.attack(stream) for ability in hero.abilities)
+    hero.tabulate()
+    assert hero.attack(7) == hero.attack(7)
+    assert hero.defend(7) == 0
+
+
+def test_spawn_gives_independent_reproducible_streams():
+    streams_one = streams.spawn(7, 3)
+    streams_two = streams.spawn(7, 3)
+    draws_one = [stream.random() for stream in streams_one]
+    assert draws_one == [stream.random() for stream in streams_two]
+    assert len(set(draws_one)) == 3
+
+
+def test_spawn_generators():
+    pytest.importorskip("numpy")
+    generators = streams.spawn_generators(7, 2)
+    assert generators[0].random() != generators[1].random()
+    assert streams.spawn_generators(7, 2)[0].random() == streams.spawn_generators(7, 2)[0].random()
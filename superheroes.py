@@ -1,4 +1,44 @@
 import random
+import sys
+
+import events
+import metrics
+import tracing
+from streams import as_random
+from distributions import AliasTable, support_size
+
+# Outcome codes returned by Hero.fight, from the point of view of the hero
+# that started the fight.
+DRAW = 0
+FIRST = 1
+SECOND = 2
+# Neither hero can ever lower the other's health.
+STALEMATE = 3
+# The fight reached its max_rounds with both heroes alive.
+TIMEOUT = 4
+
+# Rounds a fight may last when no max_rounds is given. Heroes whose armor
+# out-blocks each other's damage would otherwise heal forever.
+MAX_ROUNDS = 10000
+# Timed out duels per alive hero on the two teams after which a team battle
+# gives up with TIMEOUT.
+TIMEOUTS_PER_HERO = 1
+
+# random.Random and the random module are passed straight to the item rolls;
+# anything else goes through as_random first.
+_Random = random.Random
+
+
+def check_limit(name, value):
+    '''Raise ValueError if value, a round, duel or wave limit, is negative.
+
+    name: str
+    value: int or None
+    '''
+
+    if value is not None and value < 0:
+        raise ValueError(f'{name} must not be negative, not {value!r}')
+
 
 class Ability:
     '''An ability is an action that has a damage value.
@@ -7,27 +47,52 @@ class Ability:
     max_damage: int
     '''
 
+    __slots__ = ('name', 'max_damage')
+
     def __init__(self, name, max_damage):
         self.name = name
         self.max_damage = max_damage
 
-    def attack(self):
-        '''Return a random value between 0 and the initialized max_damage strength.'''
+    def attack(self, rng=random):
+        '''Return a random value between 0 and the initialized max_damage strength.
+
+        rng: random.Random, numpy.random.Generator or seed
+            (default = the random module)
+        '''
 
-        rand_hit = random.randint(0, self.max_damage)
+        if rng is not random and type(rng) is not _Random:
+            rng = as_random(rng)
+        rand_hit = rng.randint(0, self.max_damage)
         return rand_hit
 
+    def bounds(self):
+        '''Return the (low, high) range of attack().'''
+
+        return (0, self.max_damage)
+
 class Weapon(Ability):
     '''Weapon extends Ability'''
 
-    def attack(self):
+    __slots__ = ()
+
+    def attack(self, rng=random):
         '''This method overrides Ability.attack() and returns a random value
         between one half to the full attack power of the weapon.
+
+        rng: random.Random, numpy.random.Generator or seed
+            (default = the random module)
         '''
 
-        rand_attack = random.randint((self.max_damage//2), self.max_damage)
+        if rng is not random and type(rng) is not _Random:
+            rng = as_random(rng)
+        rand_attack = rng.randint((self.max_damage//2), self.max_damage)
         return rand_attack
 
+    def bounds(self):
+        '''Return the (low, high) range of attack().'''
+
+        return (self.max_damage//2, self.max_damage)
+
 class Armor:
     '''Armor is an action that returns a block value
 
@@ -35,32 +100,105 @@ class Armor:
     max_block: int
     '''
 
+    __slots__ = ('name', 'max_block')
+
     def __init__(self, name, max_block):
         self.name = name
         self.max_block = max_block
 
-    def block(self):
-        '''Return a random value between 0 and the initialized max_block strength.'''
+    def block(self, rng=random):
+        '''Return a random value between 0 and the initialized max_block strength.
 
-        rand_block = random.randint(0, self.max_block)
+        rng: random.Random, numpy.random.Generator or seed
+            (default = the random module)
+        '''
+
+        if rng is not random and type(rng) is not _Random:
+            rng = as_random(rng)
+        rand_block = rng.randint(0, self.max_block)
         return rand_block
 
+    def bounds(self):
+        '''Return the (low, high) range of block().'''
+
+        return (0, self.max_block)
+
 class Hero:
     '''Hero takes in abilities and armors and can use those values to attack
     other heroes.
 
     name: str
     starting_health: int (default = 100)
+
+    Calling tabulate() makes attack() and defend() draw their totals from
+    alias tables of the exact damage and block distributions instead of
+    rolling every ability and armor. The tables are rebuilt whenever the
+    loadout changes.
+
+    team is the Team the hero is on; a hero is on at most one team. The team
+    is told whenever current_health makes the hero die or come back to life
+    and whenever kills or deaths change, through add_kill, add_deaths or
+    plain assignment, so it can keep its alive index and running totals up
+    to date.
+
+    Observers added with add_observer() have their loadout_changed(hero)
+    called after every add_ability, add_weapon and add_armor.
     '''
 
+    __slots__ = ('name', 'starting_health', '_current_health', 'abilities', 'armors',
+                 '_deaths', '_kills', 'use_tables', '_attack_table', '_block_table', 'team',
+                 '_observers', '__weakref__')
+
+    # Largest number of distinct totals tabulate() builds a table for.
+    table_limit = 1 << 16
+
     def __init__(self, name, starting_health=100):
         self.name = name
         self.starting_health = starting_health
-        self.current_health = starting_health
+        self._current_health = starting_health
+        self.team = None
         self.abilities = []
         self.armors = []
-        self.deaths = 0
-        self.kills = 0
+        self._deaths = 0
+        self._kills = 0
+        self.use_tables = False
+        self._attack_table = None
+        self._block_table = None
+        self._observers = ()
+
+    @property
+    def current_health(self):
+        return self._current_health
+
+    @current_health.setter
+    def current_health(self, value):
+        was_alive = self._current_health > 0
+        self._current_health = value
+        if self.team is not None and was_alive != (value > 0):
+            if was_alive:
+                self.team._hero_died(self)
+            else:
+                self.team._hero_revived(self)
+
+    @property
+    def kills(self):
+        return self._kills
+
+    @kills.setter
+    def kills(self, value):
+        if self.team is not None:
+            self.team.total_kills += value - self._kills
+        self._kills = value
+
+    @property
+    def deaths(self):
+        return self._deaths
+
+    @deaths.setter
+    def deaths(self, value):
+        if self.team is not None:
+            self.team.total_deaths += value - self._deaths
+        self._deaths = value
 
     def add_kill(self, num_kills):
         '''Update kills with num_kills.
@@ -68,7 +206,9 @@ class Hero:
         num_kills: int
         '''
 
-        self.kills += num_kills
+        self._kills += num_kills
+        if self.team is not None:
+            self.team.total_kills += num_kills
 
     def add_deaths(self, num_deaths):
         '''Update deaths with num_deaths.
@@ -76,7 +216,9 @@ class Hero:
         num_deaths: int
         '''
 
-        self.deaths += num_deaths
+        self._deaths += num_deaths
+        if self.team is not None:
+            self.team.total_deaths += num_deaths
 
     def add_ability(self, ability):
         '''Adds all abilities to ability list.
@@ -84,14 +226,78 @@ class Hero:
         ability: Ability Object
         '''
 
+        self._own_loadout()
         self.abilities.append(ability)
+        self._loadout_changed()
+
+    def tabulate(self, enabled=True):
+        '''Turn alias-table sampling for attack() and defend() on or off.
+
+        enabled: bool (default = True)
+        '''
+
+        self.use_tables = enabled
+        self._loadout_changed()
+
+    def _own_loadout(self):
+        '''Swap shared loadout tuples (see flyweight) for lists of the hero's
+        own before they are changed.
+        '''
+
+        if type(self.abilities) is tuple:
+            self.abilities = list(self.abilities)
+        if type(self.armors) is tuple:
+            self.armors = list(self.armors)
+
+    def _loadout_changed(self):
+        '''Drop the alias tables so they are rebuilt for the new loadout and
+        tell the observers.
+        '''
+
+        self._attack_table = None
+        self._block_table = None
+        for observer in self._observers:
+            observer.loadout_changed(self)
+
+    def add_observer(self, observer):
+        '''Call observer.loadout_changed(hero) whenever the loadout changes.
+
+        observer: any object with a loadout_changed(hero) method
+        '''
+
+        if observer not in self._observers:
+            self._observers += (observer,)
+
+    def remove_observer(self, observer):
+        self._observers = tuple(item for item in self._observers if item is not observer)
+
+    def _table(self, items):
+        '''Build an alias table for the summed rolls of items, or return False
+        if the distribution has more than table_limit values.
+        '''
+
+        bounds = [item.bounds() for item in items]
+        if support_size(bounds) > self.table_limit:
+            return False
+        return AliasTable.from_bounds(bounds)
 
-    def attack(self):
-        '''Calculate the total damage from all ability attacks.'''
+    def attack(self, rng=random):
+        '''Calculate the total damage from all ability attacks.
 
+        rng: random.Random, numpy.random.Generator or seed
+            (default = the random module)
+        '''
+
+        if rng is not random and type(rng) is not _Random:
+            rng = as_random(rng)
+        if self.use_tables:
+            if self._attack_table is None:
+                self._attack_table = self._table(self.abilities)
+            if self._attack_table:
+                return self._attack_table.sample(rng)
         total_damage = 0
         for ability in self.abilities:
-            total_damage += ability.attack()
+            total_damage += ability.attack(rng)
         return total_damage
 
     def add_armor(self, armor):
@@ -100,25 +306,66 @@ class Hero:
         armor: Armor Object
         '''
 
+        self._own_loadout()
         self.armors.append(armor)
+        self._loadout_changed()
 
-    def defend(self):
+    def defend(self, rng=random):
         '''Runs `block` method on each armor.
         Returns sum of all blocks.
+
+        rng: random.Random, numpy.random.Generator or seed
+            (default = the random module)
         '''
 
+        if rng is not random and type(rng) is not _Random:
+            rng = as_random(rng)
+        if self.use_tables:
+            if self._block_table is None:
+                self._block_table = self._table(self.armors)
+            if self._block_table:
+                return self._block_table.sample(rng)
         total_blocked = 0
         for armor in self.armors:
-            total_blocked += armor.block()
+            total_blocked += armor.block(rng)
         return total_blocked
 
-    def take_damage(self, damage):
+    def take_damage(self, damage, rng=random):
         '''Updates self.current_health to reflect the damage minus the defense.
 
+        Returns the amount blocked.
+
         damage:int
+        rng: random.Random, numpy.random.Generator or seed
+            (default = the random module)
         '''
 
-        self.current_health -= (damage - self.defend())
+        blocked = self.defend(rng)
+        self.current_health -= (damage - blocked)
+        if metrics.enabled:
+            metrics.record_damage(damage, blocked)
+        return blocked
+
+    def damage_bounds(self):
+        '''Return the (low, high) range of attack().'''
+
+        bounds = [ability.bounds() for ability in self.abilities]
+        return (sum(low for low, _ in bounds), sum(high for _, high in bounds))
+
+    def block_bounds(self):
+        '''Return the (low, high) range of defend().'''
+
+        bounds = [armor.bounds() for armor in self.armors]
+        return (sum(low for low, _ in bounds), sum(high for _, high in bounds))
+
+    def can_hurt(self, opponent):
+        '''Return True if this hero's best attack beats opponent's weakest
+        block, so it can lower opponent's health at all.
+
+        opponent: Hero Object
+        '''
+
+        return self.damage_bounds()[1] > opponent.block_bounds()[0]
 
     def is_alive(self):
         '''Return True or False depending on whether the hero is alive or not.
@@ -126,36 +373,111 @@ class Hero:
 
         return self.current_health > 0
 
-    def fight(self, opponent):
+    def fight(self, opponent, sink=None, rng=None, max_rounds=None):
         '''Heroes fight by attacking each other and taking damage.
         Exits loop if either one of their health reaches 0.
         Returns draw if there are no abilities in the Hero object
 
-        Adds kills and deaths to respective Hero objects.
+        Adds kills and deaths to respective Hero objects and returns FIRST if
+        this hero won, SECOND if the opponent won or DRAW otherwise.
+
+        Returns STALEMATE without fighting if neither hero can hurt the other,
+        and TIMEOUT if both are still alive after max_rounds rounds, which is
+        MAX_ROUNDS unless given. Neither outcome adds kills or deaths.
+
+        While a tracing.Recorder is started every round is recorded.
 
         opponent: Hero Object
+        sink: event sink (default = events.get_sink())
+        rng: random.Random, numpy.random.Generator or seed
+            (default = the random module)
+        max_rounds: int (default = None, MAX_ROUNDS)
         '''
 
-        if (len(self.abilities) + len(opponent.abilities)) > 0:
-            while self.is_alive() and opponent.is_alive():
-                self.take_damage(opponent.attack())
-                opponent.take_damage(self.attack())
-            if self.is_alive():
-                print(f'{self.name} won a battle.')
+        if sink is None:
+            sink = events.get_sink()
+        if max_rounds is None:
+            max_rounds = MAX_ROUNDS
+        check_limit('max_rounds', max_rounds)
+        rng = as_random(rng)
+        timing = metrics.enabled
+        if timing:
+            rng = metrics.counting(rng)
+            start = metrics.clock()
+        recorder = tracing.recorder
+        if recorder is not None:
+            # Resolved up front, so a hero the trace cannot hold raises
+            # before the duel changes anything.
+            member_one, member_two = recorder.pair(self, opponent)
+            start_one = self._current_health
+            start_two = opponent._current_health
+            first_round = recorder.size
+        result = DRAW
+        rounds = 0
+        if (len(self.abilities) + len(opponent.abilities)) == 0:
+            sink.emit(events.NO_CONTEST, self, opponent)
+        elif (self.is_alive() and opponent.is_alive()
+                and not (self.can_hurt(opponent) or opponent.can_hurt(self))):
+            sink.emit(events.DUEL_STALEMATE, self, opponent)
+            result = STALEMATE
+        else:
+            sink.emit(events.DUEL_START, self, opponent)
+            if recorder is None:
+                while self.is_alive() and opponent.is_alive() and rounds != max_rounds:
+                    self.take_damage(opponent.attack(rng), rng)
+                    opponent.take_damage(self.attack(rng), rng)
+                    rounds += 1
+            else:
+                # The same rounds, packed straight into the recorder's
+                # preallocated int64 array. The health values the row needs
+                # also decide whether both heroes are still alive.
+                trace = recorder.rounds
+                write = recorder.write_round
+                position = first_round
+                limit = recorder.limit
+                step = tracing.ROUND_SIZE
+                stop = first_round + max_rounds * step
+                alive = self.is_alive() and opponent.is_alive()
+                while alive and position != stop:
+                    damage_one = opponent.attack(rng)
+                    block_one = self.take_damage(damage_one, rng)
+                    damage_two = self.attack(rng)
+                    block_two = opponent.take_damage(damage_two, rng)
+                    health_one = self._current_health
+                    health_two = opponent._current_health
+                    if position == limit:
+                        limit = recorder.grow()
+                    write(trace, position, damage_one, block_one, health_one,
+                          damage_two, block_two, health_two)
+                    position += step
+                    alive = health_one > 0 and health_two > 0
+                recorder.size = position
+                rounds = (position - first_round) // step
+            if self.is_alive() and opponent.is_alive():
+                sink.emit(events.DUEL_TIMEOUT, self, opponent)
+                result = TIMEOUT
+            elif self.is_alive():
+                sink.emit(events.DUEL_END, self, opponent)
                 self.add_kill(1)
                 opponent.add_deaths(1)
+                result = FIRST
             elif opponent.is_alive():
-                print(f'{opponent.name} won a battle.')
+                sink.emit(events.DUEL_END, opponent, self)
                 opponent.add_kill(1)
                 self.add_deaths(1)
+                result = SECOND
             else:
-                print(f'{self.name} and {opponent.name} drew the battle')
+                sink.emit(events.DUEL_DRAW, self, opponent)
                 self.add_deaths(1)
                 self.add_kill(1)
                 opponent.add_kill(1)
                 opponent.add_deaths(1)
-        else:
-            print('Draw')
+        if recorder is not None:
+            recorder.duel(member_one, member_two, first_round, rounds, start_one, start_two,
+                          result)
+        if timing:
+            metrics.record_fight(rounds, result == DRAW, metrics.clock() - start)
+        return result
 
     def add_weapon(self, weapon):
         '''Adds weapon to self.abilities
@@ -163,95 +485,515 @@ class Hero:
         weapon: Weapon object
         '''
 
+        self._own_loadout()
         self.abilities.append(weapon)
+        self._loadout_changed()
+
+class _AliveBounds:
+    '''The alive heroes of a team sorted by best attack and by weakest block,
+    read when a battle first needs them. Heroes only leave the alive index
+    during a battle, so best_attack() and weakest_block() skip past the dead
+    ones and cost amortized O(1).
+
+    team: Team Object
+    '''
+
+    def __init__(self, team):
+        self.team = team
+        heroes = team._alive
+        self.attacks = sorted(((hero.damage_bounds()[1], hero) for hero in heroes),
+                              key=lambda entry: entry[0], reverse=True)
+        self.blocks = sorted(((hero.block_bounds()[0], hero) for hero in heroes),
+                             key=lambda entry: entry[0])
+        self.attack_at = 0
+        self.block_at = 0
+
+    def best_attack(self):
+        alive = self.team._alive_index
+        while self.attacks[self.attack_at][1] not in alive:
+            self.attack_at += 1
+        return self.attacks[self.attack_at][0]
+
+    def weakest_block(self):
+        alive = self.team._alive_index
+        while self.blocks[self.block_at][1] not in alive:
+            self.block_at += 1
+        return self.blocks[self.block_at][0]
 
 class Team:
     '''Initialize your team with its team name, and takes in lists of hero objects.
 
     name: str
+
+    Heroes are stored in insertion order and indexed by name, so lookups and
+    removals by name are O(1) per hero. Alive heroes are kept in a second
+    index that supports O(1) random selection and O(1) removal, so a battle
+    between teams of n heroes runs in O(n).
+
+    total_kills and total_deaths are running totals over the current heroes,
+    so stats() and alive_count() are O(1).
+
+    A hero is on at most one team. Adding a hero that is on another team
+    moves it: it leaves the old team, taking its kills, deaths and alive
+    state out of that team's totals. Adding a hero that is already on this
+    team does nothing.
+
+    Observers added with add_observer() have hero_added(team, hero) and
+    hero_removed(team, hero) called whenever the roster changes.
     '''
 
     def __init__(self, name):
         self.name = name
-        self.heroes = []
+        self.total_kills = 0
+        self.total_deaths = 0
+        self._roster = {}
+        # Tuple of the roster handed out by heroes, dropped when it changes.
+        self._heroes = None
+        self._by_name = {}
+        self._alive = []
+        self._alive_index = {}
+        self._observers = []
+
+    @property
+    def heroes(self):
+        '''Tuple of the team's heroes in the order they were added. It is a
+        snapshot; use add_hero and remove_hero to change the roster. The
+        same tuple is returned until the roster changes.
+        '''
+
+        if self._heroes is None:
+            self._heroes = tuple(self._roster)
+        return self._heroes
+
+    def _discard(self, hero):
+        '''Remove one hero that is moving to another team.'''
+
+        del self._roster[hero]
+        self._heroes = None
+        named = self._by_name[hero.name]
+        del named[hero]
+        if not named:
+            del self._by_name[hero.name]
+        self._forget(hero)
+
+    def _forget(self, hero):
+        '''Take hero's counters and alive state out of this team's totals.'''
+
+        self._hero_died(hero)
+        self.total_kills -= hero.kills
+        self.total_deaths -= hero.deaths
+        hero.team = None
+        for observer in self._observers:
+            observer.hero_removed(self, hero)
+
+    def _hero_died(self, hero):
+        '''Swap hero out of the alive index.'''
+
+        index = self._alive_index.pop(hero, None)
+        if index is None:
+            return
+        last = self._alive.pop()
+        if last is not hero:
+            self._alive[index] = last
+            self._alive_index[last] = index
+
+    def _hero_revived(self, hero):
+        '''Add hero to the alive index.'''
+
+        if hero not in self._alive_index:
+            self._alive_index[hero] = len(self._alive)
+            self._alive.append(hero)
+
+    def _rebuild_alive(self):
+        '''Rebuild the alive index in roster order.'''
+
+        self._alive = [hero for hero in self._roster if hero.is_alive() and hero.team is self]
+        self._alive_index = {hero: index for index, hero in enumerate(self._alive)}
+
+    def _alive_positions(self):
+        '''Return the roster positions of the alive heroes in alive index
+        order, which is the order attack() picks from.
+        '''
+
+        position = {hero: index for index, hero in enumerate(self._roster)}
+        return [position[hero] for hero in self._alive]
+
+    def _restore(self, health, kills, deaths, alive):
+        '''Set every hero's health and counters in roster order and rebuild
+        the alive index from roster positions, as saved by a checkpoint.
+        '''
+
+        heroes = list(self._roster)
+        for hero, hero_health, hero_kills, hero_deaths in zip(heroes, health, kills, deaths):
+            hero._current_health = hero_health
+            hero._kills = hero_kills
+            hero._deaths = hero_deaths
+        self.total_kills = sum(kills)
+        self.total_deaths = sum(deaths)
+        self._alive = [heroes[position] for position in alive]
+        self._alive_index = {hero: index for index, hero in enumerate(self._alive)}
+
+    def get_hero(self, name):
+        '''Return the first hero added with name, or None.
+
+        name: str
+        '''
+
+        named = self._by_name.get(name)
+        if named:
+            return next(iter(named))
+        return None
 
     def remove_hero(self, name):
-        '''Remove hero from heroes list. If Hero isn't found return 0.
+        '''Remove every hero called name from the team and return how many
+        were removed. If Hero isn't found return 0.
 
         name: str
         '''
 
-        for hero in self.heroes:
-            if name == hero.name:
-                self.heroes.remove(hero)
-            else:
-                pass
-        return 0
+        named = self._by_name.pop(name, None)
+        if not named:
+            return 0
+        self._heroes = None
+        for hero in named:
+            del self._roster[hero]
+            self._forget(hero)
+        return len(named)
 
-    def view_all_heroes(self):
-        '''Prints out all heroes to the console in self.heroes'''
+    def remove_heroes(self, names):
+        '''Remove every hero whose name is in names and return how many were
+        removed.
 
-        for hero in self.heroes:
-            print(hero.name)
+        names: iterable of str
+        '''
+
+        removed = 0
+        for name in names:
+            removed += self.remove_hero(name)
+        return removed
+
+    def view_all_heroes(self, sink=None):
+        '''Prints out all heroes to the console in self.heroes
+
+        sink: event sink (default = events.get_sink())
+        '''
+
+        if sink is None:
+            sink = events.get_sink()
+        for hero in self._roster:
+            sink.emit(events.HERO_LISTED, hero)
 
     def add_hero(self, hero):
-        '''Add Hero object to self.heroes
+        '''Add Hero object to self.heroes, moving it off the team it was on.
+        Does nothing if the hero is already on this team.
 
         hero: Hero Object
         '''
 
-        self.heroes.append(hero)
+        if hero.team is self:
+            return
+        if hero.team is not None:
+            #A hero belongs to one team at a time
+            hero.team._discard(hero)
+        hero.team = self
+        self.total_kills += hero.kills
+        self.total_deaths += hero.deaths
+        self._roster[hero] = None
+        self._heroes = None
+        self._by_name.setdefault(hero.name, {})[hero] = None
+        if hero.is_alive():
+            self._hero_revived(hero)
+        for observer in self._observers:
+            observer.hero_added(self, hero)
+
+    def add_observer(self, observer):
+        '''Call observer.hero_added(team, hero) and
+        observer.hero_removed(team, hero) whenever the roster changes.
+
+        observer: any object with hero_added and hero_removed methods
+        '''
 
-    def attack(self, other_team):
+        if observer not in self._observers:
+            self._observers.append(observer)
+
+    def remove_observer(self, observer):
+        if observer in self._observers:
+            self._observers.remove(observer)
+
+    @staticmethod
+    def _stalemate(bounds_one, bounds_two):
+        '''Return True if no alive hero on either team can hurt any alive hero
+        on the other. Both teams must have alive heroes.
+
+        bounds_one, bounds_two: _AliveBounds Objects
+        '''
+
+        return (bounds_one.best_attack() <= bounds_two.weakest_block()
+                and bounds_two.best_attack() <= bounds_one.weakest_block())
+
+    def attack(self, other_team, sink=None, rng=None, max_rounds=None, max_duels=None):
         '''Battle each team against each other. Selects a hero randomly from each
         team's list of heroes and battles them against each other.
 
         Loop ends when one team's kills totals the amount of heroes in the other
-        team's hero list.
+        team's hero list. Returns FIRST if this team won, SECOND if other_team
+        won or DRAW otherwise.
+
+        Returns STALEMATE once no alive hero can hurt any alive opponent, and
+        TIMEOUT after max_duels duels with heroes alive on both sides, or once
+        TIMEOUTS_PER_HERO duels per alive hero have timed out.
 
         other_team = Team Object
+        sink: event sink (default = events.get_sink())
+        rng: random.Random, numpy.random.Generator or seed
+            (default = the random module)
+        max_rounds: int, passed to every Hero.fight (default = None, MAX_ROUNDS)
+        max_duels: int (default = None, no limit)
         '''
 
-        attacking = True
-        print('\n')
-        while attacking:
-            #Assigns heroes to different list to battle
-            first_team = []
-            second_team = []
-            for hero in self.heroes:
-                if hero.is_alive():
-                    first_team.append(hero)
-            for hero in other_team.heroes:
-                if hero.is_alive():
-                    second_team.append(hero)
+        check_limit('max_rounds', max_rounds)
+        check_limit('max_duels', max_duels)
+        if sink is None:
+            sink = events.get_sink()
+        rng = as_random(rng)
+        timing = metrics.enabled
+        if timing:
+            rng = metrics.counting(rng)
+            start = metrics.clock()
+            selecting = fighting = 0.0
+        recorder = tracing.recorder
+        if recorder is not None:
+            recorder.start_battle(self, other_team)
+        max_timeouts = TIMEOUTS_PER_HERO * (len(self._alive) + len(other_team._alive))
+        bounds = None
+        result = None
+        duels = timeouts = 0
+        sink.emit(events.BATTLE_START, self, other_team)
+        while result is None:
+            #Alive indexes drop heroes as soon as they die in a fight
+            first_team = self._alive
+            second_team = other_team._alive
 
             #Checks if there are any heroes remaining in the heroes list
             #Chooses heroes from the lists and fights if there are.
             if len(first_team) == 0:
                 if len(second_team) == 0:
-                    print('Its a draw!')
-                    attacking = False
+                    sink.emit(events.TEAM_DRAW, self, other_team)
+                    result = DRAW
                 else:
-                    print(f'{other_team.name} has won!')
-                    attacking = False
+                    sink.emit(events.TEAM_WIN, other_team, self)
+                    result = SECOND
             elif len(second_team) == 0:
-                if len(first_team) == 0:
-                    print('Its a draw!')
-                    attacking = False
-                else:
-                    print(f'{self.name} has won!')
-                    attacking = False
+                sink.emit(events.TEAM_WIN, self, other_team)
+                result = FIRST
+            elif duels == max_duels or timeouts >= max_timeouts:
+                sink.emit(events.TEAM_TIMEOUT, self, other_team)
+                result = TIMEOUT
             else:
                 #Calls the heroes to fight
-                first_hero = random.choice(first_team)
-                second_hero = random.choice(second_team)
-                first_hero.fight(second_hero)
+                if timing:
+                    picked = metrics.clock()
+                first_hero = rng.choice(first_team)
+                second_hero = rng.choice(second_team)
+                if timing:
+                    fought = metrics.clock()
+                    selecting += fought - picked
+                if first_hero.fight(second_hero, sink, rng, max_rounds) == TIMEOUT:
+                    timeouts += 1
+                duels += 1
+                if timing:
+                    fighting += metrics.clock() - fought
+                #Nobody died, so check whether anyone still can
+                if first_hero.is_alive() and second_hero.is_alive():
+                    if bounds is None:
+                        bounds = (_AliveBounds(self), _AliveBounds(other_team))
+                    if self._stalemate(*bounds):
+                        sink.emit(events.TEAM_STALEMATE, self, other_team)
+                        result = STALEMATE
+        if recorder is not None:
+            recorder.end_battle(result)
+        if timing:
+            metrics.record_battle(metrics.clock() - start, selecting, fighting)
+        return result
+
+    def wave_attack(self, other_team, sink=None, rng=None, max_rounds=None, max_waves=None):
+        '''Battle the teams in waves. Every wave shuffles both teams' alive
+        heroes, pairs them up and plays all of the pairs' duels at once with
+        batch.fight_rows; heroes left without a partner sit the wave out.
+        Loadouts are read once, when the battle starts.
+        Health, kills and deaths are kept in arrays during the battle and
+        written back to the heroes once it ends, so the heroes end up as if
+        the duels had been fought one by one with Hero.fight. Duel events are
+        only built when sink is not an events.NullSink, and sinks see the
+        heroes as they were when the battle started. Needs NumPy, and the
+        duels are not traced.
+
+        Returns FIRST, SECOND, DRAW, STALEMATE or TIMEOUT as attack() does,
+        with TIMEOUT after max_waves waves or once TIMEOUTS_PER_HERO duels per
+        alive hero have timed out.
+
+        other_team = Team Object
+        sink: event sink (default = events.get_sink())
+        rng: random.Random, numpy.random.Generator or seed (default = None,
+            a fresh Generator)
+        max_rounds: int, limit for every duel (default = None, MAX_ROUNDS)
+        max_waves: int (default = None, no limit)
+        '''
+
+        import batch
+        import numpy as np
+        check_limit('max_rounds', max_rounds)
+        check_limit('max_waves', max_waves)
+        if sink is None:
+            sink = events.get_sink()
+        quiet = type(sink) is events.NullSink
+        rng = batch.as_generator(rng)
+        timing = metrics.enabled
+        if timing:
+            start = metrics.clock()
+            selecting = fighting = 0.0
+        loadouts_one = batch.Loadouts(self._alive)
+        loadouts_two = batch.Loadouts(other_team._alive)
+        heroes_one = loadouts_one.heroes
+        heroes_two = loadouts_two.heroes
+        # Everything below is indexed by loadout row.
+        health_one = np.array([hero.current_health for hero in heroes_one], dtype=np.int64)
+        health_two = np.array([hero.current_health for hero in heroes_two], dtype=np.int64)
+        kills_one = np.zeros(len(heroes_one), dtype=np.int64)
+        kills_two = np.zeros(len(heroes_two), dtype=np.int64)
+        deaths_one = np.zeros(len(heroes_one), dtype=np.int64)
+        deaths_two = np.zeros(len(heroes_two), dtype=np.int64)
+        fought_one = np.zeros(len(heroes_one), dtype=bool)
+        fought_two = np.zeros(len(heroes_two), dtype=bool)
+        alive_one = np.arange(len(heroes_one))
+        alive_two = np.arange(len(heroes_two))
+        max_timeouts = TIMEOUTS_PER_HERO * (len(heroes_one) + len(heroes_two))
+        result = None
+        waves = timeouts = 0
+        sink.emit(events.BATTLE_START, self, other_team)
+        while alive_one.size and alive_two.size:
+            if waves == max_waves or timeouts >= max_timeouts:
+                result = TIMEOUT
+                break
+            if timing:
+                picked = metrics.clock()
+            size = min(alive_one.size, alive_two.size)
+            rows_one = alive_one[rng.permutation(alive_one.size)[:size]]
+            rows_two = alive_two[rng.permutation(alive_two.size)[:size]]
+            if timing:
+                fought = metrics.clock()
+                selecting += fought - picked
+            outcome = batch.fight_rows(loadouts_one, rows_one, loadouts_two, rows_two,
+                                       rng, max_rounds, health_one[rows_one], health_two[rows_two])
+            if timing:
+                fighting += metrics.clock() - fought
+            waves += 1
+            winner = outcome.winner
+            # Stalemates and no contests leave both heroes untouched.
+            started = (winner != STALEMATE) & ((winner != DRAW)
+                                               | (outcome.health_one <= 0)
+                                               | (outcome.health_two <= 0))
+            health_one[rows_one[started]] = outcome.health_one[started]
+            health_two[rows_two[started]] = outcome.health_two[started]
+            fought_one[rows_one[started]] = True
+            fought_two[rows_two[started]] = True
+            # A hero is in at most one duel per wave, so the rows are unique.
+            first_died = outcome.health_one <= 0
+            second_died = outcome.health_two <= 0
+            kills_one[rows_one[second_died]] += 1
+            deaths_one[rows_one[first_died]] += 1
+            kills_two[rows_two[first_died]] += 1
+            deaths_two[rows_two[second_died]] += 1
+            timeouts += int(np.count_nonzero(winner == TIMEOUT))
+            if not quiet:
+                self._emit_wave(sink, heroes_one, rows_one, heroes_two, rows_two, outcome)
+            if first_died.any() or second_died.any():
+                alive_one = alive_one[health_one[alive_one] > 0]
+                alive_two = alive_two[health_two[alive_two] > 0]
+            #Nobody died, so check whether anyone still can
+            elif (loadouts_one.best_attack[alive_one].max()
+                  <= loadouts_two.weakest_block[alive_two].min()
+                  and loadouts_two.best_attack[alive_two].max()
+                  <= loadouts_one.weakest_block[alive_one].min()):
+                result = STALEMATE
+                break
+        self._settle(heroes_one, fought_one, health_one, kills_one, deaths_one)
+        other_team._settle(heroes_two, fought_two, health_two, kills_two, deaths_two)
+        if result == TIMEOUT:
+            sink.emit(events.TEAM_TIMEOUT, self, other_team)
+        elif result == STALEMATE:
+            sink.emit(events.TEAM_STALEMATE, self, other_team)
+        elif alive_one.size:
+            sink.emit(events.TEAM_WIN, self, other_team)
+            result = FIRST
+        elif alive_two.size:
+            sink.emit(events.TEAM_WIN, other_team, self)
+            result = SECOND
+        else:
+            sink.emit(events.TEAM_DRAW, self, other_team)
+            result = DRAW
+        if timing:
+            metrics.record_battle(metrics.clock() - start, selecting, fighting)
+        return result
+
+    def _settle(self, heroes, fought, health, kills, deaths):
+        '''Write the health, kills and deaths wave_attack kept in arrays back
+        to the heroes that fought and drop the dead from the alive index in
+        one pass.
+
+        heroes: list of the team's alive heroes when the battle started
+        fought: bool array, True for every hero that fought a duel
+        health, kills, deaths: int arrays indexed like heroes
+        '''
+
+        rows = fought.nonzero()[0]
+        for row, hero_health, hero_kills, hero_deaths in zip(
+                rows.tolist(), health[rows].tolist(), kills[rows].tolist(),
+                deaths[rows].tolist()):
+            hero = heroes[row]
+            hero._current_health = hero_health
+            hero._kills += hero_kills
+            hero._deaths += hero_deaths
+        self.total_kills += int(kills.sum())
+        self.total_deaths += int(deaths.sum())
+        if deaths.any():
+            self._alive = [hero for hero in self._alive if hero._current_health > 0]
+            self._alive_index = {hero: index for index, hero in enumerate(self._alive)}
+
+    @staticmethod
+    def _emit_wave(sink, heroes_one, rows_one, heroes_two, rows_two, outcome):
+        '''Emit the duel events of one wave_attack wave, in the order
+        Hero.fight would.
+
+        outcome: batch.BatchResult of the wave
+        '''
+
+        for row_one, row_two, winner, health_one, health_two in zip(
+                rows_one.tolist(), rows_two.tolist(), outcome.winner.tolist(),
+                outcome.health_one.tolist(), outcome.health_two.tolist()):
+            first_hero = heroes_one[row_one]
+            second_hero = heroes_two[row_two]
+            if winner == STALEMATE:
+                sink.emit(events.DUEL_STALEMATE, first_hero, second_hero)
+            elif winner == DRAW and health_one > 0 and health_two > 0:
+                sink.emit(events.NO_CONTEST, first_hero, second_hero)
+            else:
+                sink.emit(events.DUEL_START, first_hero, second_hero)
+                if winner == TIMEOUT:
+                    sink.emit(events.DUEL_TIMEOUT, first_hero, second_hero)
+                elif winner == FIRST:
+                    sink.emit(events.DUEL_END, first_hero, second_hero)
+                elif winner == SECOND:
+                    sink.emit(events.DUEL_END, second_hero, first_hero)
+                else:
+                    sink.emit(events.DUEL_DRAW, first_hero, second_hero)
 
     def revive_heroes(self):
         '''Reset all heroes health to starting_health in heroes list.'''
 
-        for hero in self.heroes:
-            hero.current_health = hero.starting_health
+        for hero in self._roster:
+            hero._current_health = hero.starting_health
+        self._rebuild_alive()
 
     def stats(self):
         '''Prints team statistics by taking in each heroe's kill and death count.
@@ -259,27 +1001,31 @@ class Team:
         '''
 
         kdr = 0
-        total_kills = 0
-        total_deaths = 0
-        for hero in self.heroes:
-            total_kills += hero.kills
-            total_deaths += hero.deaths
-        if total_deaths == 0:
-            kdr = total_kills
+        if self.total_deaths == 0:
+            kdr = self.total_kills
         else:
-            kdr = total_kills/total_deaths
+            kdr = self.total_kills/self.total_deaths
         return kdr
 
-    def surviving_victors(self):
+    def alive_count(self):
+        '''Return the number of heroes on the team that are still alive.'''
+
+        return len(self._alive)
+
+    def surviving_victors(self, sink=None):
         '''
         Finds the surviving Heroes and prints them to terminal.
         If there is someone alive in a list of heroes, then it returns that
         that team has won.
+
+        sink: event sink (default = events.get_sink())
         '''
 
-        for hero in self.heroes:
+        if sink is None:
+            sink = events.get_sink()
+        for hero in self._roster:
             if hero.is_alive():
-                print(hero.name)
+                sink.emit(events.SURVIVOR, hero)
 
 class Arena:
     '''Uses Team objects to 'battle' against each other. Also creates functions
@@ -348,6 +1094,28 @@ class Arena:
             self.team_two.add_hero(self.create_hero())
         pass
 
+    def load_team_one(self, source, format=None):
+        '''Streams heroes from a CSV or JSON Lines roster file into team_one
+        instead of prompting for them. Returns a LoadReport.
+
+        source: path or open text file
+        format: 'csv' or 'jsonl' (default = from the file extension)
+        '''
+
+        import roster
+        return roster.load_team(source, self.team_one, format)[1]
+
+    def load_team_two(self, source, format=None):
+        '''Streams heroes from a CSV or JSON Lines roster file into team_two
+        instead of prompting for them. Returns a LoadReport.
+
+        source: path or open text file
+        format: 'csv' or 'jsonl' (default = from the file extension)
+        '''
+
+        import roster
+        return roster.load_team(source, self.team_two, format)[1]
+
     def team_battle(self):
         '''Battle team_one and team_two together using attack function.'''
 
@@ -372,9 +1140,13 @@ if __name__ == "__main__":
     # Instantiate Game Arena
     arena = Arena()
 
-    #Build Teams
-    arena.build_team_one()
-    arena.build_team_two()
+    #Build Teams, from roster files when two are given
+    if len(sys.argv) == 3:
+        print(f'Team One: {arena.load_team_one(sys.argv[1])}')
+        print(f'Team Two: {arena.load_team_two(sys.argv[2])}')
+    else:
+        arena.build_team_one()
+        arena.build_team_two()
 
     while game_is_running:
 
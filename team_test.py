@@ -400,3 +400,124 @@ def test_revive_heroes():
 
     for hero in team_one.heroes:
         assert hero.current_health == 100
+
+
+def one_hit_team(name, size):
+    team = superheroes.Team(name)
+    for index in range(size):
+        hero = superheroes.Hero(f"{name} {index}", 10)
+        hero.add_weapon(superheroes.Weapon("Laser Sword", 1000))
+        team.add_hero(hero)
+    return team
+
+
+def test_team_alive_index_follows_health():
+    team = one_hit_team("One", 3)
+    assert len(team._alive) == 3
+    team.heroes[1].current_health = 0
+    assert team.heroes[1] not in team._alive
+    team.heroes[1].current_health = 5
+    assert team.heroes[1] in team._alive
+    assert sorted(team._alive_index.values()) == [0, 1, 2]
+
+
+def test_team_revive_restores_alive_index():
+    team_one = one_hit_team("One", 5)
+    team_two = one_hit_team("Two", 5)
+    capture_console_output(lambda: team_one.attack(team_two))
+    assert len(team_one._alive) == 0 or len(team_two._alive) == 0
+    team_one.revive_heroes()
+    team_two.revive_heroes()
+    assert team_one._alive == list(team_one.heroes)
+    assert team_two._alive == list(team_two.heroes)
+
+
+def test_large_team_battle():
+    team_one = one_hit_team("One", 20000)
+    team_two = one_hit_team("Two", 20000)
+    team_one.attack(team_two, superheroes.events.NullSink())
+    # Every duel is a draw between two one-hit heroes.
+    assert len(team_one._alive) == 0 and len(team_two._alive) == 0
+    assert sum(hero.deaths for hero in team_two.heroes) == 20000
+
+
+def test_team_stats_running_totals():
+    team_one = one_hit_team("One", 4)
+    team_two = one_hit_team("Two", 4)
+    team_one.add_hero(superheroes.Hero("Spare", 0))
+    capture_console_output(lambda: team_one.attack(team_two))
+    kills = sum(hero.kills for hero in team_one.heroes)
+    deaths = sum(hero.deaths for hero in team_one.heroes)
+    assert (team_one.total_kills, team_one.total_deaths) == (kills, deaths)
+    assert team_one.stats() == kills / deaths
+    assert team_one.alive_count() == 0
+
+
+def test_team_stats_follow_roster_changes():
+    team = superheroes.Team("One")
+    veteran = superheroes.Hero("Veteran")
+    veteran.add_kill(6)
+    veteran.add_deaths(2)
+    team.add_hero(veteran)
+    team.add_hero(superheroes.Hero("Rookie"))
+    assert team.stats() == 3
+    assert team.alive_count() == 2
+    other = superheroes.Team("Two")
+    other.add_hero(veteran)
+    assert team.stats() == 0 and team.alive_count() == 1
+    assert [hero.name for hero in team.heroes] == ["Rookie"]
+    assert other.stats() == 3
+    other.remove_hero("Veteran")
+    assert other.stats() == 0 and other.alive_count() == 0
+
+
+def test_add_hero_moves_hero_between_teams():
+    one = one_hit_team("One", 2)
+    two = superheroes.Team("Two")
+    hero = one.heroes[0]
+    hero.add_kill(3)
+    one.add_hero(hero)
+    assert one.heroes.count(hero) == 1 and one.total_kills == 3
+    two.add_hero(hero)
+    assert hero.team is two
+    assert hero not in one.heroes and one.total_kills == 0 and one.alive_count() == 1
+    assert two.heroes == (hero,) and two.total_kills == 3 and two.alive_count() == 1
+
+
+def test_assigning_kills_and_deaths_updates_team_totals():
+    team = one_hit_team("One", 2)
+    hero = team.heroes[0]
+    hero.kills = 4
+    hero.deaths = 2
+    hero.add_kill(1)
+    assert (team.total_kills, team.total_deaths) == (5, 2)
+    assert team.stats() == 2.5
+    hero.kills = 0
+    assert team.total_kills == 0
+
+
+def test_heroes_is_a_read_only_snapshot():
+    team = superheroes.Team("One")
+    team.add_hero(superheroes.Hero("Athena"))
+    heroes = team.heroes
+    assert isinstance(heroes, tuple)
+    with pytest.raises(AttributeError):
+        heroes.append(superheroes.Hero("Zeus"))
+    team.add_hero(superheroes.Hero("Zeus"))
+    assert [hero.name for hero in heroes] == ["Athena"]
+    assert [hero.name for hero in team.heroes] == ["Athena", "Zeus"]
+
+
+def test_heroes_tuple_is_reused_until_the_roster_changes():
+    team = superheroes.Team("One")
+    team.add_hero(superheroes.Hero("Athena"))
+    heroes = team.heroes
+    assert team.heroes is heroes
+    team.add_hero(superheroes.Hero("Zeus"))
+    assert team.heroes is not heroes
+    heroes = team.heroes
+    team.remove_hero("Athena")
+    assert [hero.name for hero in team.heroes] == ["Zeus"]
+    other = superheroes.Team("Two")
+    other.add_hero(team.heroes[0])
+    assert team.heroes == ()
@@ -0,0 +1,213 @@
+'''Round-robin and Swiss tournaments over many Teams.
+
+Fixtures are independent battles, so they run on a process pool. Each worker
+gets pickled copies of the two rosters, revives them, plays one Team.attack
+with its own random stream and sends back the result. The caller's Team
+objects are never touched. Standings are yielded as fixtures complete.
+'''
+
+import os
+import random
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from events import NullSink
+from streams import child_seeds
+from superheroes import FIRST, SECOND
+
+# Points for a win and a draw.
+WIN_POINTS = 3
+DRAW_POINTS = 1
+
+
+def round_robin(count):
+    '''Return the round-robin fixtures for count teams as a list of rounds,
+    each a list of (home, away) index pairs. Uses the circle method, so every
+    team plays at most once per round.
+
+    count: int
+    '''
+
+    slots = list(range(count))
+    if count % 2:
+        slots.append(None)
+    rounds = []
+    for _ in range(len(slots) - 1):
+        half = len(slots) // 2
+        pairs = []
+        for home, away in zip(slots[:half], reversed(slots[half:])):
+            if home is not None and away is not None:
+                pairs.append((home, away))
+        rounds.append(pairs)
+        slots = [slots[0], slots[-1]] + slots[1:-1]
+    return rounds
+
+
+def swiss_pairings(standings, played):
+    '''Pair teams with similar points who have not met yet. A team left over
+    gets no fixture this round.
+
+    standings: Standings Object
+    played: set of frozensets of index pairs already played
+    '''
+
+    order = standings.ranking()
+    pairs = []
+    waiting = list(order)
+    while len(waiting) > 1:
+        home = waiting.pop(0)
+        for position, away in enumerate(waiting):
+            if frozenset((home, away)) not in played:
+                pairs.append((home, away))
+                waiting.pop(position)
+                break
+    return pairs
+
+
+class Standings:
+    '''League table indexed like the list of teams.
+
+    names: list of str
+    '''
+
+    def __init__(self, names):
+        self.names = names
+        self.played = [0] * len(names)
+        self.wins = [0] * len(names)
+        self.draws = [0] * len(names)
+        self.losses = [0] * len(names)
+        self.kills = [0] * len(names)
+        self.deaths = [0] * len(names)
+
+    def record(self, result):
+        '''Add one FixtureResult to the table.'''
+
+        home, away = result.home, result.away
+        self.played[home] += 1
+        self.played[away] += 1
+        if result.outcome == FIRST:
+            self.wins[home] += 1
+            self.losses[away] += 1
+        elif result.outcome == SECOND:
+            self.wins[away] += 1
+            self.losses[home] += 1
+        else:
+            self.draws[home] += 1
+            self.draws[away] += 1
+        self.kills[home] += result.home_kills
+        self.deaths[home] += result.home_deaths
+        self.kills[away] += result.away_kills
+        self.deaths[away] += result.away_deaths
+
+    def points(self, index):
+        return self.wins[index] * WIN_POINTS + self.draws[index] * DRAW_POINTS
+
+    def ranking(self):
+        '''Return team indexes ordered by points, then kill difference.'''
+
+        return sorted(range(len(self.names)),
+                      key=lambda index: (-self.points(index),
+                                         self.deaths[index] - self.kills[index],
+                                         index))
+
+    def table(self):
+        '''Return the ranked table as a list of row dicts.'''
+
+        return [{'team': self.names[index], 'played': self.played[index],
+                 'wins': self.wins[index], 'draws': self.draws[index],
+                 'losses': self.losses[index], 'points': self.points(index),
+                 'kills': self.kills[index], 'deaths': self.deaths[index]}
+                for index in self.ranking()]
+
+
+class FixtureResult:
+    '''Outcome of one fixture, from the home team's side.'''
+
+    def __init__(self, home, away, outcome, home_kills, home_deaths, away_kills, away_deaths):
+        self.home = home
+        self.away = away
+        self.outcome = outcome
+        self.home_kills = home_kills
+        self.home_deaths = home_deaths
+        self.away_kills = away_kills
+        self.away_deaths = away_deaths
+
+
+def play_fixture(home, away, home_team, away_team, seed):
+    '''Revive both rosters and play one battle. Meant to run in a worker on
+    copies of the teams.
+
+    home, away: int, the teams' indexes in the tournament
+    home_team, away_team: Team Objects (modified in place)
+    seed: int
+    '''
+
+    home_team.revive_heroes()
+    away_team.revive_heroes()
+    kills = (home_team.total_kills, away_team.total_kills)
+    deaths = (home_team.total_deaths, away_team.total_deaths)
+    outcome = home_team.attack(away_team, NullSink(), random.Random(seed))
+    return FixtureResult(home, away, outcome,
+                         home_team.total_kills - kills[0], home_team.total_deaths - deaths[0],
+                         away_team.total_kills - kills[1], away_team.total_deaths - deaths[1])
+
+
+class Tournament:
+    '''Plays fixtures between teams on a process pool.
+
+    teams: list of Team Objects
+    processes: int (default = number of CPUs)
+    seed: int or None
+    '''
+
+    def __init__(self, teams, processes=None, seed=None):
+        self.teams = teams
+        self.processes = processes or os.cpu_count() or 1
+        self.seed = random.getrandbits(128) if seed is None else seed
+        self.standings = Standings([team.name for team in teams])
+        self._fixtures = 0
+
+    def play(self, pairs):
+        '''Play every (home, away) pair and yield (FixtureResult, Standings)
+        as each one completes.
+
+        pairs: list of (home, away) index pairs
+        '''
+
+        seeds = child_seeds(self.seed, self._fixtures + len(pairs))[self._fixtures:]
+        self._fixtures += len(pairs)
+        with ProcessPoolExecutor(max_workers=self.processes) as pool:
+            futures = [pool.submit(play_fixture, home, away,
+                                   self.teams[home], self.teams[away], fixture_seed)
+                       for (home, away), fixture_seed in zip(pairs, seeds)]
+            for future in as_completed(futures):
+                result = future.result()
+                self.standings.record(result)
+                yield result, self.standings
+
+    def round_robin(self, legs=1):
+        '''Play a full round robin, each pair meeting legs times with home
+        and away swapped on every other leg. Yields like play().
+
+        legs: int (default = 1)
+        '''
+
+        for leg in range(legs):
+            pairs = [pair for rounds in round_robin(len(self.teams)) for pair in rounds]
+            if leg % 2:
+                pairs = [(away, home) for home, away in pairs]
+            yield from self.play(pairs)
+
+    def swiss(self, rounds):
+        '''Play rounds of Swiss pairings, each round paired on the standings
+        after the previous one. Yields like play().
+
+        rounds: int
+        '''
+
+        played = set()
+        for _ in range(rounds):
+            pairs = swiss_pairings(self.standings, played)
+            if not pairs:
+                break
+            played.update(frozenset(pair) for pair in pairs)
+            yield from self.play(pairs)
@@ -0,0 +1,59 @@
+import pytest
+import superheroes
+import tournament
+
+
+def build_team(name, size, max_damage):
+    team = superheroes.Team(name)
+    for index in range(size):
+        hero = superheroes.Hero(f"{name} {index}", 100)
+        hero.add_ability(superheroes.Ability("Punch", max_damage))
+        team.add_hero(hero)
+    return team
+
+
+def test_round_robin_pairs_every_team_once():
+    for count in (2, 5, 8):
+        rounds = tournament.round_robin(count)
+        pairs = [frozenset(pair) for matches in rounds for pair in matches]
+        assert len(pairs) == count * (count - 1) // 2
+        assert len(set(pairs)) == len(pairs)
+        for matches in rounds:
+            teams = [team for pair in matches for team in pair]
+            assert len(teams) == len(set(teams))
+
+
+def test_swiss_pairings_avoid_rematches():
+    standings = tournament.Standings(["A", "B", "C", "D"])
+    pairs = tournament.swiss_pairings(standings, {frozenset((0, 1))})
+    assert frozenset(pairs[0]) != frozenset((0, 1))
+    assert len(pairs) == 2
+
+
+def test_round_robin_tournament_standings():
+    teams = [build_team("Strong", 2, 1000), build_team("Middle", 2, 50), build_team("Weak", 2, 1)]
+    league = tournament.Tournament(teams, processes=2, seed=5)
+    updates = list(league.round_robin())
+    assert len(updates) == 3
+    table = league.standings.table()
+    assert table[0]["team"] == "Strong"
+    assert table[0]["points"] == 6
+    assert sum(row["played"] for row in table) == 6
+    # The caller's rosters are untouched.
+    assert all(hero.kills == 0 for team in teams for hero in team.heroes)
+
+
+def test_tournament_is_reproducible():
+    def run():
+        teams = [build_team(f"Team {index}", 3, 40 + index) for index in range(4)]
+        league = tournament.Tournament(teams, processes=2, seed=9)
+        list(league.round_robin(legs=2))
+        return league.standings.table()
+    assert run() == run()
+
+
+def test_swiss_tournament():
+    teams = [build_team(f"Team {index}", 2, 30 + 10 * index) for index in range(6)]
+    league = tournament.Tournament(teams, processes=2, seed=1)
+    list(league.swiss(3))
+    assert sum(league.standings.played) == 18
@@ -0,0 +1,494 @@
+'''Opt-in fight traces with deterministic replay.
+
+While a Recorder is started, Hero.fight writes every round's attack, block
+and health values straight into a preallocated int64 array from the array
+module, one row of ROUND_FIELDS per round, with no per-round objects built.
+Duels and battles get one row each that points at their rounds and duels.
+Heroes are members, identified by team name and roster index, and names
+are stored once in a string table. Team names must therefore be unique in a
+trace: recording a team under a name another live team was recorded with
+raises ValueError, before the duel or battle starts. A hero that is not on a
+team is a member of its own, so teamless heroes sharing a name stay apart.
+
+Traces are saved as a 48 byte header, the string offsets, the member,
+battle, duel and round rows, and the UTF-8 string blob. Trace reads a saved file through
+mmap and memoryview casts, so slicing a duel's rounds copies nothing.
+
+replay() plays a trace back onto heroes built from the same roster. It
+applies the recorded values instead of rolling, checks every health value
+against the trace and every roll against the heroes' loadouts, updates
+kills and deaths and emits the same events the original battle did, so the
+heroes end up exactly as they were.
+
+    with recording() as recorder:
+        team_one.attack(team_two)
+    recorder.save('battle.trace')
+    replay(Trace.open('battle.trace'), [team_one_copy, team_two_copy], ConsoleSink())
+'''
+
+import mmap
+import struct
+import sys
+import weakref
+from array import array
+from collections import deque
+from contextlib import contextmanager
+
+import events
+import superheroes
+
+MAGIC = b'SHTR'
+VERSION = 2
+HEADER = struct.Struct('<4sIqqqqq')
+
+# damage_one is what the first hero took before blocking, block_one what it
+# blocked and health_one its health after the round; likewise for two.
+ROUND_FIELDS = ('damage_one', 'block_one', 'health_one', 'damage_two', 'block_two', 'health_two')
+# A member is one hero: its team's string id and its roster index, or
+# NO_TEAM and its name's string id for each teamless hero.
+MEMBER_FIELDS = ('team', 'index')
+# hero_one and hero_two are member ids.
+DUEL_FIELDS = ('hero_one', 'hero_two', 'first_round', 'rounds', 'outcome', 'start_one',
+               'start_two')
+BATTLE_FIELDS = ('team_one', 'team_two', 'first_duel', 'duels', 'outcome')
+ROUND = struct.Struct(f'<{len(ROUND_FIELDS)}q')
+DUEL = struct.Struct(f'<{len(DUEL_FIELDS)}q')
+# Bytes per packed round and duel row.
+ROUND_SIZE = ROUND.size
+_DUEL_SIZE = DUEL.size
+# String id used for a hero that is not on a team.
+NO_TEAM = -1
+
+recorder = None
+
+
+class Recorder:
+    '''Collects fight traces in typed arrays.
+
+    rounds and duels are preallocated and doubled when they fill. Rows are
+    packed into them with struct, and only their first size and duel_size
+    bytes hold recorded rows.
+
+    capacity: int, rounds to make room for up front (default = 16384)
+    '''
+
+    write_round = ROUND.pack_into
+    write_duel = DUEL.pack_into
+
+    def __init__(self, capacity=1 << 14):
+        self.rounds = array('q', bytes(ROUND.size * capacity))
+        self.size = 0
+        self.limit = len(self.rounds) * self.rounds.itemsize
+        self.duels = array('q', bytes(DUEL.size * 1024))
+        self.duel_size = 0
+        self.duel_limit = DUEL.size * 1024
+        self.battles = array('q')
+        self.strings = []
+        self._string_ids = {}
+        self.members = array('q')
+        self._member_ids = {}
+        self._positions = {}
+        # Member ids of every roster index of a team, reused by every battle.
+        self._rows = {}
+        # The team recorded under each name, held weakly.
+        self._teams = weakref.WeakValueDictionary()
+        # The member id of every teamless hero, held weakly.
+        self._loose = weakref.WeakKeyDictionary()
+        self._battle = None
+
+    def _string(self, text):
+        string_id = self._string_ids.get(text)
+        if string_id is None:
+            string_id = self._string_ids[text] = len(self.strings)
+            self.strings.append(text)
+        return string_id
+
+    def _member(self, team_id, index):
+        member_id = self._member_ids.get((team_id, index))
+        if member_id is None:
+            member_id = self._member_ids[(team_id, index)] = len(self.members) // 2
+            self.members.extend((team_id, index))
+        return member_id
+
+    def _team(self, team):
+        '''Return the string id of team's name, or raise ValueError if
+        another team was recorded under that name.
+        '''
+
+        recorded = self._teams.get(team.name)
+        if recorded is None:
+            self._teams[team.name] = team
+        elif recorded is not team:
+            raise ValueError(f'Another team called {team.name!r} is already in this trace')
+        return self._string(team.name)
+
+    def _locate(self, hero):
+        '''Return the member id of a hero that start_battle() did not look
+        up. Costs O(team size).
+        '''
+
+        if hero.team is None:
+            member_id = self._loose.get(hero)
+            if member_id is None:
+                member_id = self._loose[hero] = len(self.members) // 2
+                self.members.extend((NO_TEAM, self._string(hero.name)))
+            return member_id
+        for index, member in enumerate(hero.team._roster):
+            if member is hero:
+                return self._member(self._team(hero.team), index)
+        raise ValueError(f'{hero.name} is not on the roster of {hero.team.name}')
+
+    @property
+    def round_count(self):
+        return self.size // ROUND.size
+
+    @property
+    def duel_count(self):
+        return self.duel_size // DUEL.size
+
+    def grow(self):
+        '''Double the room in rounds and return the new limit in bytes.'''
+
+        self.rounds.frombytes(bytes(self.limit))
+        self.limit = len(self.rounds) * self.rounds.itemsize
+        return self.limit
+
+    def grow_duels(self):
+        '''Double the room in duels.'''
+
+        self.duels.frombytes(bytes(self.duel_limit))
+        self.duel_limit *= 2
+
+    def round(self, damage_one, block_one, health_one, damage_two, block_two, health_two):
+        '''Record one round. Hero.fight packs its rounds in directly instead.'''
+
+        if self.size == self.limit:
+            self.grow()
+        self.write_round(self.rounds, self.size, damage_one, block_one, health_one,
+                         damage_two, block_two, health_two)
+        self.size += ROUND.size
+
+    def pair(self, hero, opponent):
+        '''Return the member ids of both heroes of a duel. Hero.fight calls
+        this before the first round, so a hero that cannot be recorded raises
+        ValueError before anything is fought.
+        '''
+
+        positions = self._positions
+        one = positions.get(hero)
+        if one is None:
+            one = self._locate(hero)
+        two = positions.get(opponent)
+        if two is None:
+            two = self._locate(opponent)
+        return one, two
+
+    def duel(self, one, two, start, rounds, start_one, start_two, outcome):
+        '''Record one finished duel between members one and two of rounds
+        rounds, packed into rounds from byte start on.
+        '''
+
+        offset = self.duel_size
+        if offset == self.duel_limit:
+            self.grow_duels()
+        self.write_duel(self.duels, offset, one, two, start // ROUND_SIZE, rounds, outcome,
+                        start_one, start_two)
+        self.duel_size = offset + _DUEL_SIZE
+
+    def start_battle(self, team, other_team):
+        '''Look up the roster index of every hero on both teams once, so the
+        battle's duels are recorded without searching the rosters.
+        '''
+
+        team_ids = [self._team(side) for side in (team, other_team)]
+        for side, team_id in zip((team, other_team), team_ids):
+            rows = self._rows.get(team_id)
+            if rows is None or len(rows) < len(side._roster):
+                rows = self._rows[team_id] = [self._member(team_id, index)
+                                              for index in range(len(side._roster))]
+            self._positions.update(zip(side._roster, rows))
+        self._battle = (team_ids[0], team_ids[1], self.duel_count)
+
+    def end_battle(self, outcome):
+        team_one, team_two, first_duel = self._battle
+        count = self.duel_count - first_duel
+        self.battles.extend((team_one, team_two, first_duel, count, outcome))
+        self._battle = None
+        # Holding no heroes between battles keeps them collectable.
+        self._positions.clear()
+
+    def to_bytes(self):
+        '''Return the trace in the binary file format.'''
+
+        if sys.byteorder != 'little':
+            raise ValueError('Traces can only be written on little-endian machines')
+        blob = bytearray()
+        offsets = array('q', [0])
+        for text in self.strings:
+            blob += text.encode()
+            offsets.append(len(blob))
+        header = HEADER.pack(MAGIC, VERSION, len(self.strings),
+                             len(self.members) // len(MEMBER_FIELDS),
+                             len(self.battles) // len(BATTLE_FIELDS),
+                             self.duel_count, self.round_count)
+        return b''.join((header, offsets.tobytes(), self.members.tobytes(), self.battles.tobytes(),
+                         memoryview(self.duels).cast('B')[:self.duel_size],
+                         memoryview(self.rounds).cast('B')[:self.size], bytes(blob)))
+
+    def save(self, path):
+        with open(path, 'wb') as output:
+            output.write(self.to_bytes())
+
+    def trace(self):
+        '''Return a Trace of everything recorded so far.'''
+
+        return Trace(self.to_bytes())
+
+
+def start(new_recorder=None):
+    '''Start recording every fight and battle and return the Recorder.'''
+
+    global recorder
+    recorder = new_recorder if new_recorder is not None else Recorder()
+    return recorder
+
+
+def stop():
+    '''Stop recording and return the Recorder that was in use.'''
+
+    global recorder
+    previous, recorder = recorder, None
+    if previous is not None:
+        # A battle cut short by an error leaves its heroes behind.
+        previous._positions.clear()
+    return previous
+
+
+@contextmanager
+def recording(new_recorder=None):
+    '''Record the fights and battles inside a with block.'''
+
+    previous = recorder
+    try:
+        yield start(new_recorder)
+    finally:
+        stop()
+        if previous is not None:
+            start(previous)
+
+
+class Trace:
+    '''Read-only view of a saved trace. The members, battles, duels and
+    rounds attributes are flat int64 memoryviews of rows of MEMBER_FIELDS,
+    BATTLE_FIELDS, DUEL_FIELDS and ROUND_FIELDS.
+
+    buffer: bytes-like object holding the binary format
+    '''
+
+    def __init__(self, buffer):
+        self._buffer = buffer
+        view = memoryview(buffer)
+        magic, version, strings, members, battles, duels, rounds = HEADER.unpack(view[:HEADER.size])
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f'Not a version {VERSION} fight trace')
+        position = HEADER.size
+        sections = []
+        for count in (strings + 1, members * len(MEMBER_FIELDS), battles * len(BATTLE_FIELDS),
+                      duels * len(DUEL_FIELDS), rounds * len(ROUND_FIELDS)):
+            if position + 8 * count > len(view):
+                raise ValueError('Fight trace is truncated')
+            sections.append(view[position:position + 8 * count].cast('q'))
+            position += 8 * count
+        self._offsets, self.members, self.battles, self.duels, self.rounds = sections
+        self._blob = view[position:]
+        if len(self._blob) < self._offsets[-1]:
+            raise ValueError('Fight trace is truncated')
+
+    @classmethod
+    def open(cls, path):
+        '''Map a saved trace file without reading it into memory.'''
+
+        with open(path, 'rb') as handle:
+            return cls(mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ))
+
+    @property
+    def duel_count(self):
+        return len(self.duels) // len(DUEL_FIELDS)
+
+    @property
+    def battle_count(self):
+        return len(self.battles) // len(BATTLE_FIELDS)
+
+    def string(self, string_id):
+        if string_id == NO_TEAM:
+            return None
+        return bytes(self._blob[self._offsets[string_id]:self._offsets[string_id + 1]]).decode()
+
+    def duel(self, index):
+        '''Return the row of duel index as a dict.'''
+
+        width = len(DUEL_FIELDS)
+        return dict(zip(DUEL_FIELDS, self.duels[index * width:(index + 1) * width]))
+
+    def member(self, member_id):
+        '''Return the (team string id, index) of a member id.'''
+
+        return tuple(self.members[2 * member_id:2 * member_id + 2])
+
+    def battle(self, index):
+        width = len(BATTLE_FIELDS)
+        return dict(zip(BATTLE_FIELDS, self.battles[index * width:(index + 1) * width]))
+
+    def duel_rounds(self, index):
+        '''Return a flat memoryview of the round rows of duel index.'''
+
+        duel = self.duel(index)
+        width = len(ROUND_FIELDS)
+        start = duel['first_round'] * width
+        return self.rounds[start:start + duel['rounds'] * width]
+
+
+class _LooseHeroes:
+    '''The teamless heroes given to replay. The n-th teamless member of a
+    name in the trace gets the n-th hero given with that name.
+    '''
+
+    def __init__(self):
+        self.waiting = {}
+        self.found = {}
+
+    def add(self, hero):
+        self.waiting.setdefault(hero.name, deque()).append(hero)
+
+    def hero(self, member_id, name):
+        hero = self.found.get(member_id)
+        if hero is None:
+            waiting = self.waiting.get(name)
+            if not waiting:
+                raise ValueError(f'No hero called {name!r} left to replay onto')
+            hero = self.found[member_id] = waiting.popleft()
+        return hero
+
+
+def _hero(trace, rosters, member_id):
+    team_id, index = trace.member(member_id)
+    if team_id == NO_TEAM:
+        return rosters[None].hero(member_id, trace.string(index))
+    return rosters[trace.string(team_id)][index]
+
+
+def _replay_duel(trace, index, rosters, sink):
+    duel = trace.duel(index)
+    hero = _hero(trace, rosters, duel['hero_one'])
+    opponent = _hero(trace, rosters, duel['hero_two'])
+    hero.current_health = duel['start_one']
+    opponent.current_health = duel['start_two']
+    outcome = duel['outcome']
+    rounds = trace.duel_rounds(index)
+    # The same checks, in the same order, as Hero.fight.
+    if (len(hero.abilities) + len(opponent.abilities)) == 0:
+        replayed = superheroes.DRAW
+        sink.emit(events.NO_CONTEST, hero, opponent)
+    elif (hero.is_alive() and opponent.is_alive()
+            and not (hero.can_hurt(opponent) or opponent.can_hurt(hero))):
+        replayed = superheroes.STALEMATE
+        sink.emit(events.DUEL_STALEMATE, hero, opponent)
+    else:
+        replayed = _replay_rounds(index, hero, opponent, rounds, sink)
+    if replayed != outcome:
+        raise ValueError(f'Duel {index} replayed to outcome {replayed}, not {outcome}')
+    return outcome
+
+
+def _replay_rounds(index, hero, opponent, rounds, sink):
+    sink.emit(events.DUEL_START, hero, opponent)
+    attack_one, attack_two = hero.damage_bounds(), opponent.damage_bounds()
+    defend_one, defend_two = hero.block_bounds(), opponent.block_bounds()
+    for row in range(0, len(rounds), len(ROUND_FIELDS)):
+        damage_one, block_one, health_one, damage_two, block_two, health_two = rounds[row:row + 6]
+        hero.current_health -= damage_one - block_one
+        opponent.current_health -= damage_two - block_two
+        if (hero.current_health != health_one or opponent.current_health != health_two
+                or not attack_two[0] <= damage_one <= attack_two[1]
+                or not attack_one[0] <= damage_two <= attack_one[1]
+                or not defend_one[0] <= block_one <= defend_one[1]
+                or not defend_two[0] <= block_two <= defend_two[1]):
+            raise ValueError(f'Duel {index} does not replay onto these heroes')
+
+    if hero.is_alive() and opponent.is_alive():
+        replayed = superheroes.TIMEOUT
+        sink.emit(events.DUEL_TIMEOUT, hero, opponent)
+    elif hero.is_alive():
+        replayed = superheroes.FIRST
+        sink.emit(events.DUEL_END, hero, opponent)
+        hero.add_kill(1)
+        opponent.add_deaths(1)
+    elif opponent.is_alive():
+        replayed = superheroes.SECOND
+        sink.emit(events.DUEL_END, opponent, hero)
+        opponent.add_kill(1)
+        hero.add_deaths(1)
+    else:
+        replayed = superheroes.DRAW
+        sink.emit(events.DUEL_DRAW, hero, opponent)
+        hero.add_deaths(1)
+        hero.add_kill(1)
+        opponent.add_kill(1)
+        opponent.add_deaths(1)
+    return replayed
+
+
+def replay(trace, teams, sink=None):
+    '''Play trace back onto the heroes of teams and return the list of duel
+    outcomes. Heroes are found by team name and roster index, so teams must
+    list their heroes in the order they had when the trace was recorded and
+    no two teams may share a name. Heroes that were not on a team are found
+    by name, and teamless heroes sharing a name in the order they first
+    fought.
+
+    trace: Trace Object
+    teams: iterable of Team Objects, plus Hero Objects for heroes not on a team
+    sink: event sink (default = events.NullSink())
+    '''
+
+    if sink is None:
+        sink = events.NullSink()
+    rosters = {None: _LooseHeroes()}
+    team_names = {}
+    for team in teams:
+        if isinstance(team, superheroes.Hero):
+            rosters[None].add(team)
+            continue
+        if team.name in team_names:
+            raise ValueError(f'Two teams are called {team.name!r}')
+        team_names[team.name] = team
+        rosters[team.name] = team.heroes
+
+    battle_results = {
+        superheroes.DRAW: events.TEAM_DRAW,
+        superheroes.STALEMATE: events.TEAM_STALEMATE,
+        superheroes.TIMEOUT: events.TEAM_TIMEOUT,
+    }
+    outcomes = []
+    battle = 0
+    duel = 0
+    while duel < trace.duel_count or battle < trace.battle_count:
+        if battle < trace.battle_count and trace.battle(battle)['first_duel'] == duel:
+            row = trace.battle(battle)
+            team = team_names[trace.string(row['team_one'])]
+            other_team = team_names[trace.string(row['team_two'])]
+            sink.emit(events.BATTLE_START, team, other_team)
+            for index in range(duel, duel + row['duels']):
+                outcomes.append(_replay_duel(trace, index, rosters, sink))
+            duel += row['duels']
+            if row['outcome'] == superheroes.FIRST:
+                sink.emit(events.TEAM_WIN, team, other_team)
+            elif row['outcome'] == superheroes.SECOND:
+                sink.emit(events.TEAM_WIN, other_team, team)
+            else:
+                sink.emit(battle_results[row['outcome']], team, other_team)
+            battle += 1
+        else:
+            outcomes.append(_replay_duel(trace, duel, rosters, sink))
+            duel += 1
+    return outcomes
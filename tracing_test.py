@@ -0,0 +1,141 @@
+import gc
+import random
+import pytest
+import events
+import superheroes
+import tracing
+from seeded_teams import build_team, counters
+
+
+def test_replay_reproduces_recorded_battle(tmp_path):
+    one, two = build_team("One", seed=1), build_team("Two", seed=2)
+    recorded = events.RingBufferSink()
+    with tracing.recording() as recorder:
+        result = one.attack(two, recorded, random.Random(3))
+    assert tracing.recorder is None
+    path = str(tmp_path / "battle.trace")
+    recorder.save(path)
+
+    trace = tracing.Trace.open(path)
+    assert trace.battle_count == 1
+    assert trace.battle(0)["outcome"] == result
+    copy_one, copy_two = build_team("One", seed=1), build_team("Two", seed=2)
+    replayed = events.RingBufferSink()
+    outcomes = tracing.replay(trace, [copy_one, copy_two], replayed)
+    assert len(outcomes) == trace.duel_count
+    assert counters(copy_one, copy_two) == counters(one, two)
+    assert [event for event, _ in replayed.events()] == [event for event, _ in recorded.events()]
+
+
+def test_duel_rounds_are_views():
+    hero, opponent = build_team("One", 1, seed=4).heroes[0], build_team("Two", 1, seed=5).heroes[0]
+    with tracing.recording() as recorder:
+        hero.fight(opponent, events.NullSink(), random.Random(6))
+    trace = recorder.trace()
+    rounds = trace.duel_rounds(0)
+    assert isinstance(rounds, memoryview)
+    assert rounds.obj is trace.rounds.obj
+    assert len(rounds) == trace.duel(0)["rounds"] * len(tracing.ROUND_FIELDS)
+    team_id, index = trace.member(trace.duel(0)["hero_one"])
+    assert (trace.string(team_id), index) == ("One", 0)
+
+
+def test_replay_rejects_different_heroes():
+    one, two = build_team("One", seed=1), build_team("Two", seed=2)
+    with tracing.recording() as recorder:
+        one.attack(two, events.NullSink(), random.Random(3))
+    weaker = build_team("One", seed=1)
+    for hero in weaker.heroes:
+        hero.armors = []
+    with pytest.raises(ValueError):
+        tracing.replay(recorder.trace(), [weaker, build_team("Two", seed=2)])
+
+
+def test_heroes_without_team_replay():
+    hero, opponent = superheroes.Hero("Athena", 80), superheroes.Hero("Ares", 80)
+    hero.add_ability(superheroes.Ability("Spear", 40))
+    opponent.add_ability(superheroes.Ability("Sword", 40))
+    with tracing.recording() as recorder:
+        result = hero.fight(opponent, events.NullSink(), random.Random(7))
+    copy, other = superheroes.Hero("Athena", 80), superheroes.Hero("Ares", 80)
+    copy.add_ability(superheroes.Ability("Spear", 40))
+    other.add_ability(superheroes.Ability("Sword", 40))
+    assert tracing.replay(recorder.trace(), [copy, other]) == [result]
+    assert (copy.current_health, other.current_health) == (hero.current_health, opponent.current_health)
+
+
+def test_duplicate_names_replay_by_roster_index():
+    def team(name):
+        team = superheroes.Team(name)
+        for health in (40, 400, 90):
+            hero = superheroes.Hero("Clone", health)
+            hero.add_ability(superheroes.Ability("Punch", 60))
+            team.add_hero(hero)
+        return team
+    one, two = team("One"), team("Two")
+    with tracing.recording() as recorder:
+        one.attack(two, events.NullSink(), random.Random(9))
+    copy_one, copy_two = team("One"), team("Two")
+    tracing.replay(recorder.trace(), [copy_one, copy_two])
+    assert counters(copy_one, copy_two) == counters(one, two)
+
+
+def test_recorder_does_not_hold_heroes():
+    one, two = build_team("One", seed=1), build_team("Two", seed=2)
+    with tracing.recording() as recorder:
+        one.attack(two, events.NullSink(), random.Random(3))
+        lonely = superheroes.Hero("Lonely", 50)
+        lonely.fight(two.heroes[0], events.NullSink(), random.Random(4))
+    heroes = set(map(id, one.heroes + two.heroes + (lonely,)))
+    held = [item for value in vars(recorder).values() for item in gc.get_referents(value)]
+    assert not heroes & set(map(id, held))
+    assert recorder.trace().duel_count > 0
+
+
+def test_teams_sharing_a_name_are_rejected():
+    one, two = build_team("Squad", seed=1), build_team("Squad", seed=2)
+    with tracing.recording() as recorder:
+        with pytest.raises(ValueError, match="Squad"):
+            one.attack(two, events.NullSink(), random.Random(3))
+        one.attack(build_team("Other", seed=4), events.NullSink(), random.Random(3))
+        with pytest.raises(ValueError, match="Squad"):
+            two.attack(build_team("Third", seed=5), events.NullSink(), random.Random(3))
+    with pytest.raises(ValueError, match="Squad"):
+        tracing.replay(recorder.trace(), [one, two])
+
+
+def test_rejected_fight_changes_nothing():
+    one, two = build_team("Squad", seed=1), build_team("Squad", seed=2)
+    with tracing.recording() as recorder:
+        one.attack(build_team("Other", seed=3), events.NullSink(), random.Random(4))
+        hero, opponent = two.heroes[0], superheroes.Hero("Lonely", 50)
+        opponent.add_ability(superheroes.Ability("Punch", 60))
+        before = (recorder.round_count, recorder.duel_count)
+        with pytest.raises(ValueError, match="Squad"):
+            hero.fight(opponent, events.NullSink(), random.Random(5))
+        assert (recorder.round_count, recorder.duel_count) == before
+    assert hero.current_health == hero.starting_health
+    assert opponent.current_health == 50
+    assert (hero.kills, hero.deaths, opponent.kills, opponent.deaths) == (0, 0, 0, 0)
+
+
+def test_teamless_heroes_sharing_a_name_replay_apart():
+    def heroes():
+        clones = []
+        for health in (30, 300):
+            clone = superheroes.Hero("Clone", health)
+            clone.add_ability(superheroes.Ability("Punch", 40))
+            clones.append(clone)
+        boss = superheroes.Hero("Boss", 500)
+        boss.add_ability(superheroes.Ability("Stomp", 40))
+        return clones, boss
+    clones, boss = heroes()
+    with tracing.recording() as recorder:
+        for clone in clones:
+            boss.fight(clone, events.NullSink(), random.Random(8))
+    trace = recorder.trace()
+    assert trace.duel(0)["hero_two"] != trace.duel(1)["hero_two"]
+    copies, boss_copy = heroes()
+    tracing.replay(trace, [boss_copy] + copies)
+    assert [clone.current_health for clone in copies] == [clone.current_health for clone in clones]
+    assert boss_copy.current_health == boss.current_health